@@ -4,12 +4,22 @@
 
 import streamlit as st
 import os
+import time
+import uuid
 import yaml
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
 
-from src.vectorstore import load_vectorstore, load_bm25_index, check_database_exists
-from src.rag_chain import process_query
+from src.vectorstore import check_database_exists
 from src.response_formatter import validate_response_structure, format_response
+from src.tracing import configure_tracing, stage_percentiles, get_recent_spans, clear_spans
+from src.conversation import Conversation
+from src.chat_history import ChatHistory
+from src.profiling import get_query_profiler, PROFILE_MODES
+
+# 질의 서비스(langchain, chromadb 포함)는 DB를 처음 로드할 때 import
+if TYPE_CHECKING:
+    from src.query_service import QueryService
 
 
 # 페이지 설정
@@ -28,8 +38,9 @@ def load_config():
 
 def init_session_state():
     """세션 스테이트 초기화"""
+    # 대화 내역 (압축 저장, 최근 턴만 렌더링)
     if 'messages' not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = ChatHistory(load_config(), render=format_response)
     
     if 'vectorstore' not in st.session_state:
         st.session_state.vectorstore = None
@@ -42,13 +53,41 @@ def init_session_state():
     
     if 'config' not in st.session_state:
         st.session_state.config = None
+    
+    # 대화 맥락 (후속 질문 변환, 이전 검색 결과 재사용)
+    if 'conversation' not in st.session_state:
+        st.session_state.conversation = None
+    
+    # 세션 ID (세션별 호출량 한도, 대기 순번 조회용)
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    
+    # 처리 중인 질문 (rerun이 일어나도 결과를 이어받기 위해 보관)
+    if 'pending' not in st.session_state:
+        st.session_state.pending = None
+
+
+@st.cache_resource(show_spinner="데이터베이스 로드 중...")
+def get_query_service() -> "QueryService":
+    """
+    인덱스 로드 및 질의 서비스 시작 (프로세스 전체에서 공유)
+    
+    Returns:
+        QueryService
+    """
+    from src.query_service import create_query_service
+    
+    config = load_config()
+    configure_tracing(config)
+    
+    # ChromaDB + BM25 로드 (컬렉션이 여러 개면 기본 컬렉션만 먼저 로드)
+    return create_query_service(config)
 
 
 def load_databases():
     """데이터베이스 로드"""
     if st.session_state.vectorstore is None:
         config = load_config()
-        st.session_state.config = config
         
         # DB 존재 확인
         if not check_database_exists(
@@ -58,14 +97,137 @@ def load_databases():
             st.error("❌ 데이터베이스를 찾을 수 없습니다. `python scripts/create_database.py`를 먼저 실행해 주세요.")
             st.stop()
         
-        with st.spinner("데이터베이스 로드 중..."):
-            # ChromaDB 로드
-            st.session_state.vectorstore = load_vectorstore(config)
+        service = get_query_service()
+        st.session_state.config = service.config
+        st.session_state.vectorstore = service.vectorstore
+        st.session_state.bm25 = service.bm25
+        st.session_state.bm25_chunks = service.bm25_chunks
+        
+        if (service.config.get('conversation') or {}).get('enabled', False):
+            st.session_state.conversation = Conversation(service.config)
+
+
+def get_admin_password() -> str:
+    """관리자 비밀번호 로드 (Secrets 우선, 없으면 .env)"""
+    try:
+        if "ADMIN_PASSWORD" in st.secrets:
+            return st.secrets["ADMIN_PASSWORD"]
+    except (FileNotFoundError, AttributeError):
+        pass
+    
+    load_dotenv()
+    return os.getenv("ADMIN_PASSWORD", "")
+
+
+def render_admin_panel():
+    """관리자 패널 (단계별 지연 시간 통계, 프로파일링)"""
+    with st.expander("🔧 관리자"):
+        admin_password = st.text_input(
+            "관리자 비밀번호",
+            type="password",
+            key="admin_pw"
+        )
+        
+        expected = get_admin_password()
+        if not admin_password:
+            return
+        if not expected or admin_password != expected:
+            st.error("❌ 비밀번호가 일치하지 않습니다.")
+            return
+        
+        if st.session_state.config is not None:
+            st.markdown("**질의 서비스 현황**")
+            st.json(get_query_service().status())
+        
+        st.markdown("**이 세션 대화 내역**")
+        st.json(st.session_state.messages.stats())
+        
+        st.markdown("**단계별 지연 시간 (ms)**")
+        stats = stage_percentiles()
+        
+        if not stats:
+            st.caption("아직 기록된 span이 없습니다.")
+        else:
+            rows = [
+                {
+                    "단계": stage,
+                    "횟수": values["count"],
+                    "p50": values["p50"],
+                    "p95": values["p95"],
+                    "p99": values["p99"],
+                    "최대": values["max"]
+                }
+                for stage, values in sorted(stats.items())
+            ]
+            st.dataframe(rows, use_container_width=True, hide_index=True)
             
-            # BM25 로드
-            st.session_state.bm25, st.session_state.bm25_chunks = load_bm25_index(
-                config['database']['bm25_path']
-            )
+            with st.expander("최근 span"):
+                st.json(get_recent_spans(limit=30))
+        
+        if st.button("🧹 통계 초기화", use_container_width=True):
+            clear_spans()
+            st.rerun()
+        
+        render_profiling_panel()
+
+
+def render_profiling_panel():
+    """질의 프로파일링 (다음 N개 질의의 상위 핫스팟, 기준 대비 차이)"""
+    profiler = get_query_profiler()
+    top_n = ((st.session_state.config or {}).get('profiling') or {}).get('top_n', 20)
+    
+    st.markdown("**프로파일링**")
+    col1, col2 = st.columns(2)
+    with col1:
+        mode = st.selectbox("종류", PROFILE_MODES, key="profile_mode",
+                            format_func=lambda m: "CPU (cProfile)" if m == "cpu" else "메모리 (tracemalloc)")
+    with col2:
+        count = st.number_input("질의 수", min_value=1, max_value=50, value=5, step=1, key="profile_count")
+    
+    if st.button("▶️ 다음 질의 프로파일링", use_container_width=True):
+        profiler.arm(int(count), mode)
+        st.rerun()
+    
+    status = profiler.status()
+    if status["mode"] is None:
+        st.caption("프로파일링한 질의가 없습니다.")
+        return
+    st.caption(f"{status['profiled']}개 질의 측정, {status['remaining']}개 남음"
+               + (f", 다른 프로파일러와 겹쳐 건너뛴 호출 {status['skipped_calls']}건" if status['skipped_calls'] else ""))
+    
+    rows = profiler.top(top_n)
+    if rows:
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+    
+    if st.button("📌 현재 결과를 기준으로 저장", use_container_width=True, disabled=not rows):
+        profiler.save_baseline()
+        st.rerun()
+    
+    diff = profiler.diff(top_n)
+    if diff:
+        with st.expander("기준 대비 차이"):
+            st.dataframe(diff, use_container_width=True, hide_index=True)
+
+
+def render_history(history: ChatHistory):
+    """대화 내역 표시 (최근 턴만 그리고, 이전 대화는 켰을 때 한 페이지씩)"""
+    hidden = history.hidden_count()
+    if history.dropped:
+        st.caption(f"메모리 한도로 오래된 메시지 {history.dropped}개는 삭제되었습니다.")
+    
+    if hidden and st.toggle(f"이전 대화 보기 ({hidden}개 메시지)", key="show_older"):
+        page = 1
+        if history.page_count() > 1:
+            page = st.number_input("페이지 (1: 최근)", min_value=1, max_value=history.page_count(), value=1, step=1,
+                                   key="history_page")
+        for _, role, markdown in history.page(int(page)):
+            with st.chat_message(role):
+                st.markdown(markdown)
+        st.divider()
+    
+    for _, role, markdown in history.recent():
+        with st.chat_message(role):
+            st.markdown(markdown)
 
 
 def main():
@@ -134,42 +296,66 @@ def main():
         
         # 대화 초기화
         if st.button("🗑️ 대화 내역 초기화", use_container_width=True):
-            st.session_state.messages = []
+            st.session_state.messages.clear()
+            if st.session_state.conversation is not None:
+                st.session_state.conversation.reset()
             st.rerun()
+        
+        st.divider()
+        
+        # 관리자 패널
+        render_admin_panel()
     
     # API 키 확인
     if not os.getenv("OPENAI_API_KEY"):
         st.warning("⚠️ OpenAI API 키를 입력해 주세요 (사이드바)")
         st.stop()
     
-    # 데이터베이스 로드
-    load_databases()
+    # 대화 내역 표시 (DB 로드보다 먼저 그려 첫 화면을 빠르게)
+    render_history(st.session_state.messages)
     
-    # 대화 내역 표시
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    # 데이터베이스 로드 (세션당 한 번, 인덱스는 프로세스 전체에서 공유)
+    load_databases()
     
     # 사용자 입력
     if prompt := st.chat_input("학교 행정 업무에 대해 질문해 주세요..."):
         # 사용자 메시지 추가
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        st.session_state.messages.append("user", prompt)
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # AI 응답 생성
+        # 질의 서비스에 제출 (처리는 서비스 스레드에서 진행)
+        st.session_state.pending = {
+            "prompt": prompt,
+            "future": get_query_service().submit(
+                prompt, conversation=st.session_state.conversation, session_id=st.session_state.session_id
+            )
+        }
+    
+    # AI 응답 수신
+    if st.session_state.pending is not None:
         with st.chat_message("assistant"):
             with st.spinner("답변 생성 중..."):
                 try:
-                    response = process_query(
-                        query=prompt,
-                        vectorstore=st.session_state.vectorstore,
-                        bm25=st.session_state.bm25,
-                        bm25_chunks=st.session_state.bm25_chunks,
-                        config=st.session_state.config
-                    )
+                    # 호출량 한도로 대기 중이면 대기 순번 표시
+                    future = st.session_state.pending["future"]
+                    queue_status = st.empty()
+                    while not future.done():
+                        position = get_query_service().queue_position(st.session_state.session_id)
+                        if position is not None:
+                            queue_status.info(f"⏳ 요청이 많아 대기 중입니다 (대기 순번 {position}번)")
+                        else:
+                            queue_status.empty()
+                        time.sleep(0.3)
+                    queue_status.empty()
+                    
+                    response = future.result()
+                    st.session_state.pending = None
                     
-                    # 응답 표시
+                    # 응답 표시 (후속 질문을 변환했으면 검색에 쓴 질문도 표시)
+                    conversation = st.session_state.conversation
+                    if conversation is not None and conversation.last_rewrite:
+                        st.caption(f"🔎 검색 질문: {conversation.last_rewrite}")
                     st.markdown(response)
                     
                     # 구조 검증 (선택적)
@@ -181,12 +367,13 @@ def main():
                             st.warning(f"누락된 섹션: {', '.join(missing)}")
                     
                     # 메시지 저장
-                    st.session_state.messages.append({"role": "assistant", "content": response})
+                    st.session_state.messages.append("assistant", response)
                 
                 except Exception as e:
+                    st.session_state.pending = None
                     error_msg = f"❌ 오류가 발생했습니다: {str(e)}"
                     st.error(error_msg)
-                    st.session_state.messages.append({"role": "assistant", "content": error_msg})
+                    st.session_state.messages.append("assistant", error_msg)
     
     # 푸터
     st.divider()
@@ -0,0 +1 @@
+# 벤치마크/평가 도구 패키지
@@ -0,0 +1,247 @@
+"""
+가짜 OpenAI 서버 (벤치마크/오프라인 실행용)
+- /v1/embeddings: 텍스트 해시 기반 결정적 벡터
+- /v1/chat/completions: 답변 구조를 갖춘 고정 답변 (SSE 스트리밍 지원, max_tokens를 넘으면 잘라서 반환)
+- 인위적 지연 시간 설정 가능
+"""
+
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+
+FAKE_ANSWER = """### ① 질문 요지 정리
+- 벤치마크용 가짜 답변입니다. 질문의 핵심 내용을 요약합니다.
+
+### ② 절차
+**1단계: 접수** (담당: 행정실, 기한: 당일)
+- 시스템에 등록하고 담당자에게 배부합니다.
+
+### ③ 관련 법령
+📌 **지방공무원법 제64조**
+- **조문 내용**: 벤치마크용 예시 조문입니다.
+
+### ④ 서식
+📋 **서식 1-1: 공문서 접수대장**
+- **작성 요령**: 벤치마크용 예시 서식입니다.
+
+### ⑤ 주의사항
+⚠️ **기한 엄수**: 벤치마크용 예시 주의사항입니다.
+
+### 📄 출처
+- Ⅰ. 총무 > 1. 문서관리 (8-9페이지)
+"""
+
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """
+    텍스트 해시로 시드한 정규화 벡터 생성 (같은 입력 → 같은 벡터)
+
+    Args:
+        text: 입력 텍스트 (토큰 배열이면 문자열로 변환해서 사용)
+        dimensions: 벡터 차원
+
+    Returns:
+        L2 정규화된 벡터
+    """
+    seed = int.from_bytes(hashlib.sha256(str(text).encode('utf-8')).digest()[:8], 'big')
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeOpenAIServer:
+    """
+    OpenAI 호환 가짜 서버
+
+    사용 예:
+        with FakeOpenAIServer(embedding_latency=0.05, llm_latency=0.5) as server:
+            os.environ["OPENAI_API_BASE"] = server.base_url
+    """
+
+    def __init__(
+        self,
+        embedding_latency: float = 0.0,
+        llm_latency: float = 0.0,
+        llm_token_latency: float = 0.0,
+        dimensions: int = 1536,
+        answer: str = FAKE_ANSWER,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        """
+        Args:
+            embedding_latency: 임베딩 요청당 지연 (초)
+            llm_latency: LLM 요청당 첫 응답 지연 (초)
+            llm_token_latency: 스트리밍 시 청크당 추가 지연 (초)
+            dimensions: 기본 임베딩 차원 (요청에 dimensions가 있으면 그 값 사용)
+            answer: LLM이 반환할 답변
+            host: 바인드 주소
+            port: 포트 (0이면 임의 포트)
+        """
+        self.embedding_latency = embedding_latency
+        self.llm_latency = llm_latency
+        self.llm_token_latency = llm_token_latency
+        self.dimensions = dimensions
+        self.answer = answer
+        self.request_counts = {"embeddings": 0, "chat": 0}
+
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _count(self, kind: str) -> None:
+        with self._lock:
+            self.request_counts[kind] += 1
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                # 벤치마크 출력이 지저분해지지 않도록 접근 로그 생략
+                pass
+
+            def _send_json(self, payload: dict, status: int = 200):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+
+                if self.path.endswith("/embeddings"):
+                    self._handle_embeddings(payload)
+                elif self.path.endswith("/chat/completions"):
+                    self._handle_chat(payload)
+                else:
+                    self._send_json({"error": {"message": "not found"}}, status=404)
+
+            def _handle_embeddings(self, payload: dict):
+                server._count("embeddings")
+                time.sleep(server.embedding_latency)
+
+                inputs = payload.get("input", [])
+                # 단일 문자열 / 단일 토큰 배열도 허용
+                if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                    inputs = [inputs]
+
+                dimensions = payload.get("dimensions") or server.dimensions
+                data = [
+                    {"object": "embedding", "index": i, "embedding": fake_embedding(text, dimensions)}
+                    for i, text in enumerate(inputs)
+                ]
+                self._send_json({
+                    "object": "list",
+                    "data": data,
+                    "model": payload.get("model", "fake-embedding"),
+                    "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}
+                })
+
+            def _handle_chat(self, payload: dict):
+                server._count("chat")
+                time.sleep(server.llm_latency)
+
+                model = payload.get("model", "fake-llm")
+                prompt_chars = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+
+                # 토큰 수는 2자당 1토큰으로 근사, max_tokens를 넘으면 실제 API처럼 잘림
+                answer = server.answer
+                finish_reason = "stop"
+                max_tokens = payload.get("max_tokens")
+                if max_tokens and len(answer) // 2 > max_tokens:
+                    answer = answer[:max_tokens * 2]
+                    finish_reason = "length"
+
+                usage = {
+                    "prompt_tokens": prompt_chars // 2,
+                    "completion_tokens": len(answer) // 2,
+                    "total_tokens": (prompt_chars + len(answer)) // 2
+                }
+
+                if payload.get("stream"):
+                    self._stream_chat(model, answer)
+                    return
+
+                self._send_json({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": answer},
+                        "finish_reason": finish_reason
+                    }],
+                    "usage": usage
+                })
+
+            def _stream_chat(self, model: str, answer: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+
+                lines = answer.splitlines(keepends=True)
+                for i, piece in enumerate(lines):
+                    time.sleep(server.llm_token_latency)
+                    chunk = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": piece} if i else {"role": "assistant", "content": piece},
+                            "finish_reason": None
+                        }]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+
+                done = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+                }
+                self.wfile.write(f"data: {json.dumps(done)}\n\n".encode('utf-8'))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
@@ -0,0 +1,120 @@
+"""
+import 시간 프로파일 도구 (python -X importtime)
+- 모듈을 새 인터프리터에서 import해 전체 import 시간과 무거운 패키지 순위 리포트
+- 패키지별 시간은 최상위 이름(langchain, chromadb, numpy ...) 기준 self 시간 합계 (src.*는 모듈별)
+
+사용 예:
+    python benchmarks/import_profile.py
+    python benchmarks/import_profile.py src.rag_chain app --top 20
+"""
+
+import sys
+import os
+import time
+import argparse
+import subprocess
+from collections import defaultdict
+from typing import Dict, List
+
+# 저장소 루트 (측정용 인터프리터의 cwd/PYTHONPATH)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ["src.vectorstore", "src.rag_chain", "src.query_service"]
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    -X importtime 출력 파싱
+
+    형식: "import time: <self us> | <cumulative us> | <들여쓰기><모듈>"
+
+    Returns:
+        [{"module", "depth", "self_us", "cumulative_us"}]
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        rows.append({
+            "module": stripped,
+            # 들여쓰기 2칸 = 한 단계 (맨 앞 공백 1칸은 구분자)
+            "depth": (len(name) - len(stripped) - 1) // 2,
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1])
+        })
+    return rows
+
+
+def profile_imports(module: str, top: int = 10, python: str = sys.executable) -> Dict:
+    """
+    새 인터프리터에서 모듈 import 시간 측정
+
+    Args:
+        module: import할 모듈 이름
+        top: 리포트할 패키지 수
+        python: 파이썬 실행 파일
+
+    Returns:
+        {"total_ms", "wall_ms", "modules", "packages": [{"package", "self_ms"}]}
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (ROOT_DIR, env.get("PYTHONPATH")) if p)
+
+    started = time.perf_counter()
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    rows = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+        return {"error": error, "wall_ms": round(wall_ms, 1)}
+
+    target = [row for row in rows if row["module"] == module and row["depth"] == 0]
+    total_us = target[-1]["cumulative_us"] if target else sum(row["self_us"] for row in rows)
+
+    # 외부 패키지는 최상위 이름, 이 저장소 모듈(src.*)은 모듈별로 집계
+    packages = defaultdict(int)
+    for row in rows:
+        parts = row["module"].split(".")
+        packages[".".join(parts[:2]) if parts[0] == "src" else parts[0]] += row["self_us"]
+
+    ranked = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "wall_ms": round(wall_ms, 1),
+        "modules": len(rows),
+        "packages": [{"package": name, "self_ms": round(us / 1000, 1)} for name, us in ranked]
+    }
+
+
+def print_profile(module: str, profile: Dict) -> None:
+    """프로파일 출력"""
+    if "error" in profile:
+        print(f"{module}: import 실패 ({profile['error']})")
+        return
+    print(f"{module}: {profile['total_ms']:.1f} ms (프로세스 {profile['wall_ms']:.1f} ms, 모듈 {profile['modules']}개)")
+    for item in profile["packages"]:
+        print(f"  - {item['package']:<28} {item['self_ms']:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="모듈 import 시간 프로파일 (-X importtime)")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="import할 모듈")
+    parser.add_argument("--top", type=int, default=10, help="패키지 순위 개수")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        print_profile(module, profile_imports(module, top=args.top))
+        print()
+
+
+if __name__ == "__main__":
+    main()
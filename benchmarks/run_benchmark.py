@@ -0,0 +1,427 @@
+"""
+오프라인 벤치마크 도구
+- 가짜 임베딩/LLM 서버(지연 시간 설정 가능)로 네트워크 없이 실행
+- 콜드 스타트 (BM25 pickle, Chroma 로드), 모듈별 import 시간 (-X importtime)
+- 질의별 지연 시간 분포 (hybrid_search, process_query, 단계별 span)
+- 동시 사용자 N명 처리량
+- 모델 라우팅(--router) 시 설정별 호출 수, 출력 토큰, 재생성 횟수
+- 최대 RSS
+- JSON 리포트 저장 및 기준선(baseline) 비교
+
+사용 예:
+    python benchmarks/run_benchmark.py --llm-latency-ms 800 --concurrency 1,4,8
+    python benchmarks/run_benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmark.py --baseline benchmarks/baseline.json
+    python benchmarks/run_benchmark.py --router --router-small-max-tokens 200   # 재생성 경로 확인
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+import resource
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+# 상위 디렉토리를 경로에 추가
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+import yaml
+
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.import_profile import DEFAULT_MODULES, profile_imports
+
+
+DEFAULT_QUERIES = os.path.join(ROOT_DIR, "benchmarks", "queries.txt")
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+# 기준선 비교 시 "낮을수록 좋은" 지표와 "높을수록 좋은" 지표
+LOWER_IS_BETTER = ("_s", "_ms", "_mb")
+HIGHER_IS_BETTER = ("_qps",)
+
+
+def load_config(path: str) -> Dict:
+    """config.yaml 로드"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def load_queries(path: str) -> List[str]:
+    """질의 세트 로드 (.txt: 한 줄에 하나 / .jsonl: {"question": ...})"""
+    queries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if path.endswith('.jsonl'):
+                queries.append(json.loads(line)['question'])
+            else:
+                queries.append(line)
+    return queries
+
+
+def peak_rss_mb() -> float:
+    """현재 프로세스의 최대 RSS (MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 bytes 단위
+    if platform.system() == "Darwin":
+        return peak / 1024 / 1024
+    return peak / 1024
+
+
+def measure_cold_start(config: Dict) -> Dict:
+    """
+    콜드 스타트 측정 (모듈 import, BM25 pickle 로드, Chroma 로드)
+
+    Returns:
+        (지표 딕셔너리, vectorstore, bm25, bm25_chunks) 튜플
+    """
+    start = time.perf_counter()
+    from src import vectorstore as vectorstore_module
+    from src import rag_chain  # noqa: F401
+    import_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bm25, bm25_chunks = vectorstore_module.load_bm25_index(config['database']['bm25_path'])
+    bm25_load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorstore = vectorstore_module.load_vectorstore(config)
+    chroma_load_s = time.perf_counter() - start
+
+    metrics = {
+        "import_s": round(import_s, 4),
+        "bm25_load_s": round(bm25_load_s, 4),
+        "chroma_load_s": round(chroma_load_s, 4),
+        "total_s": round(import_s + bm25_load_s + chroma_load_s, 4),
+        "chunks": len(bm25_chunks)
+    }
+    return metrics, vectorstore, bm25, bm25_chunks
+
+
+def time_calls(func, queries: List[str]) -> List[float]:
+    """질의별 호출 시간 측정 (ms)"""
+    durations = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def measure_throughput(func, queries: List[str], users: int) -> Dict:
+    """
+    동시 사용자 N명이 각자 질의 세트를 순서대로 실행할 때의 처리량
+
+    Args:
+        func: 질의 처리 함수
+        queries: 질의 세트
+        users: 동시 사용자 수
+
+    Returns:
+        처리량 지표
+    """
+    from src.tracing import summarize_durations
+
+    def run_user(offset: int) -> List[float]:
+        # 사용자마다 시작 위치를 달리해 같은 질의가 동시에 몰리지 않게 함
+        rotated = queries[offset % len(queries):] + queries[:offset % len(queries)]
+        return time_calls(func, rotated)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        results = list(executor.map(run_user, range(users)))
+    wall_s = time.perf_counter() - start
+
+    latencies = [d for user_durations in results for d in user_durations]
+    return {
+        "users": users,
+        "requests": len(latencies),
+        "wall_s": round(wall_s, 4),
+        "throughput_qps": round(len(latencies) / wall_s, 3) if wall_s else 0.0,
+        "latency_ms": summarize_durations(latencies)
+    }
+
+
+def summarize_routing(records: List[Dict]) -> Dict:
+    """
+    route/llm/escalate span으로 라우팅 현황 집계
+
+    Args:
+        records: span 기록
+
+    Returns:
+        {"routes": {설정: 횟수}, "llm_calls": {설정: 횟수}, "completion_tokens": {설정: 합계}, "compact", "escalations"}
+    """
+    summary = {"routes": {}, "llm_calls": {}, "completion_tokens": {}, "compact": 0, "escalations": 0}
+    for record in records:
+        attrs = record.get("attrs", {})
+        if record["stage"] == "route":
+            tier = attrs.get("tier", "full")
+            summary["routes"][tier] = summary["routes"].get(tier, 0) + 1
+            summary["compact"] += int(bool(attrs.get("compact")))
+        elif record["stage"] == "llm":
+            tier = attrs.get("tier", "full")
+            summary["llm_calls"][tier] = summary["llm_calls"].get(tier, 0) + 1
+            summary["completion_tokens"][tier] = summary["completion_tokens"].get(tier, 0) + attrs.get("completion_tokens", 0)
+        elif record["stage"] == "escalate":
+            summary["escalations"] += 1
+    return summary
+
+
+def flatten_metrics(report: Dict, prefix: str = "") -> Dict[str, float]:
+    """중첩 리포트를 비교용 평면 지표로 변환"""
+    flat = {}
+    for key, value in report.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, name))
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict) and "users" in item:
+                    flat.update(flatten_metrics(item, f"{name}.users_{item['users']}"))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def _metric_direction(name: str) -> int:
+    """지표 방향 (1: 낮을수록 좋음, -1: 높을수록 좋음, 0: 비교 안 함)"""
+    parts = name.split('.')
+    leaf = parts[-1]
+    if leaf.endswith(HIGHER_IS_BETTER):
+        return -1
+    if leaf.endswith(LOWER_IS_BETTER):
+        return 1
+    if leaf in ("mean", "p50", "p95", "p99") and any(p.endswith("_ms") for p in parts[:-1]):
+        return 1
+    return 0
+
+
+def compare_with_baseline(report: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """
+    기준선 대비 회귀 지표 찾기
+
+    Args:
+        report: 현재 리포트
+        baseline: 기준선 리포트
+        tolerance: 허용 비율 (0.1 = 10%)
+
+    Returns:
+        회귀 지표 목록
+    """
+    current = flatten_metrics(report["metrics"])
+    previous = flatten_metrics(baseline["metrics"])
+
+    regressions = []
+    for name, value in current.items():
+        direction = _metric_direction(name)
+        base = previous.get(name)
+        if not direction or base is None or base <= 0:
+            continue
+
+        ratio = value / base
+        regressed = ratio > 1 + tolerance if direction > 0 else ratio < 1 - tolerance
+        if regressed:
+            regressions.append({
+                "metric": name,
+                "baseline": base,
+                "current": value,
+                "change_pct": round((ratio - 1) * 100, 1)
+            })
+
+    return regressions
+
+
+def run_benchmark(args) -> Dict:
+    """벤치마크 실행 및 리포트 생성"""
+    from src.tracing import configure_tracing, clear_spans, stage_percentiles, summarize_durations, get_recent_spans
+
+    config = load_config(args.config)
+    if args.router:
+        router = config['llm'].setdefault('router', {})
+        router['enabled'] = True
+        if args.router_small_max_tokens:
+            router.setdefault('small', {})['max_tokens'] = args.router_small_max_tokens
+    config.setdefault('embedding', {})['check_ctx_length'] = False
+    config['tracing'] = {"enabled": True, "buffer_size": 100000, "jsonl_path": None}
+    configure_tracing(config)
+
+    queries = load_queries(args.queries)
+    if args.limit:
+        queries = queries[:args.limit]
+
+    server = FakeOpenAIServer(
+        embedding_latency=args.embed_latency_ms / 1000,
+        llm_latency=args.llm_latency_ms / 1000,
+        dimensions=config['embedding'].get('dimensions', 1536)
+    ).start()
+
+    # 모든 OpenAI 호출을 가짜 서버로 보냄
+    os.environ["OPENAI_API_BASE"] = server.base_url
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["OPENAI_API_KEY"] = "sk-fake-benchmark"
+
+    try:
+        print("[0/4] import 시간 측정 중 (새 인터프리터)...")
+        import_time = {module: profile_imports(module) for module in args.import_modules}
+        
+        print("[1/4] 콜드 스타트 측정 중...")
+        cold_start, vectorstore, bm25, bm25_chunks = measure_cold_start(config)
+
+        from src.vectorstore import hybrid_search
+        from src.rag_chain import process_query
+
+        def search(query: str):
+            return hybrid_search(query, vectorstore, bm25, bm25_chunks, config)
+
+        def answer(query: str):
+            return process_query(query, vectorstore, bm25, bm25_chunks, config)
+
+        # 워밍업 (연결 수립, lazy 초기화 제외)
+        for query in queries[:args.warmup]:
+            answer(query)
+
+        print("[2/4] hybrid_search 지연 시간 측정 중...")
+        clear_spans()
+        search_ms = []
+        for _ in range(args.repeat):
+            search_ms.extend(time_calls(search, queries))
+
+        print("[3/4] process_query 지연 시간 측정 중...")
+        answer_ms = []
+        for _ in range(args.repeat):
+            answer_ms.extend(time_calls(answer, queries))
+        stages = stage_percentiles()
+        routing = summarize_routing(get_recent_spans())
+
+        print("[4/4] 동시 사용자 처리량 측정 중...")
+        throughput = [
+            measure_throughput(answer, queries, users)
+            for users in args.concurrency
+        ]
+
+        fake_requests = dict(server.request_counts)
+    finally:
+        server.stop()
+
+    return {
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "settings": {
+            "queries": len(queries),
+            "repeat": args.repeat,
+            "embed_latency_ms": args.embed_latency_ms,
+            "llm_latency_ms": args.llm_latency_ms,
+            "concurrency": args.concurrency,
+            "retrieval": config['retrieval'],
+            "router": config['llm'].get('router') if args.router else None
+        },
+        "metrics": {
+            "cold_start": cold_start,
+            "import_time": import_time,
+            "hybrid_search_ms": summarize_durations(search_ms),
+            "process_query_ms": summarize_durations(answer_ms),
+            "stages_ms": stages,
+            "throughput": throughput,
+            "routing": routing,
+            "peak_rss_mb": round(peak_rss_mb(), 1)
+        },
+        "fake_server_requests": fake_requests
+    }
+
+
+def print_summary(report: Dict) -> None:
+    """리포트 요약 출력"""
+    metrics = report["metrics"]
+    print()
+    print("=" * 80)
+    print("벤치마크 결과")
+    print("=" * 80)
+    cold = metrics["cold_start"]
+    print(f"콜드 스타트: {cold['total_s']:.3f}s "
+          f"(import {cold['import_s']:.3f}s, BM25 {cold['bm25_load_s']:.3f}s, Chroma {cold['chroma_load_s']:.3f}s)")
+    for module, profile in metrics.get("import_time", {}).items():
+        if "error" in profile:
+            print(f"import {module}: 실패 ({profile['error']})")
+            continue
+        heaviest = ", ".join(f"{p['package']} {p['self_ms']:.0f}ms" for p in profile["packages"][:3])
+        print(f"import {module}: {profile['total_ms']:.1f} ms ({heaviest})")
+    for name in ("hybrid_search_ms", "process_query_ms"):
+        m = metrics[name]
+        print(f"{name}: p50 {m['p50']:.1f} / p95 {m['p95']:.1f} / p99 {m['p99']:.1f} ms")
+    print("단계별 (ms):")
+    for stage, m in sorted(metrics["stages_ms"].items()):
+        print(f"  - {stage:<10} p50 {m['p50']:>9.2f}  p95 {m['p95']:>9.2f}  p99 {m['p99']:>9.2f}  (n={m['count']})")
+    routing = metrics.get("routing") or {}
+    if routing.get("routes"):
+        print(f"라우팅: {routing['routes']}, 축약 템플릿 {routing['compact']}회, 재생성 {routing['escalations']}회")
+        print(f"  LLM 호출 {routing['llm_calls']}, 출력 토큰 {routing['completion_tokens']}")
+    for t in metrics["throughput"]:
+        print(f"동시 {t['users']}명: {t['throughput_qps']:.2f} qps, p95 {t['latency_ms']['p95']:.1f} ms")
+    print(f"최대 RSS: {metrics['peak_rss_mb']:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 검색/응답 지연 시간 벤치마크")
+    parser.add_argument("--config", default=os.path.join(ROOT_DIR, "config.yaml"))
+    parser.add_argument("--queries", default=DEFAULT_QUERIES, help="질의 세트 (.txt 또는 .jsonl)")
+    parser.add_argument("--limit", type=int, default=0, help="사용할 질의 수 (0이면 전체)")
+    parser.add_argument("--repeat", type=int, default=1, help="질의 세트 반복 횟수")
+    parser.add_argument("--warmup", type=int, default=2, help="워밍업 질의 수")
+    parser.add_argument("--embed-latency-ms", type=float, default=50.0, help="가짜 임베딩 서버 지연")
+    parser.add_argument("--llm-latency-ms", type=float, default=500.0, help="가짜 LLM 서버 지연")
+    parser.add_argument("--concurrency", default="1,4,8", help="동시 사용자 수 목록 (쉼표 구분)")
+    parser.add_argument("--output", default=None, help="리포트 저장 경로 (기본: benchmarks/results/<시각>.json)")
+    parser.add_argument("--baseline", default=None, help="비교할 기준선 리포트")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="회귀 허용 비율")
+    parser.add_argument("--save-baseline", default=None, help="이번 결과를 기준선으로 저장할 경로")
+    parser.add_argument("--router", action="store_true", help="모델/출력 토큰 라우팅(llm.router) 사용")
+    parser.add_argument("--router-small-max-tokens", type=int, default=0,
+                        help="하위 설정 max_tokens 덮어쓰기 (작게 주면 잘린 답변 → 재생성 경로 확인)")
+    parser.add_argument("--import-modules", default=",".join(DEFAULT_MODULES), help="import 시간 측정 모듈 (쉼표 구분)")
+    args = parser.parse_args()
+    args.concurrency = [int(n) for n in args.concurrency.split(',') if n.strip()]
+    args.import_modules = [m for m in args.import_modules.split(',') if m.strip()]
+
+    # config.yaml의 상대 경로(./data/...)가 동작하도록 저장소 루트에서 실행
+    os.chdir(ROOT_DIR)
+
+    report = run_benchmark(args)
+    print_summary(report)
+
+    output = args.output
+    if output is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+        output = os.path.join(DEFAULT_OUTPUT_DIR, datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+
+    for path in filter(None, [output, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"리포트 저장: {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        print()
+        if regressions:
+            print(f"❌ 기준선 대비 회귀 {len(regressions)}건 (허용 {args.tolerance:.0%}):")
+            for r in regressions:
+                print(f"  - {r['metric']}: {r['baseline']} → {r['current']} ({r['change_pct']:+.1f}%)")
+            sys.exit(1)
+        print("✅ 기준선 대비 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
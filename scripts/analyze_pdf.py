@@ -3,33 +3,96 @@ PDF 구조 분석 도구
 - PDF 기본 정보 추출
 - 문서 구조 분석
 - 청킹 전략 제안
+
+페이지 텍스트는 추출 캐시(config.yaml의 pdf.extraction_cache, create_database.py와 공유)에서 한 페이지씩 읽어 집계한다.
+
+사용 예:
+    python scripts/analyze_pdf.py
+    python scripts/analyze_pdf.py "2025 학교 업무매뉴얼 교무(최종).pdf" --no-cache
 """
 
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import fitz  # PyMuPDF
 import re
+import argparse
 from collections import Counter
 
+import yaml
+
+from src.extraction_cache import ExtractionCache
+
+
+# 제목 패턴
+TITLE_PATTERNS = [
+    ("roman", re.compile(r'^([ⅠⅡⅢⅣⅤⅥⅦⅧⅨⅩ]+)\.\s*(.+)$', re.MULTILINE), 5),
+    ("number", re.compile(r'^(\d+)\.\s+([가-힣].+)$', re.MULTILINE), 10),
+    ("hyphen", re.compile(r'^(\d+-\d+)\s+(.+)$', re.MULTILINE), 10)
+]
+
+# 법령 패턴
+LAW_PATTERNS = [
+    (re.compile(r'제\s*\d+조'), '법 조항'),
+    (re.compile(r'[가-힣]+법\s*제'), '법명'),
+    (re.compile(r'시행령'), '시행령'),
+    (re.compile(r'시행규칙'), '시행규칙')
+]
+
+# 서식 패턴
+FORM_PATTERNS = [
+    (re.compile(r'서식\s*\d+'), '서식 번호'),
+    (re.compile(r'<서식[^>]*>'), '서식 태그1'),
+    (re.compile(r'【서식[^】]*】'), '서식 태그2')
+]
+
 
-def analyze_pdf_structure(pdf_path: str):
+def load_config() -> dict:
+    """config.yaml 로드"""
+    with open('config.yaml', 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def analyze_pdf_structure(pdf_path: str, cache_path: str = None):
     """
-    PDF 구조 상세 분석
+    PDF 구조 상세 분석 (페이지 단위로 집계)
     
     Args:
         pdf_path: PDF 파일 경로
+        cache_path: 페이지 추출 캐시 경로 (None이면 메모리에만 저장)
     """
-    try:
-        doc = fitz.open(pdf_path)
-    except FileNotFoundError:
+    if not os.path.exists(pdf_path):
         print(f"❌ 오류: PDF 파일을 찾을 수 없습니다: {pdf_path}")
         return
+    
+    # 페이지를 순회하며 집계 (전체 텍스트를 한 문자열로 만들지 않음)
+    char_counts = []
+    title_counts = Counter()
+    title_samples = {name: [] for name, _, _ in TITLE_PATTERNS}
+    pattern_counts = Counter()
+    
+    try:
+        with ExtractionCache(cache_path) as cache:
+            for page_data in cache.iter_pages(pdf_path):
+                text = page_data['text']
+                char_counts.append(len(text))
+    
+                for name, pattern, sample_size in TITLE_PATTERNS:
+                    matches = pattern.findall(text)
+                    title_counts[name] += len(matches)
+                    samples = title_samples[name]
+                    samples.extend(matches[:sample_size - len(samples)])
+    
+                for pattern, name in LAW_PATTERNS + FORM_PATTERNS:
+                    pattern_counts[name] += len(pattern.findall(text))
     except Exception as e:
         print(f"❌ 오류: {str(e)}")
         return
     
+    if not char_counts:
+        print("❌ 오류: 페이지가 없습니다.")
+        return
+    
     print("=" * 80)
     print("PDF 구조 분석 보고서")
     print("=" * 80)
@@ -39,53 +102,33 @@ def analyze_pdf_structure(pdf_path: str):
     print("📌 1. PDF 기본 정보")
     print("-" * 80)
     print(f"파일명: {os.path.basename(pdf_path)}")
-    print(f"총 페이지 수: {len(doc)} 페이지")
+    print(f"총 페이지 수: {len(char_counts)} 페이지")
     print(f"파일 크기: {os.path.getsize(pdf_path):,} bytes ({os.path.getsize(pdf_path)/1024/1024:.2f} MB)")
-    print(f"텍스트 추출 가능 여부: 가능" if doc[0].get_text() else "불가능")
+    print(f"텍스트 추출 가능 여부: 가능" if char_counts[0] else "불가능")
+    print(f"추출 캐시: 재사용 {cache.hits}페이지, 새로 추출 {cache.misses}페이지")
     print()
     
     # 2. 문서 구조 분석
     print("📌 2. 문서 구조 분석")
     print("-" * 80)
     
-    # 모든 텍스트 추출
-    all_text = ""
-    char_counts = []
-    
-    for page_num, page in enumerate(doc, start=1):
-        text = page.get_text()
-        all_text += text
-        char_counts.append(len(text))
-    
     # 제목 패턴 분석
     print("[목차 샘플 - 처음 20개 항목]:")
     
-    # 로마숫자 패턴
-    roman_pattern = r'^([ⅠⅡⅢⅣⅤⅥⅦⅧⅨⅩ]+)\.\s*(.+)$'
-    roman_matches = re.findall(roman_pattern, all_text, re.MULTILINE)
-    
-    # 숫자 패턴
-    number_pattern = r'^(\d+)\.\s+([가-힣].+)$'
-    number_matches = re.findall(number_pattern, all_text, re.MULTILINE)
-    
-    # 하이픈 패턴
-    hyphen_pattern = r'^(\d+-\d+)\s+(.+)$'
-    hyphen_matches = re.findall(hyphen_pattern, all_text, re.MULTILINE)
-    
     count = 0
-    for match in roman_matches[:5]:
+    for match in title_samples["roman"]:
         print(f"  [Level 1] {match[0]}. {match[1]}")
         count += 1
         if count >= 20:
             break
     
-    for match in number_matches[:10]:
+    for match in title_samples["number"]:
         print(f"    [Level 2] {match[0]}. {match[1]}")
         count += 1
         if count >= 20:
             break
     
-    for match in hyphen_matches[:10]:
+    for match in title_samples["hyphen"]:
         print(f"      [Level 3] {match[0]} {match[1]}")
         count += 1
         if count >= 20:
@@ -93,9 +136,9 @@ def analyze_pdf_structure(pdf_path: str):
     
     print()
     print(f"발견된 제목 수:")
-    print(f"  - 대분류 (로마숫자): {len(roman_matches)}개")
-    print(f"  - 중분류 (숫자): {len(number_matches)}개")
-    print(f"  - 소분류 (하이픈): {len(hyphen_matches)}개")
+    print(f"  - 대분류 (로마숫자): {title_counts['roman']}개")
+    print(f"  - 중분류 (숫자): {title_counts['number']}개")
+    print(f"  - 소분류 (하이픈): {title_counts['hyphen']}개")
     print()
     
     # 3. 텍스트 밀도
@@ -111,35 +154,15 @@ def analyze_pdf_structure(pdf_path: str):
     print("📌 4. 특수 요소 탐지")
     print("-" * 80)
     
-    # 법령 패턴
-    law_patterns = [
-        (r'제\s*\d+조', '법 조항'),
-        (r'[가-힣]+법\s*제', '법명'),
-        (r'시행령', '시행령'),
-        (r'시행규칙', '시행규칙')
-    ]
-    
-    for pattern, name in law_patterns:
-        matches = re.findall(pattern, all_text)
-        print(f"  - {name}: {len(matches)}회 등장")
-    
-    # 서식 패턴
-    form_patterns = [
-        (r'서식\s*\d+', '서식 번호'),
-        (r'<서식[^>]*>', '서식 태그1'),
-        (r'【서식[^】]*】', '서식 태그2')
-    ]
-    
-    for pattern, name in form_patterns:
-        matches = re.findall(pattern, all_text)
-        print(f"  - {name}: {len(matches)}회 등장")
+    for _, name in LAW_PATTERNS + FORM_PATTERNS:
+        print(f"  - {name}: {pattern_counts[name]}회 등장")
     
     print()
     
     # 5. 청킹 전략 제안
     print("📌 5. 청킹 전략 제안")
     print("-" * 80)
-    print(f"권장 청크 크기: 1000-1500자 (평균 페이지 크기의 약 {1200/avg_chars:.1f}배)")
+    print(f"권장 청크 크기: 1000-1500자 (평균 페이지 크기의 약 {1200/max(avg_chars, 1):.1f}배)")
     print(f"권장 오버랩: 150-200자")
     print()
     print("권장 구분자 우선순위:")
@@ -154,17 +177,24 @@ def analyze_pdf_structure(pdf_path: str):
     print("✅ 분석 완료!")
     print("=" * 80)
     
-    doc.close()
-
 
 if __name__ == "__main__":
-    # PDF 파일 경로
-    pdf_path = "2025 학교 업무매뉴얼 행정(최종).pdf"
-    
-    if not os.path.exists(pdf_path):
-        print(f"❌ 오류: PDF 파일을 찾을 수 없습니다: {pdf_path}")
+    parser = argparse.ArgumentParser(description="PDF 구조 분석")
+    parser.add_argument("pdf_path", nargs="?", default="2025 학교 업무매뉴얼 행정(최종).pdf", help="PDF 파일 경로")
+    parser.add_argument("--cache", default=None,
+                        help="페이지 추출 캐시 경로 (기본값: config.yaml의 pdf.extraction_cache)")
+    parser.add_argument("--no-cache", action="store_true", help="추출 캐시를 사용하지 않음")
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.pdf_path):
+        print(f"❌ 오류: PDF 파일을 찾을 수 없습니다: {args.pdf_path}")
         print(f"현재 디렉토리: {os.getcwd()}")
         print(f"파일 목록: {os.listdir('.')}")
         sys.exit(1)
     
-    analyze_pdf_structure(pdf_path)
+    # create_database.py / build_faq.py와 같은 캐시를 쓰도록 config.yaml 경로를 기본값으로 사용
+    cache_path = None
+    if not args.no_cache:
+        cache_path = args.cache or (load_config().get('pdf') or {}).get('extraction_cache')
+
+    analyze_pdf_structure(args.pdf_path, cache_path)
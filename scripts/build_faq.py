@@ -0,0 +1,149 @@
+"""
+FAQ 답변 저장소 생성 도구
+- 매뉴얼 목차(대분류/중분류/소분류)에서 소분류마다 대표 질문 생성 ("<소분류> 절차는?")
+- process_query를 병렬로 실행 (분당 요청 수 제한)
+- 6개 섹션이 모두 있는 답변만 질문 임베딩과 함께 저장
+
+사용 예:
+    python scripts/build_faq.py --dry-run            # 생성될 질문만 출력
+    python scripts/build_faq.py --workers 4 --rate 60
+"""
+
+import sys
+import os
+import time
+import argparse
+import threading
+from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import yaml
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+# 상위 디렉토리를 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pdf_processor import extract_text_from_pdf, extract_headings
+from src.vectorstore import load_vectorstore, load_bm25_index, check_database_exists
+from src.rag_chain import process_query
+from src.response_formatter import validate_response_structure
+from src.faq_store import FAQStore, canonical_question
+from src.corpus_registry import CorpusRegistry
+
+
+def load_config() -> dict:
+    """config.yaml 로드"""
+    with open('config.yaml', 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+class RateLimiter:
+    """분당 요청 수 제한 (요청 시작 간격을 균등하게 유지)"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="목차 기반 FAQ 답변 저장소 생성")
+    parser.add_argument("--collection", default=None, help="컬렉션 이름 (기본값: 기본 컬렉션)")
+    parser.add_argument("--workers", type=int, default=4, help="병렬 실행 수")
+    parser.add_argument("--rate", type=float, default=60, help="분당 최대 질의 수")
+    parser.add_argument("--limit", type=int, default=None, help="처리할 최대 질문 수")
+    parser.add_argument("--overwrite", action="store_true", help="이미 저장된 질문도 다시 생성")
+    parser.add_argument("--dry-run", action="store_true", help="질문 목록만 출력")
+    args = parser.parse_args()
+
+    load_dotenv()
+    config = load_config()
+    registry = CorpusRegistry(config)
+    config = registry.collection_config(args.collection or registry.default)
+
+    # 1. 목차 → 대표 질문
+    pdf_path = config['pdf']['source_file']
+    print(f"[1/3] 목차 추출 중: {pdf_path}")
+    headings = extract_headings(extract_text_from_pdf(pdf_path, config['pdf'].get('extraction_cache')))
+    jobs = {}
+    for heading in headings:
+        jobs.setdefault(canonical_question(heading), heading)
+    questions = list(jobs)[:args.limit] if args.limit else list(jobs)
+    print(f"      ✓ 소분류 {len(headings)}개 → 질문 {len(questions)}개")
+
+    if args.dry_run:
+        for question in questions:
+            heading = jobs[question]
+            print(f"  - {question}  ({heading['level1']} > {heading['level2']}, {heading['page']}페이지)")
+        return
+
+    if not os.getenv('OPENAI_API_KEY'):
+        print("❌ 오류: OPENAI_API_KEY가 설정되지 않았습니다.")
+        sys.exit(1)
+
+    database = config['database']
+    if not check_database_exists(database['chroma_path'], database['bm25_path']):
+        print("❌ 오류: 데이터베이스가 없습니다. `python scripts/create_database.py`를 먼저 실행해 주세요.")
+        sys.exit(1)
+
+    faq_path = (config.get('faq') or {}).get('store_path', './data/faq_store.sqlite')
+
+    # 2. 인덱스 로드 (생성 중에는 FAQ 조회를 끔)
+    print("[2/3] 인덱스 로드 중...")
+    vectorstore = load_vectorstore(config)
+    bm25, chunks = load_bm25_index(database['bm25_path'])
+    run_config = deepcopy(config)
+    run_config['faq'] = {'enabled': False}
+
+    store = FAQStore(faq_path, build_id=bm25.build_id)
+    if not args.overwrite:
+        questions = [q for q in questions if store.lookup(q)[0] is None]
+    print(f"      ✓ 생성할 질문 {len(questions)}개 (빌드 ID: {bm25.build_id})")
+
+    # 3. 병렬 생성 + 검증 + 저장
+    print(f"[3/3] 답변 생성 중 (병렬 {args.workers}개, 분당 {args.rate:.0f}회)...")
+    limiter = RateLimiter(args.rate)
+
+    def answer_one(question: str):
+        limiter.wait()
+        answer = process_query(question, vectorstore, bm25, chunks, run_config)
+        sections = validate_response_structure(answer)
+        if not all(sections.values()):
+            return question, None
+        return question, answer
+
+    saved, rejected = 0, []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(answer_one, question) for question in questions]
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            question, answer = future.result()
+            if answer is None:
+                rejected.append(question)
+                continue
+            heading = jobs[question]
+            store.put(
+                question, answer, vectorstore.embeddings.embed_query(question),
+                heading=" > ".join(h for h in (heading['level1'], heading['level2'], heading['level3']) if h),
+                page=heading['page'],
+                build_id=bm25.build_id
+            )
+            saved += 1
+
+    store.commit()
+    print()
+    print(f"✅ 저장 {saved}개, 검증 실패 {len(rejected)}개 (전체 {len(store)}개): {faq_path}")
+    for question in rejected[:20]:
+        print(f"   ✗ {question}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+프로파일 스냅샷 비교 도구
+- create_database.py --profile로 저장한 두 스냅샷(.pstats 또는 .tracemalloc)의 상위 N개 차이 출력
+- 하나만 주면 상위 핫스팟 출력
+
+사용 예:
+    python scripts/compare_profiles.py data/profiles/20250101_120000/chunking.pstats
+    python scripts/compare_profiles.py data/profiles/A/chunking.pstats data/profiles/B/chunking.pstats --top 30
+"""
+
+import sys
+import os
+import argparse
+
+# 상위 디렉토리를 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.profiling import load_table, top_cpu, top_memory, diff_cpu, diff_memory
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="프로파일 스냅샷 비교")
+    parser.add_argument("before", help="기준 스냅샷 (.pstats | .tracemalloc)")
+    parser.add_argument("after", nargs="?", default=None, help="비교 스냅샷 (생략하면 기준 스냅샷의 상위 핫스팟)")
+    parser.add_argument("--top", type=int, default=20, help="출력할 항목 수")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    memory = args.before.endswith(".tracemalloc")
+    if args.after is not None and args.after.endswith(".tracemalloc") != memory:
+        print("❌ 오류: 같은 종류의 스냅샷끼리만 비교할 수 있습니다.")
+        sys.exit(1)
+
+    before = load_table(args.before)
+    if args.after is None:
+        if memory:
+            print(f"{'크기(KB)':>12} {'개수':>8}  위치")
+            for row in top_memory(before, args.top):
+                print(f"{row['size_kb']:>12.1f} {row['count']:>8}  {row['location']}")
+        else:
+            print(f"{'자체(ms)':>12} {'누적(ms)':>12} {'호출':>8}  함수")
+            for row in top_cpu(before, args.top):
+                print(f"{row['tottime']:>12.1f} {row['cumtime']:>12.1f} {row['calls']:>8}  {row['function']}")
+        return
+
+    after = load_table(args.after)
+    if memory:
+        print(f"{'기준(KB)':>12} {'비교(KB)':>12} {'차이(KB)':>12}  위치")
+        for row in diff_memory(before, after, args.top):
+            print(f"{row['before_kb']:>12.1f} {row['after_kb']:>12.1f} {row['delta_kb']:>+12.1f}  {row['location']}")
+    else:
+        print(f"{'기준(ms)':>12} {'비교(ms)':>12} {'차이(ms)':>12}  함수")
+        for row in diff_cpu(before, after, args.top):
+            print(f"{row['before_ms']:>12.1f} {row['after_ms']:>12.1f} {row['delta_ms']:>+12.1f}  {row['function']}")
+
+
+if __name__ == "__main__":
+    main()
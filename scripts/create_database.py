@@ -3,11 +3,15 @@
 - PDF 파싱
 - 청킹
 - ChromaDB 및 BM25 인덱스 생성
+
+--profile cpu|mem: 단계별(extraction, chunking, embedding, bm25) cProfile/tracemalloc 스냅샷 저장
+  (scripts/compare_profiles.py로 두 빌드의 스냅샷 비교)
 """
 
 import sys
 import os
 import time
+import argparse
 import yaml
 from datetime import datetime
 from dotenv import load_dotenv
@@ -15,8 +19,17 @@ from dotenv import load_dotenv
 # 상위 디렉토리를 경로에 추가
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.pdf_processor import process_pdf
-from src.vectorstore import create_vectorstore, create_bm25_index, check_database_exists
+from src.pdf_processor import extract_text_from_pdf, chunk_pages
+from src.vectorstore import (
+    create_vectorstore, create_bm25_index, check_database_exists, get_build_id, new_build_id, BUILD_ID_SUFFIX
+)
+from src.retrieval_cache import get_retrieval_cache
+from src.vector_index import build_vector_index, default_index_path
+from src.reference_index import ReferenceIndex, default_reference_path
+from src.synonyms import SynonymIndex, default_synonym_path
+from src.chunk_store import ChunkStore
+from src.corpus_registry import CorpusRegistry
+from src.profiling import BuildProfiler, PROFILE_MODES
 from tqdm import tqdm
 
 
@@ -26,7 +39,30 @@ def load_config() -> dict:
         return yaml.safe_load(f)
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="학교 업무매뉴얼 데이터베이스 생성")
+    parser.add_argument(
+        "--collection",
+        default=None,
+        help="생성할 컬렉션 이름 (config.yaml의 corpora.collections, 기본값: 기본 컬렉션)"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILE_MODES,
+        default=None,
+        help="단계별 프로파일링 (cpu: cProfile, mem: tracemalloc)"
+    )
+    parser.add_argument(
+        "--profile-dir",
+        default=None,
+        help="프로파일 저장 디렉토리 (기본값: config.yaml의 profiling.output_dir/<시각>)"
+    )
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    
     print("=" * 80)
     print("학교 행정매뉴얼 데이터베이스 생성")
     print("=" * 80)
@@ -46,11 +82,24 @@ def main():
     print("[1/6] config.yaml 로드 중... ", end='')
     try:
         config = load_config()
-        print("✓")
+        
+        # 컬렉션별 PDF/DB 경로 적용
+        registry = CorpusRegistry(config)
+        collection = args.collection or registry.default
+        config = registry.collection_config(collection)
+        print(f"✓ (컬렉션: {collection})")
     except Exception as e:
         print(f"✗\n❌ 오류: {e}")
         sys.exit(1)
     
+    profiling_config = config.get('profiling') or {}
+    profile_dir = args.profile_dir or os.path.join(
+        profiling_config.get('output_dir', './data/profiles'), datetime.now().strftime("%Y%m%d_%H%M%S")
+    )
+    profiler = BuildProfiler(args.profile, profile_dir, top_n=profiling_config.get('build_top_n', 10))
+    if args.profile:
+        print(f"      프로파일링: {args.profile} → {profile_dir}")
+    
     # 2. PDF 파일 확인
     pdf_path = config['pdf']['source_file']
     print(f"[2/6] PDF 파일 확인 중... ", end='')
@@ -76,9 +125,17 @@ def main():
             print("   취소되었습니다.")
             sys.exit(0)
         
+        # 이전 빌드의 검색 캐시 항목 삭제
+        old_build_id = get_build_id(bm25_path)
+        cache = get_retrieval_cache(config)
+        if cache is not None and old_build_id:
+            removed = cache.invalidate_build(old_build_id)
+            cache.save()
+            print(f"   검색 캐시 {removed}건을 삭제했습니다.")
+        
         # 백업 생성
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_dir = f"./data/backup_{timestamp}"
+        backup_dir = f"./data/backup_{collection}_{timestamp}"
         print(f"   기존 DB를 백업합니다: {backup_dir}")
         
         os.makedirs(backup_dir, exist_ok=True)
@@ -91,14 +148,33 @@ def main():
             import shutil
             shutil.move(bm25_path, os.path.join(backup_dir, "bm25_index.pkl"))
         
+        if os.path.exists(bm25_path + BUILD_ID_SUFFIX):
+            import shutil
+            shutil.move(bm25_path + BUILD_ID_SUFFIX, os.path.join(backup_dir, "bm25_index.pkl" + BUILD_ID_SUFFIX))
+        
+        if os.path.exists(default_index_path(config)):
+            import shutil
+            shutil.move(default_index_path(config), os.path.join(backup_dir, "vector_index"))
+        
         print("   ✓ 백업 완료")
         print()
     
     # 4. PDF 파싱 및 청킹
     print("[3/6] PDF 파싱 및 청킹 중...")
     try:
-        chunks = process_pdf(pdf_path, config)
+        dedup_report = {}
+        with profiler.phase("extraction"):
+            pages_data = extract_text_from_pdf(pdf_path, (config.get('pdf') or {}).get('extraction_cache'))
+        with profiler.phase("chunking"):
+            chunks = chunk_pages(pages_data, config, report=dedup_report)
+        # 검색 캐시가 BM25 청크 위치로 결과를 저장하므로 청크 ID 부여
+        for i, chunk in enumerate(chunks):
+            chunk.metadata['chunk_id'] = i
         print(f"      ✓ 총 {len(chunks)}개 청크 생성")
+        if dedup_report:
+            print(f"      머리말/꼬리말 제거: {dedup_report.get('header_lines', 0)}줄")
+            print(f"      중복 청크 합침: {dedup_report['before']}개 → {dedup_report['after']}개 "
+                  f"({dedup_report['groups']}개 묶음, 중복 비율 {dedup_report['ratio']:.1%})")
     except Exception as e:
         print(f"      ✗ 오류: {e}")
         sys.exit(1)
@@ -107,22 +183,49 @@ def main():
     print("[4/6] ChromaDB 생성 중...")
     try:
         # 진행률 표시를 위한 tqdm (실제로는 임베딩 생성 중)
-        vectorstore = create_vectorstore(chunks, config)
+        with profiler.phase("embedding"):
+            vectorstore = create_vectorstore(chunks, config)
         print(f"      ✓ 저장 경로: {chroma_path}")
     except Exception as e:
         print(f"      ✗ 오류: {e}")
         sys.exit(1)
     
     # 6. BM25 인덱스 생성
-    print("[5/6] BM25 인덱스 생성 중... ", end='')
+    # 프로파일 출력이 이어지면 줄을 바꿈
+    print("[5/6] BM25 인덱스 생성 중... ", end='\n' if args.profile else '')
     try:
-        bm25 = create_bm25_index(chunks, bm25_path)
+        build_id = new_build_id()
+        with profiler.phase("bm25"):
+            bm25 = create_bm25_index(chunks, bm25_path, build_id=build_id)
         print("✓")
         print(f"      저장 경로: {bm25_path}")
+        print(f"      빌드 ID: {build_id}")
     except Exception as e:
         print(f"✗\n      오류: {e}")
         sys.exit(1)
     
+    # 법령/서식 참조 색인 (참조 위치 질의 빠른 경로)
+    if (config.get('reference_index') or {}).get('enabled', False):
+        reference_index = ReferenceIndex.build((chunk.page_content for chunk in chunks), build_id=build_id)
+        reference_index.save(default_reference_path(bm25_path))
+        print(f"      참조 색인: {len(reference_index.entries)}개 키")
+    
+    # 동의어/약어 사전 (괄호 정의 + 동시 출현, 질의 확장용)
+    if (config.get('synonyms') or {}).get('enabled', False):
+        synonym_index = SynonymIndex.build((chunk.page_content for chunk in chunks), config, build_id=build_id)
+        synonym_index.save(default_synonym_path(bm25_path))
+        print(f"      동의어 사전: {len(synonym_index.synonyms)}개 용어")
+    
+    # 7. 로컬 양자화 벡터 인덱스 (선택, BM25 후보 재정렬 모드에서도 필요)
+    if (config.get('vector_index') or {}).get('enabled', False) or config['retrieval'].get('mode') == "prefilter":
+        print("      로컬 벡터 인덱스 생성 중... ", end='')
+        try:
+            index = build_vector_index(vectorstore, ChunkStore.from_documents(chunks), config, build_id=build_id)
+            print("✓")
+            print(f"      {index.meta['dtype']}, {index.dimensions}차원, {index.nbytes() / 1024 / 1024:.1f}MB")
+        except Exception as e:
+            print(f"✗\n      오류: {e} (Chroma 검색을 사용합니다)")
+    
     # 완료
     elapsed_time = time.time() - start_time
     minutes = int(elapsed_time // 60)
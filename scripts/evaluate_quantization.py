@@ -0,0 +1,188 @@
+"""
+벡터 인덱스 양자화/차원 축소 평가 도구
+- Chroma에 저장된 임베딩을 내보내 float32 / float16 / int8, 절단 차원별로 인덱스 생성
+- 원본 float32 전체 검색 대비 recall@k, 인덱스 크기, 검색 시간 리포트
+- --build: config.yaml의 vector_index 설정으로 로컬 인덱스 생성 (기존 DB용)
+
+질의는 기본적으로 저장된 벡터 중 일부를 사용하고 (API 호출 없음),
+--queries를 주면 실제 질문을 임베딩해 사용한다.
+
+사용 예:
+    python scripts/evaluate_quantization.py
+    python scripts/evaluate_quantization.py --queries benchmarks/queries.txt --dimensions 256,512,1024
+    python scripts/evaluate_quantization.py --build
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import itertools
+from datetime import datetime
+from typing import Dict, List
+
+import yaml
+import numpy as np
+from dotenv import load_dotenv
+
+# 상위 디렉토리를 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.vectorstore import load_vectorstore, load_bm25_index
+from src.vector_index import (
+    VectorIndex, SUPPORTED_DTYPES, supports_truncation, truncate_normalize,
+    export_from_chroma, build_vector_index, read_embedding_spec
+)
+from src.corpus_registry import CorpusRegistry
+from src.tracing import summarize_durations
+
+
+def load_config() -> dict:
+    """config.yaml 로드"""
+    with open('config.yaml', 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def parse_int_list(value: str) -> List[int]:
+    """'256,512' → [256, 512]"""
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def load_queries(path: str) -> List[str]:
+    """질문 목록 (한 줄에 하나, #으로 시작하면 주석)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    """원본 float32 전체 검색 정답 (행 번호 집합)"""
+    scores = queries @ vectors.T
+    return [set(np.argsort(-row)[:k].tolist()) for row in scores]
+
+
+def evaluate_variant(vectors: np.ndarray, queries: np.ndarray, truth: List[set], k: int,
+                     dtype: str, dimensions: int, rescore_k: int) -> Dict:
+    """
+    하나의 인덱스 설정 평가
+
+    Returns:
+        설정 + recall@k, 크기, 검색 시간
+    """
+    rows = np.arange(len(vectors))
+    index = VectorIndex.build(vectors, rows, dtype=dtype, dimensions=dimensions)
+    if not rescore_k:
+        index.full = None
+
+    recalls, durations = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        found, _ = index.search(query, k=k, rescore_k=rescore_k)
+        durations.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(expected & set(found)) / len(expected))
+
+    latency = summarize_durations(durations)
+    return {
+        "dtype": dtype,
+        "dimensions": index.dimensions,
+        "rescore_k": rescore_k,
+        "recall@k": round(float(np.mean(recalls)), 4),
+        "index_mb": round(index.nbytes() / 1024 / 1024, 2),
+        "search_ms_p50": latency["p50"],
+        "search_ms_p95": latency["p95"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벡터 인덱스 양자화/차원 축소 평가")
+    parser.add_argument("--collection", default=None, help="컬렉션 이름 (기본값: 기본 컬렉션)")
+    parser.add_argument("--queries", default=None, help="질문 파일 (없으면 저장된 벡터를 질의로 사용)")
+    parser.add_argument("--sample", type=int, default=200, help="저장된 벡터 질의 수")
+    parser.add_argument("--k", type=int, default=12, help="recall@k의 k (기본값: vector_top_k)")
+    parser.add_argument("--dtypes", default=",".join(SUPPORTED_DTYPES))
+    parser.add_argument("--dimensions", default="256,512,1024", help="절단 차원 (text-embedding-3 계열만)")
+    parser.add_argument("--rescore-k", default="0,50", help="rescoring 후보 수 (0이면 생략)")
+    parser.add_argument("--build", action="store_true", help="config.yaml 설정으로 로컬 인덱스 생성")
+    parser.add_argument("--output", default=None, help="리포트 저장 경로 (JSON)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    config = load_config()
+    registry = CorpusRegistry(config)
+    config = registry.collection_config(args.collection or registry.default)
+
+    bm25, chunks = load_bm25_index(config['database']['bm25_path'])
+    vectorstore = load_vectorstore(config)
+
+    if args.build:
+        index = build_vector_index(vectorstore, chunks, config, build_id=bm25.build_id)
+        print(f"✅ 로컬 벡터 인덱스 생성: {index.meta['dtype']}, {index.dimensions}차원, "
+              f"{len(index.ids)}개, {index.nbytes() / 1024 / 1024:.1f}MB")
+        print("   config.yaml의 vector_index.enabled를 true로 바꾸면 검색에 사용됩니다.")
+        return
+
+    spec = read_embedding_spec(config['database']['chroma_path'])
+    vectors, _ = export_from_chroma(vectorstore, chunks)
+    vectors = truncate_normalize(vectors)
+    print(f"벡터: {len(vectors)}개 x {vectors.shape[1]}차원 (모델: {spec.get('model') or '기본 모델'})")
+
+    # 질의 준비
+    if args.queries:
+        queries = truncate_normalize(vectorstore.embeddings.embed_documents(load_queries(args.queries)))
+    else:
+        rng = np.random.default_rng(0)
+        picked = rng.choice(len(vectors), size=min(args.sample, len(vectors)), replace=False)
+        queries = vectors[picked]
+    print(f"질의: {len(queries)}개")
+
+    k = min(args.k, len(vectors))
+    truth = exact_top_k(vectors, queries, k)
+
+    # 절단은 Matryoshka 모델에서만 평가
+    dimensions = [None]
+    if supports_truncation(spec.get('model')):
+        dimensions += [d for d in parse_int_list(args.dimensions) if d < vectors.shape[1]]
+    else:
+        print("차원 절단은 text-embedding-3 계열 인덱스에서만 평가합니다 (원본 차원만 평가).")
+
+    results = []
+    for dtype, dims, rescore_k in itertools.product(
+        args.dtypes.split(','), dimensions, parse_int_list(args.rescore_k)
+    ):
+        if dtype == "float32" and dims is None and rescore_k:
+            continue
+        results.append(evaluate_variant(vectors, queries, truth, k, dtype, dims, rescore_k))
+
+    baseline_mb = vectors.nbytes / 1024 / 1024
+    for r in results:
+        r["size_ratio"] = round(baseline_mb / r["index_mb"], 2) if r["index_mb"] else None
+
+    # 결과 출력
+    print()
+    header = f"{'dtype':>8} {'dims':>5} {'rescore':>7} {'recall':>7} {'MB':>8} {'x':>6} {'p50 ms':>7} {'p95 ms':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['dtype']:>8} {r['dimensions']:>5} {r['rescore_k']:>7} {r['recall@k']:>7.3f} "
+              f"{r['index_mb']:>8.2f} {r['size_ratio']:>6.1f} {r['search_ms_p50']:>7.2f} {r['search_ms_p95']:>7.2f}")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "model": spec.get('model'),
+        "vectors": len(vectors),
+        "full_dimensions": int(vectors.shape[1]),
+        "queries": args.queries or f"sample:{len(queries)}",
+        "k": k,
+        "float32_mb": round(baseline_mb, 2),
+        "results": results
+    }
+
+    output = args.output or f"./data/eval_quantization_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"리포트 저장: {output}")
+
+
+if __name__ == "__main__":
+    main()
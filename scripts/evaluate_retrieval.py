@@ -0,0 +1,318 @@
+"""
+검색 품질/비용 평가 도구
+- 라벨 세트 (질문 → 기대 페이지/섹션)로 hybrid_search 평가
+- vector_top_k / bm25_top_k / final_top_k / chunk_size / chunk_overlap 그리드 탐색
+- 임베딩 캐시로 반복 평가 비용 최소화
+- recall@k, hit@k, MRR, 질의당 컨텍스트 토큰 수 리포트
+
+사용 예:
+    python scripts/evaluate_retrieval.py --labels benchmarks/eval_set.jsonl
+    python scripts/evaluate_retrieval.py --final-top-k 3,5,8,10 --chunk-size 1000,1500 --workers 4
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import itertools
+from copy import deepcopy
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import yaml
+from dotenv import load_dotenv
+
+# 상위 디렉토리를 경로에 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.vectorstore import (
+    create_embeddings, load_vectorstore, load_bm25_index, create_bm25_index, hybrid_search
+)
+from src.embedding_cache import CachedEmbeddings
+from src.vector_index import MatryoshkaEmbeddings, read_embedding_spec
+from src.rag_chain import build_context
+from src.token_counter import count_tokens
+
+
+DEFAULT_CACHE_PATH = "./data/embedding_cache.sqlite"
+
+
+def load_config() -> dict:
+    """config.yaml 로드"""
+    with open('config.yaml', 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def load_labels(path: str) -> List[Dict]:
+    """
+    라벨 세트 로드
+
+    형식 (JSONL, #으로 시작하는 줄은 주석):
+        {"question": "...", "pages": [8, 9], "sections": ["문서관리"]}
+
+    Args:
+        path: 라벨 파일 경로
+
+    Returns:
+        라벨 리스트
+    """
+    labels = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                labels.append(json.loads(line))
+    return labels
+
+
+def parse_int_list(value: str) -> List[int]:
+    """'4,8,12' → [4, 8, 12]"""
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def doc_pages(doc) -> List[int]:
+    """문서가 커버하는 페이지 목록"""
+    pages = doc.metadata.get('pages')
+    if pages:
+        if isinstance(pages, str):
+            return [int(p) for p in pages.split(',') if p.strip()]
+        return list(pages)
+    return [doc.metadata.get('page', 0)]
+
+
+def is_relevant(doc, label: Dict) -> bool:
+    """검색 결과가 라벨의 기대 페이지/섹션에 해당하는지"""
+    expected_pages = set(label.get('pages', []))
+    if expected_pages and expected_pages.intersection(doc_pages(doc)):
+        return True
+
+    for section in label.get('sections', []):
+        headings = [doc.metadata.get(key) or '' for key in ('level1', 'level2', 'level3')]
+        if any(section in heading for heading in headings) or section in doc.page_content[:300]:
+            return True
+
+    return False
+
+
+def score_results(docs: List, label: Dict) -> Dict:
+    """
+    단일 질의 평가
+
+    Returns:
+        recall (기대 페이지 중 찾은 비율), hit, reciprocal rank, 컨텍스트 토큰 수
+    """
+    relevant_ranks = [rank for rank, doc in enumerate(docs, start=1) if is_relevant(doc, label)]
+
+    expected_pages = set(label.get('pages', []))
+    if expected_pages:
+        found_pages = set()
+        for doc in docs:
+            found_pages.update(expected_pages.intersection(doc_pages(doc)))
+        recall = len(found_pages) / len(expected_pages)
+    else:
+        recall = 1.0 if relevant_ranks else 0.0
+
+    return {
+        "recall": recall,
+        "hit": 1.0 if relevant_ranks else 0.0,
+        "rr": 1.0 / relevant_ranks[0] if relevant_ranks else 0.0,
+        "context_tokens": count_tokens(build_context(docs)) if docs else 0
+    }
+
+
+def build_index_variant(config: Dict, chunk_size: int, chunk_overlap: int, embeddings) -> Dict:
+    """
+    청킹 설정별 인덱스 준비
+
+    현재 config와 같은 청킹이면 디스크의 인덱스를 쓰고,
+    다르면 PDF를 다시 청킹해 메모리 인덱스를 만든다 (임베딩은 캐시 사용).
+
+    Returns:
+        {"vectorstore", "bm25", "chunks", "source"}
+    """
+    chunking = config['chunking']
+    if chunk_size == chunking['chunk_size'] and chunk_overlap == chunking['chunk_overlap']:
+        bm25, chunks = load_bm25_index(config['database']['bm25_path'])
+        vectorstore = load_vectorstore(config, embeddings=embeddings)
+        return {"vectorstore": vectorstore, "bm25": bm25, "chunks": chunks, "source": "disk"}
+
+    from langchain_community.vectorstores import Chroma
+    from src.pdf_processor import process_pdf
+
+    variant_config = deepcopy(config)
+    variant_config['chunking']['chunk_size'] = chunk_size
+    variant_config['chunking']['chunk_overlap'] = chunk_overlap
+
+    chunks = process_pdf(config['pdf']['source_file'], variant_config)
+    vectorstore = Chroma.from_documents(
+        documents=chunks,
+        embedding=embeddings,
+        collection_name=f"eval_{chunk_size}_{chunk_overlap}"
+    )
+    bm25 = create_bm25_index(chunks)
+    return {"vectorstore": vectorstore, "bm25": bm25, "chunks": chunks, "source": "memory"}
+
+
+def evaluate_setting(index: Dict, labels: List[Dict], config: Dict, setting: Dict) -> Dict:
+    """
+    하나의 설정 조합 평가
+
+    Returns:
+        설정 + 평균 지표
+    """
+    run_config = deepcopy(config)
+    run_config['retrieval'].update({
+        'vector_top_k': setting['vector_top_k'],
+        'bm25_top_k': setting['bm25_top_k'],
+        'final_top_k': setting['final_top_k']
+    })
+
+    scores = []
+    start = time.perf_counter()
+    for label in labels:
+        docs = hybrid_search(
+            label['question'], index['vectorstore'], index['bm25'], index['chunks'], run_config
+        )
+        scores.append(score_results(docs, label))
+    elapsed = time.perf_counter() - start
+
+    n = len(scores) or 1
+    return {
+        **setting,
+        "recall@k": round(sum(s['recall'] for s in scores) / n, 4),
+        "hit@k": round(sum(s['hit'] for s in scores) / n, 4),
+        "mrr": round(sum(s['rr'] for s in scores) / n, 4),
+        "context_tokens": round(sum(s['context_tokens'] for s in scores) / n, 1),
+        "search_ms": round(elapsed * 1000 / n, 2)
+    }
+
+
+def recommend(results: List[Dict], recall_tolerance: float) -> Dict:
+    """
+    최고 recall 대비 허용 범위 안에서 컨텍스트 토큰이 가장 적은 설정
+
+    Args:
+        results: 평가 결과
+        recall_tolerance: 허용 recall 하락폭 (0.02 = 2%p)
+
+    Returns:
+        추천 설정
+    """
+    if not results:
+        return {}
+    best_recall = max(r['recall@k'] for r in results)
+    candidates = [r for r in results if r['recall@k'] >= best_recall - recall_tolerance]
+    return min(candidates, key=lambda r: (r['context_tokens'], -r['mrr']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="검색 품질/비용 그리드 평가")
+    parser.add_argument("--labels", default="benchmarks/eval_set.jsonl", help="라벨 세트 (JSONL)")
+    parser.add_argument("--vector-top-k", default="4,8,12")
+    parser.add_argument("--bm25-top-k", default="4,8,12")
+    parser.add_argument("--final-top-k", default="3,5,8,10")
+    parser.add_argument("--chunk-size", default=None, help="기본값: config.yaml 값")
+    parser.add_argument("--chunk-overlap", default=None, help="기본값: config.yaml 값")
+    parser.add_argument("--workers", type=int, default=4, help="병렬 평가 스레드 수")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="임베딩 캐시 경로")
+    parser.add_argument("--recall-tolerance", type=float, default=0.02)
+    parser.add_argument("--output", default=None, help="리포트 저장 경로 (JSON)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    config = load_config()
+    labels = load_labels(args.labels)
+
+    chunk_sizes = parse_int_list(args.chunk_size) if args.chunk_size else [config['chunking']['chunk_size']]
+    chunk_overlaps = parse_int_list(args.chunk_overlap) if args.chunk_overlap else [config['chunking']['chunk_overlap']]
+
+    # 디스크 인덱스를 만든 모델/차원으로 임베딩 (차원 축소 시 캐시 구분자에 차원 포함)
+    base_embeddings = create_embeddings(config, read_embedding_spec(config['database']['chroma_path']))
+    namespace = getattr(getattr(base_embeddings, 'base', base_embeddings), 'model', '')
+    if isinstance(base_embeddings, MatryoshkaEmbeddings):
+        namespace = f"{namespace}@{base_embeddings.dimensions}"
+    embeddings = CachedEmbeddings(base_embeddings, args.cache, namespace=namespace)
+
+    print("=" * 80)
+    print("검색 품질/비용 평가")
+    print("=" * 80)
+    print(f"라벨 수: {len(labels)}개")
+
+    # 1. 청킹 설정별 인덱스 준비
+    indexes = {}
+    for chunk_size, chunk_overlap in itertools.product(chunk_sizes, chunk_overlaps):
+        if chunk_overlap >= chunk_size:
+            continue
+        print(f"[인덱스] chunk_size={chunk_size}, chunk_overlap={chunk_overlap} 준비 중...")
+        indexes[(chunk_size, chunk_overlap)] = build_index_variant(config, chunk_size, chunk_overlap, embeddings)
+
+    # 2. 검색 설정 그리드 (final_top_k는 후보 수 합보다 클 필요 없음)
+    jobs = []
+    for (chunk_size, chunk_overlap), index in indexes.items():
+        for vector_k, bm25_k, final_k in itertools.product(
+            parse_int_list(args.vector_top_k),
+            parse_int_list(args.bm25_top_k),
+            parse_int_list(args.final_top_k)
+        ):
+            if final_k > vector_k + bm25_k:
+                continue
+            setting = {
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "vector_top_k": vector_k,
+                "bm25_top_k": bm25_k,
+                "final_top_k": final_k
+            }
+            jobs.append((index, setting))
+
+    print(f"[평가] 설정 조합 {len(jobs)}개, 병렬 {args.workers}개...")
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(
+            lambda job: evaluate_setting(job[0], labels, config, job[1]), jobs
+        ))
+
+    results.sort(key=lambda r: (-r['recall@k'], r['context_tokens']))
+    best = recommend(results, args.recall_tolerance)
+
+    # 3. 결과 출력
+    print()
+    header = f"{'size':>5} {'ovl':>4} {'vec':>4} {'bm25':>4} {'final':>5} {'recall':>7} {'hit':>6} {'mrr':>6} {'ctx_tok':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results[:30]:
+        print(f"{r['chunk_size']:>5} {r['chunk_overlap']:>4} {r['vector_top_k']:>4} {r['bm25_top_k']:>4} "
+              f"{r['final_top_k']:>5} {r['recall@k']:>7.3f} {r['hit@k']:>6.3f} {r['mrr']:>6.3f} {r['context_tokens']:>8.0f}")
+
+    print()
+    print(f"임베딩 캐시: 히트 {embeddings.hits}회, 미스 {embeddings.misses}회")
+    if best:
+        print(f"✅ 추천 설정 (recall 허용폭 {args.recall_tolerance}): "
+              f"chunk_size={best['chunk_size']}, chunk_overlap={best['chunk_overlap']}, "
+              f"vector_top_k={best['vector_top_k']}, bm25_top_k={best['bm25_top_k']}, "
+              f"final_top_k={best['final_top_k']} "
+              f"(recall {best['recall@k']:.3f}, 컨텍스트 {best['context_tokens']:.0f} 토큰)")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "labels": args.labels,
+        "label_count": len(labels),
+        "index": {
+            "bm25_path": config['database']['bm25_path'],
+            "bm25_mtime": os.path.getmtime(config['database']['bm25_path'])
+            if os.path.exists(config['database']['bm25_path']) else None
+        },
+        "results": results,
+        "recommended": best
+    }
+
+    output = args.output or f"./data/eval_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"리포트 저장: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+입장 제어 모듈 (외부 LLM 호출량 제한)
+- 토큰 버킷: 세션별 / 전체, 요청 수와 예상 토큰 수(질문 + 검색 문맥 + 최대 출력)를 함께 차감
+- LLM 호출 직후 실제 사용량(응답의 token_usage, 없으면 답변 길이로 계산)과의 차이를 되돌림
+- 세션 한도는 입장 시 바로 예약 (같은 세션의 동시 요청이 대기 중에 모두 통과하지 않도록, 거절되면 되돌림)
+- 전체 한도를 넘으면 대기열에서 순서대로 대기 (최대 max_waiting개, 세션별 대기 순번 조회 가능)
+- 세션 한도 초과, 대기열 포화, max_wait 안에 차례가 오지 않을 것 같으면 즉시 거절
+  → 호출 측(QueryService)이 LLM 없이 최근 답변/검색 본문으로 응답
+
+QueryService 이벤트 루프 안에서만 사용한다 (잠금 없음).
+"""
+
+import time
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+from src.token_counter import count_tokens
+
+
+# 현재 요청의 실제 LLM 토큰 사용량 (실행 스레드에서 더하고 서비스 루프에서 읽음, 값은 공유되는 dict)
+_usage: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("llm_usage", default=None)
+
+
+@contextmanager
+def track_usage():
+    """
+    이 범위 안의 LLM 호출 토큰 사용량 집계
+
+    Yields:
+        {"tokens": 합계, "calls": 사용량이 보고된 호출 수}
+    """
+    usage = {"tokens": 0, "calls": 0}
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def record_usage(token_usage: Dict) -> None:
+    """LLM 응답의 token_usage(prompt_tokens, completion_tokens)를 현재 요청 사용량에 더함"""
+    usage = _usage.get()
+    if usage is None or not token_usage:
+        return
+    usage["tokens"] += token_usage.get('prompt_tokens', 0) + token_usage.get('completion_tokens', 0)
+    usage["calls"] += 1
+
+
+class AdmissionRejected(Exception):
+    """입장 거절 (reason: session | queue_full | timeout)"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class TokenBucket:
+    """
+    분당 rate만큼 채워지고 capacity까지 모이는 버킷
+
+    사용 예:
+        bucket = TokenBucket(rate_per_minute=60, capacity=10)
+        if bucket.wait_time(1) == 0:
+            bucket.take(1)
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """amount를 차감할 수 있을 때까지 남은 시간 (초, capacity보다 큰 요청은 가득 찼을 때 허용)"""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float("inf")
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """예상과 실제 사용량 차이 반영 (양수: 되돌림, 음수: 추가 차감)"""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimit:
+    """
+    요청 수 + 토큰 수 버킷 한 쌍
+
+    burst_seconds만큼 몰아서 사용할 수 있고, 분당 한도가 작아도 최소 min_burst개 요청
+    (토큰은 요청당 평균 tokens_per_minute / requests_per_minute)은 연달아 허용한다.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, burst_seconds: float,
+                 min_burst: int = 1):
+        burst = burst_seconds / 60.0
+        tokens_per_request = tokens_per_minute / max(requests_per_minute, 1)
+        self.requests = TokenBucket(requests_per_minute, max(min_burst, requests_per_minute * burst))
+        self.tokens = TokenBucket(tokens_per_minute, max(tokens_per_request * min_burst, tokens_per_minute * burst))
+
+    def wait_time(self, tokens: int) -> float:
+        return max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    def take(self, tokens: int) -> None:
+        self.requests.take(1)
+        self.tokens.take(tokens)
+
+    def adjust(self, tokens: int) -> None:
+        self.tokens.adjust(tokens)
+
+    def refund(self, tokens: int) -> None:
+        """take()로 예약한 요청 하나를 되돌림"""
+        self.requests.adjust(1)
+        self.tokens.adjust(tokens)
+
+
+class AdmissionController:
+    """
+    세션별/전체 호출량 제한 + 대기열
+
+    사용 예 (서비스 루프 안에서, LLM 호출 직전):
+        controller = AdmissionController(config)
+        tokens = controller.estimate_tokens(query, context)
+        try:
+            await controller.admit(session_id, tokens)
+        except AdmissionRejected:
+            ...  # 최근 답변/검색 본문
+        with track_usage() as usage:
+            ...  # LLM 호출
+        controller.settle(session_id, tokens, usage["tokens"])
+    """
+
+    def __init__(self, config: Dict):
+        """
+        Args:
+            config: config.yaml 설정 (admission, llm 섹션 사용)
+        """
+        admission_config = config.get('admission') or {}
+        self.enabled = admission_config.get('enabled', False)
+        self.burst_seconds = admission_config.get('burst_seconds', 10)
+        self.min_burst = admission_config.get('min_burst', 3)
+        self.session_rpm = admission_config.get('session_rpm', 6)
+        self.session_tpm = admission_config.get('session_tpm', 60000)
+        self.output_tokens = (config.get('llm') or {}).get('max_tokens', 3000)
+        self.max_waiting = admission_config.get('max_waiting', 20)
+        self.max_wait = admission_config.get('max_wait', 15.0)
+        self.max_sessions = admission_config.get('max_sessions', 1000)
+        self.poll_interval = admission_config.get('poll_interval', 0.05)
+
+        self.global_limit = RateLimit(
+            admission_config.get('global_rpm', 60),
+            admission_config.get('global_tpm', 200000),
+            self.burst_seconds,
+            self.min_burst
+        )
+        self.stats = {"admitted": 0, "queued": 0, "rejected_session": 0, "rejected_queue_full": 0,
+                      "rejected_timeout": 0, "estimated_tokens": 0, "actual_tokens": 0}
+
+        self._sessions: "OrderedDict[str, RateLimit]" = OrderedDict()
+        self._waiters: deque = deque()
+
+    def estimate_tokens(self, query: str, context: str) -> int:
+        """LLM 호출 하나의 예상 토큰 수 (질문 + 검색 문맥 + 최대 출력)"""
+        return count_tokens(query) + count_tokens(context) + self.output_tokens
+
+    def _session_limit(self, session_id: Optional[str]) -> Optional[RateLimit]:
+        """세션 버킷 (오래 쓰지 않은 세션부터 정리)"""
+        if session_id is None:
+            return None
+        limit = self._sessions.get(session_id)
+        if limit is None:
+            limit = RateLimit(self.session_rpm, self.session_tpm, self.burst_seconds, self.min_burst)
+            self._sessions[session_id] = limit
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return limit
+
+    def position(self, session_id: Optional[str]) -> Optional[int]:
+        """세션의 대기 순번 (1부터, 대기 중이 아니면 None)"""
+        for i, waiter in enumerate(self._waiters):
+            if waiter["session_id"] == session_id:
+                return i + 1
+        return None
+
+    def _reject(self, reason: str, message: str) -> AdmissionRejected:
+        self.stats[f"rejected_{reason}"] += 1
+        return AdmissionRejected(reason, message)
+
+    async def admit(self, session_id: Optional[str], tokens: int) -> float:
+        """
+        LLM 호출 허가 (차례가 올 때까지 대기)
+
+        Args:
+            session_id: 세션 ID (None이면 세션 한도 없음)
+            tokens: 예상 토큰 수
+
+        Returns:
+            대기한 시간 (초)
+
+        Raises:
+            AdmissionRejected: 세션 한도 초과, 대기열 포화, 대기 시간 초과
+        """
+        if not self.enabled:
+            return 0.0
+
+        # 한 사용자의 연속 요청은 다른 사용자의 대기열을 막지 않도록 기다리지 않고 거절
+        session = self._session_limit(session_id)
+        if session is not None:
+            if session.wait_time(tokens) > 0:
+                raise self._reject("session", "짧은 시간에 질문이 많아 잠시 후 다시 시도해 주세요.")
+            # 확인과 차감 사이에 같은 세션의 다른 요청이 끼지 않도록 바로 예약 (전체 한도에서 거절되면 되돌림)
+            session.take(tokens)
+
+        try:
+            return await self._admit_global(session_id, tokens)
+        except BaseException:
+            if session is not None:
+                session.refund(tokens)
+            raise
+
+    async def _admit_global(self, session_id: Optional[str], tokens: int) -> float:
+        """전체 한도 대기열 (세션 한도는 이미 예약됨)"""
+        started = time.monotonic()
+        if not self._waiters and self.global_limit.wait_time(tokens) == 0:
+            self._grant(tokens)
+            return 0.0
+
+        if len(self._waiters) >= self.max_waiting:
+            raise self._reject("queue_full", "요청이 많아 대기열이 가득 찼습니다.")
+
+        waiter = {"session_id": session_id, "tokens": tokens}
+        self._waiters.append(waiter)
+        self.stats["queued"] += 1
+        try:
+            while True:
+                remaining = self.max_wait - (time.monotonic() - started)
+                if self._waiters[0] is waiter:
+                    wait = self.global_limit.wait_time(tokens)
+                    if wait == 0:
+                        break
+                    # 차례가 와도 제한 시간 안에 버킷이 차지 않으면 바로 거절
+                    if wait > remaining:
+                        raise self._reject("timeout", "요청이 많아 제한 시간 안에 처리할 수 없습니다.")
+                elif remaining <= 0:
+                    raise self._reject("timeout", "요청이 많아 제한 시간 안에 처리할 수 없습니다.")
+                else:
+                    wait = self.poll_interval
+                await asyncio.sleep(min(wait, self.poll_interval))
+        finally:
+            self._waiters.remove(waiter)
+
+        self._grant(tokens)
+        return time.monotonic() - started
+
+    def _grant(self, tokens: int) -> None:
+        self.global_limit.take(tokens)
+        self.stats["admitted"] += 1
+
+    def settle(self, session_id: Optional[str], estimated: int, actual: int) -> None:
+        """
+        LLM 호출 후 예상 토큰 수와 실제 사용량의 차이를 버킷에 반영
+
+        Args:
+            session_id: admit에 쓴 세션 ID
+            estimated: admit에 쓴 예상 토큰 수
+            actual: 실제 사용한 토큰 수
+        """
+        if not self.enabled:
+            return
+        self.stats["estimated_tokens"] += estimated
+        self.stats["actual_tokens"] += actual
+        self.global_limit.adjust(estimated - actual)
+        session = self._sessions.get(session_id) if session_id is not None else None
+        if session is not None:
+            session.adjust(estimated - actual)
+
+    def status(self) -> Dict:
+        """입장 현황"""
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "waiting": len(self._waiters),
+            "sessions": len(self._sessions)
+        }
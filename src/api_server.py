@@ -0,0 +1,310 @@
+"""
+HTTP/JSON 질의 API 서버 (표준 라이브러리 기반)
+- POST /search        검색 결과만 반환 (LLM 호출 없음)
+- POST /query         전체 답변 (JSON)
+- POST /query/stream  전체 답변 (SSE 스트리밍, 섹션 완성 시 section 이벤트, 누락 섹션 보완 시 repair 이벤트)
+- GET  /health        상태 확인
+
+인덱스와 질의 서비스는 프로세스당 한 번만 로드해 모든 요청이 공유한다.
+--workers N이면 소켓을 하나 열어 두고 N개 프로세스를 fork해 함께 accept한다.
+
+실행 예:
+    python -m src.api_server --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+import os
+import sys
+import json
+import signal
+import socket
+import argparse
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+import yaml
+from dotenv import load_dotenv
+
+from src.vectorstore import check_database_exists
+from src.query_service import (
+    QueryService, RepairedAnswer, ServiceOverloadedError, ServiceTimeoutError, create_query_service
+)
+from src.response_formatter import SectionStreamParser, validate_response_structure, get_missing_sections
+from src.tracing import configure_tracing
+
+
+# 요청 본문 최대 크기 (bytes)
+MAX_BODY_BYTES = 64 * 1024
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def load_config(config_path: str = 'config.yaml') -> Dict:
+    """config.yaml 로드"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def get_service(config_path: str = 'config.yaml') -> QueryService:
+    """
+    프로세스 공유 질의 서비스 (최초 호출 시 인덱스 로드)
+
+    Args:
+        config_path: config.yaml 경로
+
+    Returns:
+        QueryService
+    """
+    global _service
+
+    with _service_lock:
+        if _service is None:
+            config = load_config(config_path)
+            configure_tracing(config)
+
+            if not check_database_exists(config['database']['chroma_path'], config['database']['bm25_path']):
+                raise RuntimeError("데이터베이스를 찾을 수 없습니다. `python scripts/create_database.py`를 먼저 실행해 주세요.")
+
+            _service = create_query_service(config)
+
+    return _service
+
+
+def serialize_document(doc) -> Dict:
+    """검색 결과 문서를 JSON으로 변환"""
+    return {
+        "page": doc.metadata.get('page'),
+        "metadata": doc.metadata,
+        "content": doc.page_content
+    }
+
+
+class QueryAPIHandler(BaseHTTPRequestHandler):
+    """API 요청 처리"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "ChatManualAPI/1.0"
+
+    def log_message(self, format, *args):
+        sys.stderr.write(f"[{os.getpid()}] {self.address_string()} - {format % args}\n")
+
+    # ------------------------------------------------------------------
+    # 응답 도우미
+    # ------------------------------------------------------------------
+
+    def _send_json(self, payload: Dict, status: int = 200) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str) -> None:
+        self._send_json({"error": message}, status=status)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length", 0))
+        if length > MAX_BODY_BYTES:
+            raise ValueError("요청 본문이 너무 큽니다.")
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(payload, dict):
+            raise ValueError("JSON 객체를 보내 주세요.")
+        query = str(payload.get("query", "")).strip()
+        if not query:
+            raise ValueError("query가 비어 있습니다.")
+        payload["query"] = query
+        return payload
+
+    def _session_id(self, payload: Dict) -> str:
+        """세션별 호출량 한도 기준 (session_id가 없으면 클라이언트 주소)"""
+        return str(payload.get("session_id") or self.client_address[0])
+
+    def _write_sse(self, data: Dict, event: str = None) -> None:
+        message = ""
+        if event:
+            message += f"event: {event}\n"
+        message += f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+        self.wfile.write(message.encode('utf-8'))
+        self.wfile.flush()
+
+    # ------------------------------------------------------------------
+    # 라우팅
+    # ------------------------------------------------------------------
+
+    def do_GET(self):
+        if self.path == "/health":
+            service = get_service()
+            self._send_json({"status": "ok", "pid": os.getpid(), "service": service.status()})
+        else:
+            self._send_error(404, "not found")
+
+    def do_POST(self):
+        routes = {
+            "/search": self._handle_search,
+            "/query": self._handle_query,
+            "/query/stream": self._handle_stream
+        }
+        handler = routes.get(self.path)
+        if handler is None:
+            self._send_error(404, "not found")
+            return
+
+        try:
+            payload = self._read_json()
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_error(400, str(e))
+            return
+
+        try:
+            handler(payload)
+        except ServiceOverloadedError as e:
+            self._send_error(503, str(e))
+        except ServiceTimeoutError as e:
+            self._send_error(504, str(e))
+        except Exception as e:
+            print(f"[ERROR] API 처리 중 오류 발생: {str(e)}")
+            self._send_error(500, f"처리 중 오류가 발생했습니다: {str(e)}")
+
+    def _handle_search(self, payload: Dict) -> None:
+        service = get_service()
+        docs = service.retrieve(payload["query"])
+        self._send_json({
+            "query": payload["query"],
+            "results": [serialize_document(doc) for doc in docs]
+        })
+
+    def _handle_query(self, payload: Dict) -> None:
+        service = get_service()
+        answer = service.submit(payload["query"], session_id=self._session_id(payload)).result()
+        self._send_json({"query": payload["query"], "answer": answer})
+
+    def _handle_stream(self, payload: Dict) -> None:
+        service = get_service()
+        pieces = service.stream(payload["query"], session_id=self._session_id(payload))
+
+        # 첫 조각까지는 오류 시 일반 HTTP 오류로 응답
+        first = next(pieces, None)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        # 섹션이 닫힐 때마다 section 이벤트로 보내 점진적 렌더링 지원
+        parser = SectionStreamParser()
+
+        def emit(piece: str) -> None:
+            self._write_sse({"delta": piece})
+            for name, content in parser.feed(piece):
+                self._write_sse({"name": name, "content": content}, event="section")
+
+        try:
+            repaired = None
+            for piece in itertools.chain([first] if first is not None else [], pieces):
+                if isinstance(piece, RepairedAnswer):
+                    repaired = piece
+                    continue
+                emit(piece)
+            for name, content in parser.close():
+                self._write_sse({"name": name, "content": content}, event="section")
+            missing = parser.missing()
+            if repaired is not None:
+                # 스트림이 끝난 뒤 보완한 섹션 (answer는 제자리에 끼워 넣은 전체 답변)
+                self._write_sse({"sections": repaired.sections, "answer": repaired.answer}, event="repair")
+                missing = get_missing_sections(validate_response_structure(repaired.answer))
+            self._write_sse({"done": True, "missing_sections": missing}, event="done")
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 연결을 끊음
+            pass
+        except Exception as e:
+            self._write_sse({"error": str(e)}, event="error")
+
+
+def run_worker(server_socket: socket.socket) -> None:
+    """
+    이미 열린 소켓으로 HTTP 서버 실행
+
+    Args:
+        server_socket: listen 중인 소켓
+    """
+    httpd = ThreadingHTTPServer(server_socket.getsockname()[:2], QueryAPIHandler, bind_and_activate=False)
+    httpd.socket = server_socket
+    httpd.daemon_threads = True
+
+    # 첫 요청이 느리지 않도록 인덱스 미리 로드
+    get_service()
+    print(f"[{os.getpid()}] API 워커 시작: http://{server_socket.getsockname()[0]}:{server_socket.getsockname()[1]}")
+
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+
+
+def serve(host: str, port: int, workers: int = 1) -> None:
+    """
+    API 서버 실행 (workers > 1이면 pre-fork)
+
+    Args:
+        host: 바인드 주소
+        port: 포트
+        workers: 워커 프로세스 수
+    """
+    server_socket = socket.create_server((host, port), backlog=128)
+
+    if workers <= 1 or not hasattr(os, "fork"):
+        run_worker(server_socket)
+        return
+
+    # 인덱스(SQLite, 스레드)는 fork 이후 각 워커에서 로드
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                run_worker(server_socket)
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def terminate(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, terminate)
+    signal.signal(signal.SIGINT, terminate)
+
+    print(f"API 서버 시작: http://{host}:{port} (워커 {workers}개)")
+    for child in children:
+        try:
+            os.waitpid(child, 0)
+        except ChildProcessError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="학교 행정매뉴얼 질의 API 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="워커 프로세스 수")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if not os.getenv('OPENAI_API_KEY'):
+        print("❌ 오류: OPENAI_API_KEY가 설정되지 않았습니다.")
+        sys.exit(1)
+
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
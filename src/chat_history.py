@@ -0,0 +1,175 @@
+"""
+대화 내역 모듈 (세션별)
+- 메시지는 UTF-8로 저장하고 compress_threshold 이상이면 zlib 압축
+- 화면에는 최근 visible_turns 턴만 그리고, 이전 대화는 접어 두었다가 페이지 단위로 표시
+- 렌더링한 markdown은 LRU 캐시에 보관 (rerun마다 압축 해제/후처리 반복 방지)
+  캐시는 메시지 저장량과 따로 항목 수/용량 상한을 두고, 최근 턴 분량은 항상 유지
+- 세션당 저장 상한을 넘으면 오래된 메시지부터 삭제
+
+메시지가 늘어도 rerun마다 그리는 양이 일정하도록 app.py에서 st.session_state.messages 대신 사용한다.
+"""
+
+import zlib
+import itertools
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# 메시지 항목: (메시지 ID, 역할, 저장 데이터, 압축 여부)
+_Entry = Tuple[int, str, bytes, bool]
+
+
+class ChatHistory:
+    """
+    압축 저장 + 최근 턴 렌더링 대화 내역
+
+    사용 예:
+        history = ChatHistory(config, render=format_response)
+        history.append("user", "공문서 접수 절차는?")
+        for message_id, role, markdown in history.recent():
+            ...
+    """
+
+    def __init__(self, config: Dict, render: Optional[Callable[[str], str]] = None):
+        """
+        Args:
+            config: config.yaml 설정 (chat_history 섹션 사용)
+            render: 표시용 markdown 후처리 함수 (기본값: 그대로)
+        """
+        history_config = config.get('chat_history') or {}
+        self.visible_turns = history_config.get('visible_turns', 10)
+        self.page_turns = history_config.get('page_turns', 10)
+        self.compress_threshold = history_config.get('compress_threshold', 2048)
+        # 최근 턴은 rerun마다 다시 그리므로 그만큼은 캐시에 남김
+        self.render_cache_size = max(history_config.get('render_cache', 40), self.visible_turns * 2)
+        self.render_cache_bytes = history_config.get('render_cache_kb', 512) * 1024
+        self.max_bytes = history_config.get('max_session_kb', 1024) * 1024
+        self.render = render or (lambda text: text)
+
+        self.dropped = 0
+        self._entries: "deque[_Entry]" = deque()
+        self._stored_bytes = 0
+        self._ids = itertools.count()
+        self._rendered: "OrderedDict[int, str]" = OrderedDict()
+        self._rendered_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def append(self, role: str, content: str) -> int:
+        """
+        메시지 추가
+
+        Args:
+            role: "user" | "assistant"
+            content: markdown 본문
+
+        Returns:
+            메시지 ID
+        """
+        data = content.encode('utf-8')
+        compressed = len(data) >= self.compress_threshold
+        if compressed:
+            data = zlib.compress(data, 6)
+
+        message_id = next(self._ids)
+        self._entries.append((message_id, role, data, compressed))
+        self._stored_bytes += len(data)
+        self._enforce_cap()
+        return message_id
+
+    def clear(self) -> None:
+        """대화 초기화"""
+        self._entries.clear()
+        self._rendered.clear()
+        self._stored_bytes = 0
+        self._rendered_bytes = 0
+        self.dropped = 0
+
+    def content(self, position: int) -> str:
+        """position번째 메시지 원문"""
+        _, _, data, compressed = self._entries[position]
+        return (zlib.decompress(data) if compressed else data).decode('utf-8')
+
+    def rendered(self, position: int) -> str:
+        """position번째 메시지의 표시용 markdown (캐시)"""
+        message_id = self._entries[position][0]
+        markdown = self._rendered.get(message_id)
+        if markdown is not None:
+            self._rendered.move_to_end(message_id)
+            return markdown
+
+        markdown = self.render(self.content(position))
+        self._rendered[message_id] = markdown
+        self._rendered_bytes += len(markdown.encode('utf-8'))
+        # 용량 상한을 넘어도 최근 턴 분량(visible_turns * 2)은 남김 (recent()가 채우는 중인 캐시를 비우지 않음)
+        while len(self._rendered) > self.render_cache_size or (
+                self._rendered_bytes > self.render_cache_bytes and len(self._rendered) > self.visible_turns * 2):
+            self._evict_rendered()
+        return markdown
+
+    def _evict_rendered(self) -> None:
+        _, markdown = self._rendered.popitem(last=False)
+        self._rendered_bytes -= len(markdown.encode('utf-8'))
+
+    def _enforce_cap(self) -> None:
+        """저장 상한 유지 (오래된 메시지부터 삭제, 마지막 턴은 유지)"""
+        dropped = self.dropped
+        while self._stored_bytes > self.max_bytes and len(self._entries) > 2:
+            self._drop_oldest()
+        # 턴 중간에서 잘리지 않도록 앞에 남은 답변도 삭제
+        while self.dropped > dropped and len(self._entries) > 2 and self._entries[0][1] != "user":
+            self._drop_oldest()
+
+    def _drop_oldest(self) -> None:
+        message_id, _, data, _ = self._entries.popleft()
+        self._stored_bytes -= len(data)
+        self.dropped += 1
+        markdown = self._rendered.pop(message_id, None)
+        if markdown is not None:
+            self._rendered_bytes -= len(markdown.encode('utf-8'))
+
+    def _window(self, start: int, end: int) -> List[Tuple[int, str, str]]:
+        return [(self._entries[i][0], self._entries[i][1], self.rendered(i)) for i in range(start, end)]
+
+    def hidden_count(self) -> int:
+        """최근 턴 밖으로 접힌 메시지 수"""
+        return max(0, len(self._entries) - self.visible_turns * 2)
+
+    def recent(self) -> List[Tuple[int, str, str]]:
+        """
+        화면에 바로 그릴 최근 메시지
+
+        Returns:
+            [(메시지 ID, 역할, 표시용 markdown), ...]
+        """
+        return self._window(self.hidden_count(), len(self._entries))
+
+    def page_count(self) -> int:
+        """접힌 메시지의 페이지 수"""
+        per_page = self.page_turns * 2
+        return (self.hidden_count() + per_page - 1) // per_page
+
+    def page(self, number: int) -> List[Tuple[int, str, str]]:
+        """
+        접힌 메시지 한 페이지 (1: 가장 최근 페이지)
+
+        Args:
+            number: 페이지 번호 (1부터)
+
+        Returns:
+            [(메시지 ID, 역할, 표시용 markdown), ...]
+        """
+        per_page = self.page_turns * 2
+        end = self.hidden_count() - (number - 1) * per_page
+        return self._window(max(0, end - per_page), max(0, end))
+
+    def stats(self) -> Dict:
+        """저장 현황"""
+        return {
+            "messages": len(self._entries),
+            "stored_bytes": self._stored_bytes,
+            "rendered_cached": len(self._rendered),
+            "rendered_bytes": self._rendered_bytes,
+            "dropped": self.dropped
+        }
@@ -0,0 +1,215 @@
+"""
+청크 저장소 모듈
+- 본문: 하나의 UTF-8 버퍼 + 오프셋 배열
+- 메타데이터: 열(column) 단위 배열 (정수 열은 array, 문자열 열은 중복 제거한 값 테이블 + 인덱스 배열)
+- Document 객체는 검색 결과로 반환할 때만 생성
+
+기존 List[Document]처럼 인덱싱/순회/len()을 지원하므로 bm25_chunks 자리에 그대로 쓸 수 있다.
+"""
+
+import sys
+import json
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+
+# 값이 없는 칸 표시
+_MISSING_INT = -(2 ** 63)
+_MISSING_REF = 0xFFFFFFFF
+
+# chunk_id는 위치와 같으므로 저장하지 않고 꺼낼 때 채움
+_POSITION_KEY = 'chunk_id'
+
+
+class ChunkStore(Sequence):
+    """
+    메모리 절약형 청크 저장소
+
+    사용 예:
+        store = ChunkStore.from_documents(chunks)
+        doc = store[3]              # Document 생성
+        text = store.text(3)        # 본문만 (Document 생성 없음)
+        page = store.get(3, 'page') # 메타데이터 한 칸만
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._offsets = array('Q', [0])
+        # key → ("int", array('q')) | ("str" | "json", array('I'), 값 테이블)
+        self._columns: Dict[str, tuple] = {}
+        self._text_index: Optional[Dict[int, int]] = None
+
+    @classmethod
+    def from_documents(cls, documents: Iterable["Document"]) -> "ChunkStore":
+        """
+        Document 리스트로 저장소 생성
+
+        Args:
+            documents: 청크 문서 리스트
+
+        Returns:
+            ChunkStore
+        """
+        documents = list(documents)
+        store = cls()
+        count = len(documents)
+
+        encoded = [doc.page_content.encode('utf-8') for doc in documents]
+        offsets = array('Q', [0])
+        position = 0
+        for data in encoded:
+            position += len(data)
+            offsets.append(position)
+        store._buffer = b"".join(encoded)
+        store._offsets = offsets
+
+        keys = []
+        for doc in documents:
+            for key in doc.metadata:
+                if key != _POSITION_KEY and key not in keys:
+                    keys.append(key)
+
+        for key in keys:
+            values = [doc.metadata.get(key) for doc in documents]
+            present = [value for value in values if value is not None]
+
+            if all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+                store._columns[key] = ("int", array('q', [
+                    _MISSING_INT if value is None else value for value in values
+                ]))
+                continue
+
+            kind = "str" if all(isinstance(value, str) for value in present) else "json"
+            table: List = []
+            refs: Dict = {}
+            column = array('I', [_MISSING_REF]) * count
+            for i, value in enumerate(values):
+                if value is None:
+                    continue
+                if kind == "json":
+                    value = json.dumps(value, ensure_ascii=False, sort_keys=True)
+                ref = refs.get(value)
+                if ref is None:
+                    ref = refs[value] = len(table)
+                    table.append(sys.intern(value))
+                column[i] = ref
+            store._columns[key] = (kind, column, table)
+
+        return store
+
+    # ------------------------------------------------------------------
+    # Sequence 인터페이스
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._materialize(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return self._materialize(index)
+
+    # ------------------------------------------------------------------
+    # 부분 조회 (Document 생성 없음)
+    # ------------------------------------------------------------------
+
+    def text(self, index: int) -> str:
+        """청크 본문"""
+        return self._buffer[self._offsets[index]:self._offsets[index + 1]].decode('utf-8')
+
+    def texts(self) -> Iterable[str]:
+        """전체 본문 순회 (인덱스 생성 등)"""
+        for i in range(len(self)):
+            yield self.text(i)
+
+    def get(self, index: int, key: str, default=None):
+        """
+        메타데이터 한 칸 조회
+
+        Args:
+            index: 청크 위치
+            key: 메타데이터 키
+            default: 값이 없을 때 반환값
+        """
+        if key == _POSITION_KEY:
+            return index
+
+        column = self._columns.get(key)
+        if column is None:
+            return default
+
+        if column[0] == "int":
+            value = column[1][index]
+            return default if value == _MISSING_INT else value
+
+        ref = column[1][index]
+        if ref == _MISSING_REF:
+            return default
+        value = column[2][ref]
+        return json.loads(value) if column[0] == "json" else value
+
+    def metadata(self, index: int) -> Dict:
+        """청크 메타데이터 (새 dict)"""
+        metadata = {}
+        for key in self._columns:
+            value = self.get(index, key)
+            if value is not None:
+                metadata[key] = value
+        metadata[_POSITION_KEY] = index
+        return metadata
+
+    def index_of(self, text: str) -> Optional[int]:
+        """
+        본문으로 청크 위치 찾기 (최초 호출 시 해시 → 위치 맵 생성)
+
+        Args:
+            text: 청크 본문
+
+        Returns:
+            위치 (없으면 None)
+        """
+        if self._text_index is None:
+            text_index = {}
+            for i in range(len(self)):
+                text_index.setdefault(hash(self.text(i)), i)
+            self._text_index = text_index
+
+        index = self._text_index.get(hash(text))
+        if index is not None and self.text(index) == text:
+            return index
+        return None
+
+    def nbytes(self) -> int:
+        """버퍼/배열 크기 합계 (bytes, 문자열 테이블 제외)"""
+        total = len(self._buffer) + self._offsets.itemsize * len(self._offsets)
+        for column in self._columns.values():
+            total += column[1].itemsize * len(column[1])
+        return total
+
+    def _materialize(self, index: int) -> "Document":
+        from langchain.schema import Document
+        return Document(page_content=self.text(index), metadata=self.metadata(index))
+
+    # ------------------------------------------------------------------
+    # pickle
+    # ------------------------------------------------------------------
+
+    def __getstate__(self) -> Dict:
+        return {"buffer": self._buffer, "offsets": self._offsets, "columns": self._columns}
+
+    def __setstate__(self, state: Dict) -> None:
+        self._buffer = state["buffer"]
+        self._offsets = state["offsets"]
+        self._columns = state["columns"]
+        self._text_index = None
+        for column in self._columns.values():
+            if column[0] != "int":
+                column[2][:] = [sys.intern(value) for value in column[2]]
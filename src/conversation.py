@@ -0,0 +1,285 @@
+"""
+대화 맥락 모듈
+- 후속 질문("그럼 서식은?")을 이전 질문과 합쳐 단독 검색 질의로 변환
+  (규칙 기반, 또는 출력 토큰을 제한한 LLM 호출)
+- 후속 질문: 시작 표현("그럼" 등)을 빼면 자체 주제어 없이 같은 주제의 다른 항목(서식, 법령 등)만 묻는 질문
+  ("혹시 출장비 정산은?"처럼 새 주제어가 있으면 시작 표현과 상관없이 그대로 검색)
+- 변환 결과는 (이전 질의, 후속 질문) 기준으로 캐시
+- 후속 질문이면 이전 턴의 검색 결과를 그대로 사용 (임베딩/검색 생략)
+
+세션마다 Conversation 하나를 두고 QueryService.submit(query, conversation=...)으로 넘긴다.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from src.vectorstore import normalize_query
+from src.tracing import span
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+
+# 후속 질문 시작 표현 (이전 질문을 가리키는 표현만, "혹시"/"또"처럼 새 질문도 여는 말은 제외)
+FOLLOW_UP_PREFIXES = (
+    "그럼", "그러면", "그렇다면", "그런데", "그건", "그거", "그것", "이건", "이거",
+    "그 경우", "이 경우", "그 외", "그외", "추가로"
+)
+
+# 주제어가 아닌 여는 말/지시어 ("혹시 서식은?"은 주제어가 없으므로 후속 질문)
+FILLER_WORDS = {"혹시", "또", "그리고", "그", "이", "저", "위", "그것", "이것", "거기"}
+
+# 같은 주제 안에서 묻는 항목 (답변 섹션과 대응)
+ASPECT_WORDS = {
+    "절차", "방법", "순서", "법령", "법", "근거", "규정", "조문", "서식", "양식", "주의사항",
+    "유의사항", "주의할", "기한", "기간", "담당자", "담당", "예외", "보관", "보존기간", "제출처", "출처",
+    "관련", "관련된", "해당"
+}
+
+# 질문 어미/의문 표현 (주제어에서 제외)
+QUESTION_WORDS = {
+    "어떻게", "되나요", "돼", "뭐야", "뭔가요", "무엇인가요", "무엇", "뭐", "알려줘", "알려주세요",
+    "있나요", "있어", "있어요", "해야", "하나요", "해요", "인가요", "은요", "는요", "요"
+}
+
+# 조사 (긴 것부터 확인)
+_PARTICLES = ("에서는", "에서", "으로", "에는", "은", "는", "이", "가", "을", "를", "의", "에", "도", "만", "로", "요")
+
+CONDENSE_PROMPT = """다음 대화의 마지막 질문을 이전 질문 없이도 이해할 수 있는 하나의 검색 질문으로 바꿔 주세요.
+질문 한 줄만 출력하세요.
+
+이전 질문:
+{history}
+
+마지막 질문: {question}"""
+
+
+def stem_token(token: str) -> str:
+    """토큰 끝의 문장부호/조사 제거"""
+    token = token.rstrip("?？.!~,")
+    for particle in _PARTICLES:
+        if len(token) > len(particle) and token.endswith(particle):
+            return token[:-len(particle)]
+    return token
+
+
+def strip_follow_up_prefix(query: str) -> Tuple[str, bool]:
+    """
+    후속 질문 시작 표현 제거
+
+    Returns:
+        (나머지 질문, 시작 표현이 있었는지)
+    """
+    text = query.strip()
+    for prefix in FOLLOW_UP_PREFIXES:
+        # "또는"처럼 단어 일부인 경우는 제외 (뒤에 공백/문장부호가 와야 함)
+        if text.startswith(prefix) and (len(text) == len(prefix) or not text[len(prefix)].isalnum()):
+            return text[len(prefix):].lstrip(" ,."), True
+    return text, False
+
+
+def topic_terms(query: str) -> List[str]:
+    """질의에서 항목/의문 표현을 뺀 주제어"""
+    terms = []
+    for token in query.split():
+        word = token.rstrip("?？.!~,")
+        stem = stem_token(token)
+        if word in QUESTION_WORDS or word in FILLER_WORDS:
+            continue
+        if stem and stem not in ASPECT_WORDS and stem not in QUESTION_WORDS and stem not in FILLER_WORDS:
+            terms.append(stem)
+    return terms
+
+
+def is_follow_up(query: str) -> bool:
+    """
+    이전 질문에 기대는 후속 질문인지 (시작 표현을 빼면 자체 주제어 없이 항목만 묻는 경우)
+
+    시작 표현이 있어도 새 주제어가 있으면 단독 질문으로 본다 ("그럼 출장비 정산은?").
+
+    Args:
+        query: 사용자 질문
+
+    Returns:
+        후속 질문 여부
+    """
+    rest, _ = strip_follow_up_prefix(query)
+    return bool(rest.split()) and not topic_terms(rest)
+
+
+def rule_based_condense(query: str, previous: str) -> str:
+    """
+    규칙 기반 변환: 이전 질의의 주제어 + 후속 질문 ("공문서 접수 절차는?" + "그럼 서식은?" → "공문서 접수 서식은?")
+
+    Args:
+        query: 후속 질문
+        previous: 이전 단독 질의
+
+    Returns:
+        단독 질의
+    """
+    rest, _ = strip_follow_up_prefix(query)
+    words = rest.split()
+    while words and words[0] in FILLER_WORDS:
+        words.pop(0)
+    rest = " ".join(words)
+    topic = [term for term in topic_terms(previous) if term not in topic_terms(rest)]
+    return " ".join(topic + [rest]).strip() or query
+
+
+class CondensedQueryCache:
+    """(이전 질의, 후속 질문) → 단독 질의 LRU 캐시 (프로세스 공유)"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, previous: str, query: str) -> Optional[str]:
+        key = (normalize_query(previous), normalize_query(query))
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, previous: str, query: str, condensed: str) -> None:
+        key = (normalize_query(previous), normalize_query(query))
+        with self._lock:
+            self._entries[key] = condensed
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+
+_cache: Optional[CondensedQueryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_condense_cache(config: Dict) -> CondensedQueryCache:
+    """공유 변환 캐시"""
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = CondensedQueryCache((config.get('conversation') or {}).get('cache_size', 1000))
+        return _cache
+
+
+def llm_condense(query: str, history: List[str], config: Dict) -> str:
+    """
+    LLM 변환 (출력 토큰 제한, 실패하면 규칙 기반)
+
+    Args:
+        query: 후속 질문
+        history: 이전 단독 질의 (오래된 것부터)
+        config: config.yaml 설정
+
+    Returns:
+        단독 질의
+    """
+    from src.rag_chain import create_llm, get_token_usage
+
+    conversation_config = config.get('conversation') or {}
+    prompt = CONDENSE_PROMPT.format(history="\n".join(f"- {q}" for q in history), question=query)
+    with span("condense_llm") as s:
+        try:
+            llm = create_llm(config, max_tokens=conversation_config.get('max_tokens', 60))
+            response = llm.invoke([{"role": "user", "content": prompt}])
+            s.update(get_token_usage(response))
+            condensed = response.content.strip().splitlines()[0].strip().strip('"')
+        except Exception as e:
+            print(f"[WARN] 질문 변환 실패: {str(e)}")
+            s["failed"] = True
+            condensed = ""
+    return condensed or rule_based_condense(query, history[-1])
+
+
+class Conversation:
+    """
+    세션별 대화 맥락
+
+    사용 예:
+        conversation = Conversation(config)
+        standalone, reused_docs = conversation.prepare("그럼 서식은?")
+        ...
+        conversation.record(standalone, retrieved_docs)
+    """
+
+    def __init__(self, config: Dict):
+        """
+        Args:
+            config: config.yaml 설정 (conversation 섹션 사용)
+        """
+        conversation_config = config.get('conversation') or {}
+        self.config = config
+        self.method = conversation_config.get('condense', 'rule')
+        self.reuse_documents = conversation_config.get('reuse_documents', True)
+        self.history = deque(maxlen=conversation_config.get('max_turns', 4))
+        self.last_documents: Optional[List["Document"]] = None
+        self.last_rewrite: Optional[str] = None
+
+    def reset(self) -> None:
+        """대화 초기화"""
+        self.history.clear()
+        self.last_documents = None
+        self.last_rewrite = None
+
+    def prepare(self, query: str) -> Tuple[str, Optional[List["Document"]]]:
+        """
+        검색용 단독 질의와 재사용할 이전 검색 결과 결정
+
+        Args:
+            query: 사용자 질문
+
+        Returns:
+            (단독 질의, 재사용할 문서 리스트 또는 None)
+        """
+        self.last_rewrite = None
+        if not self.history or not is_follow_up(query):
+            return query, None
+
+        with span("condense", method=self.method) as s:
+            previous = self.history[-1]
+            cache = get_condense_cache(self.config)
+            condensed = cache.get(previous, query)
+            s["cached"] = condensed is not None
+            if condensed is None:
+                if self.method == "llm":
+                    condensed = llm_condense(query, list(self.history), self.config)
+                else:
+                    condensed = rule_based_condense(query, previous)
+                cache.put(previous, query, condensed)
+
+            # 후속 질문은 새 주제어가 없으므로 같은 주제 → 이전 검색 결과 재사용
+            reused = self.last_documents if self.reuse_documents and self.last_documents else None
+            s["reused"] = reused is not None
+
+        self.last_rewrite = condensed
+        return condensed, reused
+
+    def record(self, query: str, documents: Optional[List["Document"]]) -> None:
+        """
+        처리한 턴 기록
+
+        Args:
+            query: 검색에 사용한 단독 질의
+            documents: 검색 결과 (FAQ 답변 등 검색하지 않았으면 None)
+        """
+        self.history.append(query)
+        self.last_documents = documents
@@ -0,0 +1,305 @@
+"""
+코퍼스 레지스트리 모듈
+- 매뉴얼(행정, 교무, 회계, 시설 등)별 컬렉션 관리
+- 필요할 때 로드 (컬렉션별로 한 번만, 다른 컬렉션 로드를 막지 않음), 메모리 상한을 넘으면 LRU로 해제
+- 키워드 기반 질의 라우팅 (인덱스 존재 여부는 availability_ttl초 동안 캐시), 여러 컬렉션 병렬 검색 후 병합
+"""
+
+import os
+import time
+import threading
+from copy import deepcopy
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Dict, Optional, TYPE_CHECKING
+
+from src.vectorstore import load_vectorstore, load_bm25_index, check_database_exists, hybrid_search
+from src.tracing import span
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+
+def _path_size_mb(path: str) -> float:
+    """파일/디렉토리 크기 (MB)"""
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 1024 / 1024
+
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total / 1024 / 1024
+
+
+class CorpusRegistry:
+    """
+    여러 매뉴얼 컬렉션을 이름으로 관리
+
+    config.yaml의 corpora 섹션이 없으면 기존 pdf/database 설정을
+    이름이 "default"인 단일 컬렉션으로 사용한다.
+    """
+
+    def __init__(self, config: Dict):
+        """
+        Args:
+            config: config.yaml 설정
+        """
+        self.config = config
+
+        corpora = config.get('corpora') or {}
+        self.collections: Dict[str, Dict] = corpora.get('collections') or {
+            "default": {
+                "source_file": config['pdf']['source_file'],
+                "chroma_path": config['database']['chroma_path'],
+                "bm25_path": config['database']['bm25_path'],
+                "keywords": []
+            }
+        }
+        self.default = corpora.get('default') or next(iter(self.collections))
+        self.memory_cap_mb = corpora.get('memory_cap_mb', 2048)
+        self.max_loaded = corpora.get('max_loaded', 4)
+        self.max_fanout = corpora.get('max_fanout', 4)
+        self.availability_ttl = corpora.get('availability_ttl', 60)
+
+        self._loaded: "OrderedDict[str, Dict]" = OrderedDict()
+        self._loading: Dict[str, Future] = {}
+        self._available: Optional[List[str]] = None
+        self._available_at = 0.0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 컬렉션 설정
+    # ------------------------------------------------------------------
+
+    def collection_config(self, name: str) -> Dict:
+        """
+        컬렉션 전용 config (pdf/database 경로만 교체)
+
+        Args:
+            name: 컬렉션 이름
+
+        Returns:
+            config 사본
+        """
+        if name not in self.collections:
+            raise KeyError(f"등록되지 않은 컬렉션입니다: {name}")
+
+        collection = self.collections[name]
+        collection_config = deepcopy(self.config)
+        collection_config['pdf']['source_file'] = collection['source_file']
+        collection_config['database']['chroma_path'] = collection['chroma_path']
+        collection_config['database']['bm25_path'] = collection['bm25_path']
+        return collection_config
+
+    def available(self) -> List[str]:
+        """인덱스가 만들어진 컬렉션 이름 목록 (availability_ttl초 동안 캐시, 새로 만든 컬렉션은 그 뒤 반영)"""
+        now = time.monotonic()
+        with self._lock:
+            if self._available is not None and now - self._available_at < self.availability_ttl:
+                return self._available
+
+        available = [
+            name for name, collection in self.collections.items()
+            if check_database_exists(collection['chroma_path'], collection['bm25_path'])
+        ]
+        with self._lock:
+            self._available = available
+            self._available_at = now
+        return available
+
+    # ------------------------------------------------------------------
+    # 로드 / LRU 해제
+    # ------------------------------------------------------------------
+
+    def get(self, name: str) -> Dict:
+        """
+        컬렉션 인덱스 (없으면 로드, 사용 시 LRU 갱신)
+
+        Args:
+            name: 컬렉션 이름
+
+        Returns:
+            {"name", "config", "vectorstore", "bm25", "chunks", "size_mb"}
+
+        같은 컬렉션을 동시에 요청하면 한 번만 로드하고, 로드는 잠금 밖에서 하므로
+        다른 컬렉션 조회는 기다리지 않는다.
+        """
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+            future = self._loading.get(name)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._loading[name] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            collection = self._load(name)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[name]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._loaded[name] = collection
+            del self._loading[name]
+            self._evict(keep=name)
+        future.set_result(collection)
+        return collection
+
+    def _load(self, name: str) -> Dict:
+        collection_config = self.collection_config(name)
+        database = collection_config['database']
+
+        with span("corpus_load", collection=name) as s:
+            vectorstore = load_vectorstore(collection_config)
+            bm25, chunks = load_bm25_index(database['bm25_path'])
+            # 메모리 사용량은 디스크 크기로 근사
+            size_mb = _path_size_mb(database['bm25_path']) + _path_size_mb(database['chroma_path'])
+            s["size_mb"] = round(size_mb, 1)
+
+        return {
+            "name": name,
+            "config": collection_config,
+            "vectorstore": vectorstore,
+            "bm25": bm25,
+            "chunks": chunks,
+            "size_mb": size_mb
+        }
+
+    def _evict(self, keep: str) -> None:
+        """메모리 상한/개수 상한을 넘으면 오래 안 쓴 컬렉션부터 해제"""
+        while len(self._loaded) > 1 and (
+            len(self._loaded) > self.max_loaded or self.loaded_size_mb() > self.memory_cap_mb
+        ):
+            name, _ = next(iter(self._loaded.items()))
+            if name == keep:
+                break
+            del self._loaded[name]
+            print(f"[INFO] 컬렉션 해제 (LRU): {name}")
+
+    def loaded_size_mb(self) -> float:
+        """로드된 컬렉션의 추정 메모리 (MB)"""
+        return sum(item["size_mb"] for item in self._loaded.values())
+
+    def status(self) -> Dict:
+        """로드 현황"""
+        with self._lock:
+            return {
+                "collections": list(self.collections),
+                "loaded": list(self._loaded),
+                "loaded_size_mb": round(self.loaded_size_mb(), 1),
+                "memory_cap_mb": self.memory_cap_mb
+            }
+
+    # ------------------------------------------------------------------
+    # 라우팅 / 검색
+    # ------------------------------------------------------------------
+
+    def route(self, query: str) -> List[str]:
+        """
+        질의를 검색할 컬렉션 선택 (키워드 기반)
+
+        키워드가 가장 많이 일치한 컬렉션만 검색하고,
+        일치하는 키워드가 없으면 사용 가능한 컬렉션 전체로 확장한다.
+
+        Args:
+            query: 사용자 질문
+
+        Returns:
+            컬렉션 이름 목록
+        """
+        available = self.available()
+        if len(available) <= 1:
+            return available
+
+        scores = {}
+        for name in available:
+            keywords = [name] + list(self.collections[name].get('keywords', []))
+            scores[name] = sum(1 for keyword in keywords if keyword and keyword in query)
+
+        best = max(scores.values())
+        if best == 0:
+            # 기본 컬렉션을 앞에 두고 전체 검색
+            ordered = sorted(available, key=lambda name: name != self.default)
+            return ordered[:self.max_fanout]
+
+        return [name for name in available if scores[name] == best][:self.max_fanout]
+
+    def search(self, query: str, names: Optional[List[str]] = None,
+               query_embedding: Optional[List[float]] = None) -> List["Document"]:
+        """
+        라우팅된 컬렉션을 병렬 검색 후 병합
+
+        Args:
+            query: 사용자 질문
+            names: 이미 라우팅한 컬렉션 (없으면 route()로 결정)
+            query_embedding: 이미 계산한 질의 임베딩 (없으면 한 번만 계산해 모든 컬렉션에서 사용)
+
+        Returns:
+            검색 결과 문서 리스트 (final_top_k개)
+        """
+        if names is None:
+            with span("routing") as s:
+                names = self.route(query)
+                s["collections"] = names
+
+        if not names:
+            return []
+
+        # 컬렉션은 같은 임베딩 설정을 쓰므로 여러 컬렉션을 검색할 때도 질의 임베딩은 한 번만 계산
+        if query_embedding is None and len(names) > 1:
+            with span("query_embedding"):
+                query_embedding = self.get(names[0])["vectorstore"].embeddings.embed_query(query)
+
+        def search_one(name: str) -> List["Document"]:
+            collection = self.get(name)
+            docs = hybrid_search(
+                query=query,
+                vectorstore=collection["vectorstore"],
+                bm25=collection["bm25"],
+                bm25_chunks=collection["chunks"],
+                config=collection["config"],
+                query_embedding=query_embedding
+            )
+            # 청크 문서는 인덱스/검색 캐시가 공유하므로 사본에 컬렉션 표시
+            return [
+                type(doc)(page_content=doc.page_content, metadata={**doc.metadata, 'collection': name})
+                for doc in docs
+            ]
+
+        if len(names) == 1:
+            return search_one(names[0])
+
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            results = list(executor.map(search_one, names))
+
+        return merge_ranked_lists(results, self.config['retrieval']['final_top_k'])
+
+
+def merge_ranked_lists(ranked_lists: List[List["Document"]], top_k: int) -> List["Document"]:
+    """
+    컬렉션별 순위 목록을 번갈아 합치기 (각 목록의 상위 결과가 골고루 포함되도록)
+
+    Args:
+        ranked_lists: 컬렉션별 검색 결과
+        top_k: 최종 개수
+
+    Returns:
+        병합된 문서 리스트
+    """
+    merged = []
+    depth = max((len(docs) for docs in ranked_lists), default=0)
+    for rank in range(depth):
+        for docs in ranked_lists:
+            if rank < len(docs):
+                merged.append(docs[rank])
+                if len(merged) >= top_k:
+                    return merged
+    return merged
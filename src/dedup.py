@@ -0,0 +1,221 @@
+"""
+중복 제거 모듈 (인덱스 생성 시)
+- 페이지 머리말/꼬리말: 페이지 위아래 몇 줄 중 여러 페이지(홀수/짝수 페이지 따로)에 똑같이 나오는 줄을 제거
+  (쪽 번호는 "쪽 번호 - 페이지 번호"가 같으면 같은 줄로 봄, 표 숫자/금액은 그대로 둠)
+- 거의 같은 청크: 문자 n-gram MinHash 서명 + LSH 밴드로 후보를 찾고, 추정 Jaccard 유사도가
+  threshold 이상이면 하나로 합침 (가장 긴 청크를 대표로, 나온 페이지는 pages 메타데이터에 기록)
+
+반복되는 공통 주의사항, 서식 머리말 등이 임베딩/인덱스 공간을 차지하고 검색 결과를 채우는 것을 막는다.
+"""
+
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, List, Set, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+
+# 줄 끝의 쪽 번호: "12", "- 12 -", "12 / 340", "p. 12", "12쪽", "업무매뉴얼 | 12"
+_PAGE_NUMBER_RE = re.compile(
+    r'^(?:(?P<text>.*?\S)\s+(?:[|·]\s*)?)??(?:[-–—]\s*)?(?:p\.\s*)?(?P<number>\d{1,4})'
+    r'(?:\s*/\s*\d{1,4})?(?:\s*(?:쪽|페이지))?(?:\s*[-–—])?$',
+    re.IGNORECASE
+)
+
+# MinHash 해시 (a * x + b) mod p
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _line_keys(line: str, page: int) -> Set[str]:
+    """
+    머리말/꼬리말 비교 키
+
+    줄 그대로의 키에 더해, 쪽 번호 모양이면 번호를 페이지와의 차이로 바꾼 키도 만든다.
+    쪽 번호는 페이지마다 같은 차이로 늘어나므로 같은 키가 되고,
+    표 값/금액처럼 페이지와 상관없는 숫자는 페이지마다 다른 키가 되어 남는다.
+    """
+    line = " ".join(line.split())
+    keys = {line}
+    match = _PAGE_NUMBER_RE.match(line)
+    if match:
+        keys.add(f"{match.group('text') or ''}#page{int(match.group('number')) - page:+d}")
+    return keys
+
+
+def strip_page_furniture(pages_data: List[Dict], edge_lines: int = 2, min_ratio: float = 0.5) -> Tuple[List[Dict], int]:
+    """
+    페이지 머리말/꼬리말 제거
+
+    Args:
+        pages_data: [{"page", "text"}] (extract_text_from_pdf 결과)
+        edge_lines: 페이지 위/아래에서 살펴볼 줄 수
+        min_ratio: 이 비율 이상의 페이지에 나오는 줄만 머리말/꼬리말로 봄
+            (홀수/짝수 페이지 머리말이 다른 양면 편집이 있어 홀짝 페이지를 따로 셈)
+
+    Returns:
+        (정리된 페이지 리스트, 제거한 줄 수)
+    """
+    if len(pages_data) < 3:
+        return pages_data, 0
+
+    def edges(lines: List[str]) -> List[str]:
+        return lines[:edge_lines] + lines[-edge_lines:]
+
+    counts = (Counter(), Counter())
+    totals = [0, 0]
+    for index, page_data in enumerate(pages_data):
+        page = page_data.get('page', index + 1)
+        lines = [line for line in page_data['text'].splitlines() if line.strip()]
+        counts[page % 2].update(set().union(*(_line_keys(line, page) for line in edges(lines))))
+        totals[page % 2] += 1
+
+    furniture = tuple(
+        {key for key, count in counts[parity].items() if count >= totals[parity] * min_ratio}
+        for parity in (0, 1)
+    )
+    if not any(furniture):
+        return pages_data, 0
+
+    cleaned = []
+    removed = 0
+    for index, page_data in enumerate(pages_data):
+        page = page_data.get('page', index + 1)
+        lines = page_data['text'].splitlines()
+        content = [i for i, line in enumerate(lines) if line.strip()]
+        edge_positions = set(content[:edge_lines] + content[-edge_lines:])
+        kept = []
+        for i, line in enumerate(lines):
+            if i in edge_positions and _line_keys(line, page) & furniture[page % 2]:
+                removed += 1
+                continue
+            kept.append(line)
+        cleaned.append({**page_data, "text": "\n".join(kept)})
+    return cleaned, removed
+
+
+def shingles(text: str, size: int = 5) -> np.ndarray:
+    """공백을 정리한 본문의 문자 n-gram 해시 (crc32, 실행마다 같은 값)"""
+    text = " ".join(text.split())
+    if len(text) <= size:
+        grams = {text}
+    else:
+        grams = {text[i:i + size] for i in range(len(text) - size + 1)}
+    return np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint64, count=len(grams))
+
+
+class MinHasher:
+    """
+    MinHash 서명 생성 (고정 시드 → 같은 설정이면 같은 서명)
+
+    사용 예:
+        hasher = MinHasher(num_perm=128)
+        signature = hasher.signature("공문서 접수 절차 ...")
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        # a, b < 2^32, x < 2^32 → a * x + b가 uint64 안에 들어감
+        self._a = rng.randint(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = shingles(text, self.shingle_size)
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1)
+
+
+def find_near_duplicates(texts: List[str], threshold: float = 0.9, num_perm: int = 128,
+                         bands: int = 16, shingle_size: int = 5) -> List[List[int]]:
+    """
+    거의 같은 청크 묶음
+
+    Args:
+        texts: 청크 본문
+        threshold: 같은 청크로 볼 추정 Jaccard 유사도
+        num_perm: MinHash 서명 길이
+        bands: LSH 밴드 수 (num_perm의 약수, 많을수록 후보가 늘어남)
+        shingle_size: 문자 n-gram 길이
+
+    Returns:
+        2개 이상인 묶음의 청크 위치 리스트 (각 묶음은 오름차순)
+    """
+    hasher = MinHasher(num_perm, shingle_size)
+    signatures = np.stack([hasher.signature(text) for text in texts]) if texts else np.empty((0, num_perm))
+    rows = num_perm // bands
+
+    # 밴드가 하나라도 같으면 후보
+    candidates = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, signature in enumerate(signatures):
+            buckets[signature[band * rows:(band + 1) * rows].tobytes()].append(i)
+        for members in buckets.values():
+            for j in range(1, len(members)):
+                candidates.add((members[0], members[j]))
+                if j > 1:
+                    candidates.add((members[j - 1], members[j]))
+
+    # 서명으로 유사도 확인 후 union-find로 묶음
+    parent = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in candidates:
+        if np.mean(signatures[i] == signatures[j]) >= threshold:
+            parent[find(j)] = find(i)
+
+    groups = defaultdict(list)
+    for i in range(len(texts)):
+        groups[find(i)].append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def collapse_duplicates(chunks: List["Document"], config: Dict) -> Tuple[List["Document"], Dict]:
+    """
+    거의 같은 청크를 대표 청크 하나로 합침
+
+    대표는 묶음에서 가장 긴 청크이고, 묶음 전체의 페이지를 pages("12, 45, 78")에,
+    합쳐진 청크 수를 duplicates에 기록한다. 순서는 대표 청크 위치 기준으로 유지한다.
+
+    Args:
+        chunks: 청크 문서 리스트
+        config: config.yaml의 dedup 설정
+
+    Returns:
+        (정리된 청크 리스트, {"before", "after", "groups", "ratio"})
+    """
+    groups = find_near_duplicates(
+        [chunk.page_content for chunk in chunks],
+        threshold=config.get('threshold', 0.9),
+        num_perm=config.get('num_perm', 128),
+        bands=config.get('bands', 16),
+        shingle_size=config.get('shingle_size', 5)
+    )
+
+    dropped = set()
+    for members in groups:
+        canonical = max(members, key=lambda i: (len(chunks[i].page_content), -i))
+        pages = sorted({chunks[i].metadata.get('page') for i in members if chunks[i].metadata.get('page') is not None})
+        chunks[canonical].metadata['pages'] = ", ".join(str(page) for page in pages)
+        chunks[canonical].metadata['duplicates'] = len(members)
+        dropped.update(i for i in members if i != canonical)
+
+    kept = [chunk for i, chunk in enumerate(chunks) if i not in dropped]
+    report = {
+        "before": len(chunks),
+        "after": len(kept),
+        "groups": len(groups),
+        "ratio": round(len(dropped) / len(chunks), 4) if chunks else 0.0
+    }
+    return kept, report
@@ -0,0 +1,105 @@
+"""
+임베딩 캐시 모듈
+- 텍스트 → 임베딩 벡터를 SQLite에 영구 저장
+- 같은 텍스트는 API를 다시 호출하지 않음 (평가/재청킹 실험 비용 절감)
+"""
+
+import os
+import array
+import hashlib
+import sqlite3
+import threading
+from typing import List, Optional
+from langchain.schema.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    임베딩 캐시 래퍼
+
+    사용 예:
+        embeddings = CachedEmbeddings(create_embeddings(config), "./data/embedding_cache.sqlite",
+                                      namespace="text-embedding-ada-002")
+    """
+
+    def __init__(self, base: Embeddings, cache_path: Optional[str] = None, namespace: str = ""):
+        """
+        Args:
+            base: 실제 임베딩 객체
+            cache_path: SQLite 파일 경로 (None이면 메모리에만 저장)
+            namespace: 모델/차원 구분자 (모델이 바뀌면 캐시가 섞이지 않도록)
+        """
+        self.base = base
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(cache_path or ":memory:", check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\x00{text}".encode('utf-8')).hexdigest()
+
+    def _get_many(self, keys: List[str]) -> dict:
+        found = {}
+        with self._lock:
+            # SQLite 변수 개수 제한을 피하기 위해 나눠서 조회
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array.array('f', blob).tolist()
+        return found
+
+    def _put_many(self, items: List[tuple]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array.array('f', vector).tobytes()) for key, vector in items]
+            )
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        cached = self._get_many(list(set(keys)))
+
+        # 캐시에 없는 텍스트만 한 번에 요청 (중복 제거)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.base.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self._put_many(new_items)
+            cached.update(new_items)
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        cached = self._get_many([key])
+        if key in cached:
+            with self._lock:
+                self.hits += 1
+            return cached[key]
+
+        vector = self.base.embed_query(text)
+        self._put_many([(key, vector)])
+        with self._lock:
+            self.misses += 1
+        return vector
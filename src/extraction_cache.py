@@ -0,0 +1,229 @@
+"""
+PDF 페이지 추출 캐시 모듈
+- (PDF 파일 해시, 페이지 번호, 추출기 버전) → 페이지 텍스트 + 레이아웃 블록을 SQLite에 저장
+- 같은 PDF를 다시 처리하면 PyMuPDF를 열지 않고 저장된 텍스트를 바로 사용
+  (DB 재생성, 구조 분석, 재청킹 실험이 같은 캐시를 공유)
+- 페이지 단위로 순회하므로 전체 텍스트를 한 문자열로 만들지 않음
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional
+
+
+# 추출 방식(get_text 옵션, 블록 형식)이 바뀌면 올려서 이전 항목을 무효화
+EXTRACTOR_VERSION = "text-blocks-1"
+
+# 블록 튜플: (x0, y0, x1, y1, 텍스트, 블록 번호, 블록 종류)
+BLOCK_FIELDS = ("x0", "y0", "x1", "y1", "text", "block_no", "block_type")
+
+
+def file_hash(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    파일 내용 SHA-256 (나눠 읽기)
+
+    Args:
+        path: 파일 경로
+        chunk_size: 한 번에 읽을 크기
+
+    Returns:
+        16진수 해시
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extractor_version() -> str:
+    """추출기 버전 (PyMuPDF 버전 포함)"""
+    try:
+        import fitz
+        return f"{EXTRACTOR_VERSION}@{fitz.VersionBind}"
+    except (ImportError, AttributeError):
+        return EXTRACTOR_VERSION
+
+
+class ExtractionCache:
+    """
+    페이지 추출 캐시
+
+    사용 예:
+        with ExtractionCache("./data/extraction_cache.sqlite") as cache:
+            for page in cache.iter_pages("manual.pdf"):
+                print(page["page"], len(page["text"]))
+    """
+
+    def __init__(self, path: Optional[str] = None, version: Optional[str] = None):
+        """
+        Args:
+            path: SQLite 파일 경로 (None이면 메모리에만 저장)
+            version: 추출기 버전 (기본값: extractor_version())
+        """
+        self.path = path
+        self.version = version or extractor_version()
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                file_hash TEXT NOT NULL,
+                version TEXT NOT NULL,
+                page_count INTEGER NOT NULL,
+                PRIMARY KEY (file_hash, version)
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                file_hash TEXT NOT NULL,
+                version TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                blocks TEXT NOT NULL,
+                PRIMARY KEY (file_hash, version, page)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        """SQLite 연결 닫기"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "ExtractionCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def page_count(self, digest: str) -> Optional[int]:
+        """저장된 페이지 수 (처음 보는 파일이면 None)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_count FROM files WHERE file_hash = ? AND version = ?", (digest, self.version)
+            ).fetchone()
+        return row[0] if row else None
+
+    def cached_pages(self, digest: str) -> List[int]:
+        """저장된 페이지 번호 목록"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page FROM pages WHERE file_hash = ? AND version = ? ORDER BY page", (digest, self.version)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_page(self, digest: str, page: int, with_blocks: bool = False) -> Optional[Dict]:
+        """
+        페이지 조회
+
+        Args:
+            digest: PDF 파일 해시
+            page: 페이지 번호 (1부터)
+            with_blocks: 레이아웃 블록 포함 여부
+
+        Returns:
+            {"page", "text", "blocks"?} 또는 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT text{', blocks' if with_blocks else ''} FROM pages "
+                "WHERE file_hash = ? AND version = ? AND page = ?",
+                (digest, self.version, page)
+            ).fetchone()
+        if row is None:
+            return None
+
+        page_data = {"page": page, "text": row[0]}
+        if with_blocks:
+            page_data["blocks"] = [dict(zip(BLOCK_FIELDS, block)) for block in json.loads(row[1])]
+        return page_data
+
+    def put_pages(self, digest: str, pages: List[Dict], page_count: int) -> None:
+        """
+        페이지 저장
+
+        Args:
+            digest: PDF 파일 해시
+            pages: [{"page", "text", "blocks"}] (blocks는 BLOCK_FIELDS 순서의 리스트)
+            page_count: PDF 전체 페이지 수
+        """
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                [(digest, self.version, p["page"], p["text"], json.dumps(p["blocks"], ensure_ascii=False))
+                 for p in pages]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (digest, self.version, page_count)
+            )
+            self._conn.commit()
+
+    def iter_pages(self, pdf_path: str, with_blocks: bool = False, batch_size: int = 50) -> Iterator[Dict]:
+        """
+        페이지 순서대로 텍스트 순회 (없는 페이지만 추출해 저장)
+
+        Args:
+            pdf_path: PDF 파일 경로
+            with_blocks: 레이아웃 블록 포함 여부
+            batch_size: 새로 추출한 페이지를 이만큼씩 모아 저장
+
+        Yields:
+            {"page", "text", "blocks"?}
+        """
+        digest = file_hash(pdf_path)
+        page_count = self.page_count(digest)
+        cached = set(self.cached_pages(digest))
+
+        # 모든 페이지가 있으면 PDF를 열지 않음
+        if page_count is not None and len(cached) >= page_count:
+            for page in range(1, page_count + 1):
+                self.hits += 1
+                yield self.get_page(digest, page, with_blocks)
+            return
+
+        import fitz  # PyMuPDF
+
+        doc = fitz.open(pdf_path)
+        pending = []
+        try:
+            page_count = len(doc)
+            for page_num in range(1, page_count + 1):
+                if page_num in cached:
+                    self.hits += 1
+                    yield self.get_page(digest, page_num, with_blocks)
+                    continue
+
+                self.misses += 1
+                page = doc[page_num - 1]
+                page_data = {
+                    "page": page_num,
+                    "text": page.get_text(),
+                    "blocks": [list(block) for block in page.get_text("blocks")]
+                }
+                pending.append(page_data)
+                if len(pending) >= batch_size:
+                    self.put_pages(digest, pending, page_count)
+                    pending = []
+
+                if with_blocks:
+                    yield {**page_data, "blocks": [dict(zip(BLOCK_FIELDS, block)) for block in page_data["blocks"]]}
+                else:
+                    yield {"page": page_num, "text": page_data["text"]}
+        finally:
+            # 순회를 중간에 멈추거나(break, 호출 측 예외) 끝까지 돌아도 남은 묶음 저장
+            # (빠진 페이지만 다음 실행에서 추출)
+            if pending:
+                self.put_pages(digest, pending, page_count)
+            doc.close()
+
+    def stats(self) -> Dict:
+        """조회 현황"""
+        return {"hits": self.hits, "misses": self.misses, "version": self.version}
@@ -0,0 +1,235 @@
+"""
+FAQ 답변 저장소 모듈
+- 매뉴얼 목차(소분류)로 만든 대표 질문의 검증된 답변 + 질문 임베딩을 SQLite에 저장
+- 질의 시 정규화 질문 일치 → 임베딩 최근접 이웃 순으로 조회
+  (같은 질의가 반복되면 최근 질의 임베딩을 재사용해 임베딩 API를 다시 부르지 않음)
+- 유사도가 임계값 이상이면 검색/LLM 없이 저장된 답변 반환
+
+저장소는 scripts/build_faq.py로 오프라인 생성한다.
+"""
+
+import os
+import array
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.vectorstore import normalize_query
+
+
+def canonical_question(heading: Dict) -> str:
+    """
+    목차 제목으로 대표 질문 생성
+
+    Args:
+        heading: {"level1", "level2", "level3", "page"}
+
+    Returns:
+        "<소분류> 절차는?"
+    """
+    return f"{heading['level3']} 절차는?"
+
+
+class FAQStore:
+    """
+    FAQ 답변 저장소
+
+    사용 예:
+        store = FAQStore("./data/faq_store.sqlite")
+        entry, vector = store.lookup("공문서 접수 절차는?", embed=embeddings.embed_query)
+    """
+
+    def __init__(self, path: str, similarity_threshold: float = 0.93, build_id: Optional[str] = None,
+                 query_vector_cache: int = 256):
+        """
+        Args:
+            path: SQLite 파일 경로
+            similarity_threshold: 최근접 이웃 코사인 유사도 임계값
+            build_id: 인덱스 빌드 ID (지정하면 같은 빌드에서 만든 답변만 사용)
+            query_vector_cache: 재사용할 최근 질의 임베딩 수 (0이면 끔)
+        """
+        self.path = path
+        self.similarity_threshold = similarity_threshold
+        self.build_id = build_id
+        self.query_vector_cache = query_vector_cache
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS faq (
+                key TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                heading TEXT,
+                page INTEGER,
+                build_id TEXT,
+                created_at TEXT
+            )
+            """
+        )
+        self._conn.commit()
+
+        self._questions: Dict[str, int] = {}
+        self._rows: List[Dict] = []
+        self._matrix = None
+        self._query_vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._reload()
+
+    def _reload(self) -> None:
+        """메모리 인덱스 (정규화 질문 맵, 정규화 임베딩 행렬) 재구성"""
+        import numpy as np
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, question, answer, vector, heading, page, build_id FROM faq"
+            ).fetchall()
+
+        entries, vectors = [], []
+        for key, question, answer, blob, heading, page, build_id in rows:
+            if self.build_id and build_id != self.build_id:
+                continue
+            entries.append({"key": key, "question": question, "answer": answer,
+                            "heading": heading, "page": page})
+            vectors.append(array.array('f', blob))
+
+        self._rows = entries
+        self._questions = {entry["key"]: i for i, entry in enumerate(entries)}
+        if vectors:
+            matrix = np.asarray(vectors, dtype=np.float32)
+            self._matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        else:
+            self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def put(self, question: str, answer: str, vector: List[float], heading: str = None,
+            page: int = None, build_id: str = None) -> None:
+        """
+        답변 저장 (같은 질문이면 덮어씀)
+
+        Args:
+            question: 대표 질문
+            answer: 검증된 답변
+            vector: 질문 임베딩 (인덱스와 같은 모델)
+            heading: 목차 경로 (대분류 > 중분류 > 소분류)
+            page: 제목 페이지
+            build_id: 답변 생성에 사용한 인덱스 빌드 ID
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO faq VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_query(question), question, answer, array.array('f', vector).tobytes(),
+                 heading, page, build_id, datetime.now().isoformat(timespec='seconds'))
+            )
+            self._conn.commit()
+
+    def commit(self) -> None:
+        """저장 후 메모리 인덱스 갱신"""
+        self._reload()
+
+    def lookup(self, query: str, embed: Optional[Callable[[str], List[float]]] = None) -> Tuple[Optional[Dict], Optional[List[float]]]:
+        """
+        저장된 답변 조회
+
+        Args:
+            query: 사용자 질문
+            embed: 질의 임베딩 함수 (None이면 정규화 질문 일치만 확인)
+
+        Returns:
+            (항목 또는 None, 계산한 질의 임베딩 또는 None — 검색 단계에서 재사용)
+        """
+        normalized = normalize_query(query)
+        index = self._questions.get(normalized)
+        if index is not None:
+            self.hits += 1
+            return {**self._rows[index], "similarity": 1.0}, None
+
+        if embed is None or self._matrix is None:
+            self.misses += 1
+            return None, None
+
+        import numpy as np
+
+        vector = self._query_vector(normalized, query, embed)
+        query_vector = np.asarray(vector, dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+
+        scores = self._matrix @ query_vector
+        best = int(np.argmax(scores))
+        if scores[best] >= self.similarity_threshold:
+            self.hits += 1
+            return {**self._rows[best], "similarity": round(float(scores[best]), 4)}, vector
+
+        self.misses += 1
+        return None, vector
+
+    def _query_vector(self, normalized: str, query: str, embed: Callable[[str], List[float]]) -> List[float]:
+        """질의 임베딩 (최근 질의는 재사용, 저장소 내용/임계값과 무관하게 항상 최근접 이웃 조회에 사용)"""
+        with self._lock:
+            vector = self._query_vectors.get(normalized)
+            if vector is not None:
+                self._query_vectors.move_to_end(normalized)
+                return vector
+
+        vector = embed(query)
+        if self.query_vector_cache > 0:
+            with self._lock:
+                self._query_vectors[normalized] = vector
+                while len(self._query_vectors) > self.query_vector_cache:
+                    self._query_vectors.popitem(last=False)
+        return vector
+
+    def stats(self) -> Dict:
+        """조회 현황"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+
+# (경로, 빌드 ID) → (파일 수정 시각, 저장소)
+_stores: Dict[Tuple[str, Optional[str]], Tuple[float, FAQStore]] = {}
+_stores_lock = threading.Lock()
+
+
+def get_faq_store(config: Dict, build_id: Optional[str] = None) -> Optional[FAQStore]:
+    """
+    config의 faq 설정에 맞는 공유 저장소
+
+    Args:
+        config: config.yaml 설정
+        build_id: 현재 인덱스 빌드 ID (다른 빌드로 만든 답변은 제외)
+
+    Returns:
+        FAQStore (비활성화거나 파일이 없으면 None, build_faq.py로 파일을 다시 만들면 새로 로드)
+    """
+    faq_config = config.get('faq') or {}
+    path = faq_config.get('store_path')
+    if not faq_config.get('enabled', False) or not path or not os.path.exists(path):
+        return None
+
+    mtime = os.path.getmtime(path)
+    with _stores_lock:
+        cached = _stores.get((path, build_id))
+        if cached is None or cached[0] != mtime:
+            store = FAQStore(
+                path,
+                similarity_threshold=faq_config.get('similarity_threshold', 0.93),
+                build_id=build_id,
+                query_vector_cache=faq_config.get('query_vector_cache', 256)
+            )
+            # 생성 시 테이블 준비로 파일이 바뀌었을 수 있으므로 로드 후 시각 기록
+            cached = (os.path.getmtime(path), store)
+            _stores[(path, build_id)] = cached
+        return cached[1]
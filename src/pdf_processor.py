@@ -4,25 +4,40 @@ PDF 처리 모듈
 - 계층 구조 파싱
 - 메타데이터 추출
 - 청킹 처리
+- 머리말/꼬리말 제거, 거의 같은 청크 합치기 (dedup 설정)
 """
 
+import os
 import fitz  # PyMuPDF
 import re
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+from src.extraction_cache import ExtractionCache
+from src.dedup import strip_page_furniture, collapse_duplicates
 
-def extract_text_from_pdf(pdf_path: str) -> List[Dict]:
+
+def extract_text_from_pdf(pdf_path: str, cache_path: Optional[str] = None) -> List[Dict]:
     """
     PDF에서 페이지별 텍스트 추출
     
     Args:
         pdf_path: PDF 파일 경로
+        cache_path: 페이지 추출 캐시 경로 (지정하면 저장된 페이지는 다시 추출하지 않음)
         
     Returns:
         페이지별 텍스트 리스트 [{"page": 1, "text": "..."}]
     """
+    if cache_path:
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(f"PDF 파일을 찾을 수 없습니다: {pdf_path}")
+        try:
+            with ExtractionCache(cache_path) as cache:
+                return list(cache.iter_pages(pdf_path))
+        except Exception as e:
+            raise Exception(f"PDF 처리 중 오류 발생: {str(e)}")
+    
     try:
         doc = fitz.open(pdf_path)
         pages_data = []
@@ -43,6 +58,64 @@ def extract_text_from_pdf(pdf_path: str) -> List[Dict]:
         raise Exception(f"PDF 처리 중 오류 발생: {str(e)}")
 
 
+# 제목 패턴 (대분류: 로마숫자, 중분류: 숫자, 소분류: 하이픈)
+ROMAN_PATTERN = r'^([ⅠⅡⅢⅣⅤⅥⅦⅧⅨⅩ]+)\.\s*(.+)$'
+NUMBER_PATTERN = r'^(\d+)\.\s+([가-힣].+)$'
+HYPHEN_PATTERN = r'^(\d+-\d+)\s+(.+)$'
+
+# 목차 줄 끝의 점선/페이지 번호 ("공문서 접수 ······ 15")
+_TOC_TAIL_RE = re.compile(r'(?:\s*[·.…ㆍ]{2,}[\s·.…ㆍ]*\d*|\s{2,}\d+)\s*$')
+
+
+def clean_heading(title: str) -> str:
+    """제목에서 목차 점선/페이지 번호 제거"""
+    return _TOC_TAIL_RE.sub('', title).strip()
+
+
+def extract_headings(pages_data: List[Dict]) -> List[Dict]:
+    """
+    페이지 순서대로 대분류/중분류/소분류 제목 수집 (소분류마다 상위 제목 포함)
+    
+    Args:
+        pages_data: extract_text_from_pdf() 결과
+        
+    Returns:
+        [{"level1", "level2", "level3", "page"}] (같은 제목은 처음 나온 페이지만)
+    """
+    patterns = [
+        ("level1", re.compile(ROMAN_PATTERN)),
+        ("level2", re.compile(NUMBER_PATTERN)),
+        ("level3", re.compile(HYPHEN_PATTERN))
+    ]
+    
+    current = {"level1": None, "level2": None}
+    headings = []
+    seen = set()
+    
+    for page_data in pages_data:
+        for line in page_data['text'].splitlines():
+            line = line.strip()
+            for level, pattern in patterns:
+                match = pattern.match(line)
+                if not match:
+                    continue
+                title = clean_heading(match.group(2))
+                if not title:
+                    break
+                if level == "level1":
+                    current = {"level1": title, "level2": None}
+                elif level == "level2":
+                    current["level2"] = title
+                else:
+                    key = (current["level1"], current["level2"], title)
+                    if key not in seen:
+                        seen.add(key)
+                        headings.append({**current, "level3": title, "page": page_data['page']})
+                break
+    
+    return headings
+
+
 def parse_hierarchy(text: str) -> Dict:
     """
     정규식으로 섹션 계층 추출
@@ -60,20 +133,17 @@ def parse_hierarchy(text: str) -> Dict:
     }
     
     # 로마숫자 대분류 패턴
-    roman_pattern = r'^([ⅠⅡⅢⅣⅤⅥⅦⅧⅨⅩ]+)\.\s*(.+)$'
-    roman_match = re.search(roman_pattern, text, re.MULTILINE)
+    roman_match = re.search(ROMAN_PATTERN, text, re.MULTILINE)
     if roman_match:
         hierarchy["level1"] = roman_match.group(2).strip()
     
     # 아라비아숫자 중분류 패턴
-    number_pattern = r'^(\d+)\.\s+([가-힣].+)$'
-    number_match = re.search(number_pattern, text, re.MULTILINE)
+    number_match = re.search(NUMBER_PATTERN, text, re.MULTILINE)
     if number_match:
         hierarchy["level2"] = number_match.group(2).strip()
     
     # 하이픈 소분류 패턴
-    hyphen_pattern = r'^(\d+-\d+)\s+(.+)$'
-    hyphen_match = re.search(hyphen_pattern, text, re.MULTILINE)
+    hyphen_match = re.search(HYPHEN_PATTERN, text, re.MULTILINE)
     if hyphen_match:
         hierarchy["level3"] = hyphen_match.group(2).strip()
     
@@ -172,21 +242,29 @@ def chunk_documents(documents: List[Document], config: Dict) -> List[Document]:
     return chunks
 
 
-def process_pdf(pdf_path: str, config: Dict) -> List[Document]:
+def chunk_pages(pages_data: List[Dict], config: Dict, report: Optional[Dict] = None) -> List[Document]:
     """
-    PDF 전체 처리 파이프라인
+    추출한 페이지 → 청크 (머리말/꼬리말 제거, 청킹, 중복 청크 합침)
     
     Args:
-        pdf_path: PDF 파일 경로
+        pages_data: [{"page", "text"}] (extract_text_from_pdf 결과)
         config: config.yaml 설정
+        report: 지정하면 중복 제거 통계를 채움 (header_lines, before, after, groups, ratio)
         
     Returns:
         청크된 문서 리스트
     """
-    # 1. 텍스트 추출
-    pages_data = extract_text_from_pdf(pdf_path)
+    dedup_config = config.get('dedup') or {}
+    
+    # 페이지마다 반복되는 머리말/꼬리말 제거
+    if dedup_config.get('enabled', False) and dedup_config.get('strip_headers', True):
+        pages_data, removed = strip_page_furniture(
+            pages_data, dedup_config.get('edge_lines', 2), dedup_config.get('header_min_ratio', 0.5)
+        )
+        if report is not None:
+            report['header_lines'] = removed
     
-    # 2. Document 객체로 변환
+    # 1. Document 객체로 변환
     documents = []
     for page_data in pages_data:
         doc = Document(
@@ -195,7 +273,30 @@ def process_pdf(pdf_path: str, config: Dict) -> List[Document]:
         )
         documents.append(doc)
     
-    # 3. 청킹
+    # 2. 청킹
     chunks = chunk_documents(documents, config['chunking'])
     
+    # 3. 거의 같은 청크를 대표 청크 하나로 합침
+    if dedup_config.get('enabled', False):
+        chunks, dedup_report = collapse_duplicates(chunks, dedup_config)
+        if report is not None:
+            report.update(dedup_report)
+    
     return chunks
+
+
+def process_pdf(pdf_path: str, config: Dict, report: Optional[Dict] = None) -> List[Document]:
+    """
+    PDF 전체 처리 파이프라인
+    
+    Args:
+        pdf_path: PDF 파일 경로
+        config: config.yaml 설정
+        report: 지정하면 중복 제거 통계를 채움 (header_lines, before, after, groups, ratio)
+        
+    Returns:
+        청크된 문서 리스트
+    """
+    # 텍스트 추출 (페이지 추출 캐시가 설정되어 있으면 재사용)
+    pages_data = extract_text_from_pdf(pdf_path, (config.get('pdf') or {}).get('extraction_cache'))
+    return chunk_pages(pages_data, config, report)
@@ -0,0 +1,418 @@
+"""
+프로파일링 모듈 (외부 도구 없이 운영 중 핫스팟 확인)
+- BuildProfiler: 인덱스 생성 단계별(extraction, chunking, embedding, bm25 ...) cProfile / tracemalloc 결과를
+  파일(<단계>.pstats / <단계>.tracemalloc)로 저장
+- QueryProfiler: 관리자가 켜면 다음 N개 질의의 검색/생성 단계(서비스 실행 스레드)를 프로파일링해 합산
+- top_cpu / top_memory / diff_cpu / diff_memory: 상위 N개 핫스팟과 두 스냅샷 간 차이
+
+cpu: 함수별 자체 시간(tottime)과 누적 시간(cumtime), mem: 코드 위치별 할당 증가량.
+mem은 프로세스 전체 스냅샷의 차이라서 같은 시간에 처리된 다른 요청의 할당도 섞인다
+(tracemalloc은 스레드를 구분하지 않음). 정확히 보려면 동시 요청이 없을 때 측정한다.
+"""
+
+import os
+import time
+import cProfile
+import pstats
+import threading
+import tracemalloc
+import contextvars
+from contextlib import contextmanager, asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+PROFILE_MODES = ("cpu", "mem")
+
+# tracemalloc 역추적 깊이
+_TRACE_FRAMES = 10
+
+# 측정 도구 자신의 할당은 제외
+_OWN_TRACES = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+# 현재 질의를 프로파일링하는지 (서비스 실행 스레드로 전달됨)
+_active: contextvars.ContextVar[bool] = contextvars.ContextVar("profiling_active", default=False)
+
+
+def _function_label(key) -> str:
+    filename, line, name = key
+    if filename == "~":
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def cpu_table(stats: pstats.Stats) -> Dict[str, Dict]:
+    """pstats → 함수별 {calls, tottime, cumtime}"""
+    return {
+        _function_label(key): {"calls": nc, "tottime": tt, "cumtime": ct}
+        for key, (cc, nc, tt, ct, callers) in stats.stats.items()
+    }
+
+
+def top_cpu(table: Dict[str, Dict], limit: int = 20, sort: str = "tottime") -> List[Dict]:
+    """
+    CPU 핫스팟 상위 N개
+
+    Args:
+        table: cpu_table 결과
+        limit: 개수
+        sort: 정렬 기준 (tottime | cumtime)
+
+    Returns:
+        [{"function", "calls", "tottime", "cumtime"}, ...] (시간은 ms)
+    """
+    rows = sorted(table.items(), key=lambda item: -item[1][sort])[:limit]
+    return [
+        {"function": name, "calls": row["calls"],
+         "tottime": round(row["tottime"] * 1000, 3), "cumtime": round(row["cumtime"] * 1000, 3)}
+        for name, row in rows
+    ]
+
+
+def diff_cpu(before: Dict[str, Dict], after: Dict[str, Dict], limit: int = 20) -> List[Dict]:
+    """
+    두 CPU 스냅샷의 함수별 자체 시간 차이 (변화가 큰 순)
+
+    Args:
+        before: 기준 cpu_table
+        after: 비교 cpu_table
+        limit: 개수
+
+    Returns:
+        [{"function", "before_ms", "after_ms", "delta_ms"}, ...]
+    """
+    rows = []
+    for name in set(before) | set(after):
+        old = before.get(name, {}).get("tottime", 0.0)
+        new = after.get(name, {}).get("tottime", 0.0)
+        rows.append({"function": name, "before_ms": round(old * 1000, 3), "after_ms": round(new * 1000, 3),
+                     "delta_ms": round((new - old) * 1000, 3)})
+    rows.sort(key=lambda row: -abs(row["delta_ms"]))
+    return rows[:limit]
+
+
+def memory_table(snapshot: tracemalloc.Snapshot, base: Optional[tracemalloc.Snapshot] = None) -> Dict[str, Dict]:
+    """tracemalloc 스냅샷 → 코드 위치별 {size, count} (base를 주면 증가량)"""
+    snapshot = snapshot.filter_traces(_OWN_TRACES)
+    if base is None:
+        stats = snapshot.statistics("lineno")
+        return {str(stat.traceback[0]): {"size": stat.size, "count": stat.count} for stat in stats}
+    base = base.filter_traces(_OWN_TRACES)
+    return {
+        str(stat.traceback[0]): {"size": stat.size_diff, "count": stat.count_diff}
+        for stat in snapshot.compare_to(base, "lineno") if stat.size_diff
+    }
+
+
+def top_memory(table: Dict[str, Dict], limit: int = 20) -> List[Dict]:
+    """
+    메모리 핫스팟 상위 N개
+
+    Returns:
+        [{"location", "size_kb", "count"}, ...]
+    """
+    rows = sorted(table.items(), key=lambda item: -item[1]["size"])[:limit]
+    return [{"location": name, "size_kb": round(row["size"] / 1024, 1), "count": row["count"]} for name, row in rows]
+
+
+def diff_memory(before: Dict[str, Dict], after: Dict[str, Dict], limit: int = 20) -> List[Dict]:
+    """
+    두 메모리 스냅샷의 위치별 크기 차이 (변화가 큰 순)
+
+    Returns:
+        [{"location", "before_kb", "after_kb", "delta_kb"}, ...]
+    """
+    rows = []
+    for name in set(before) | set(after):
+        old = before.get(name, {}).get("size", 0)
+        new = after.get(name, {}).get("size", 0)
+        rows.append({"location": name, "before_kb": round(old / 1024, 1), "after_kb": round(new / 1024, 1),
+                     "delta_kb": round((new - old) / 1024, 1)})
+    rows.sort(key=lambda row: -abs(row["delta_kb"]))
+    return rows[:limit]
+
+
+def load_table(path: str) -> Dict[str, Dict]:
+    """
+    저장된 스냅샷 파일을 표로 로드 (.pstats → cpu_table, .tracemalloc → memory_table)
+
+    Args:
+        path: 파일 경로
+
+    Returns:
+        함수/위치별 표
+    """
+    if path.endswith(".tracemalloc"):
+        return memory_table(tracemalloc.Snapshot.load(path))
+    return cpu_table(pstats.Stats(path))
+
+
+class BuildProfiler:
+    """
+    인덱스 생성 단계별 프로파일러
+
+    사용 예:
+        profiler = BuildProfiler("cpu", "./data/profiles/20250101_120000")
+        with profiler.phase("extraction"):
+            pages = extract_text_from_pdf(...)
+    """
+
+    def __init__(self, mode: Optional[str], output_dir: str, top_n: int = 10):
+        """
+        Args:
+            mode: cpu | mem | None (None이면 아무것도 하지 않음)
+            output_dir: 스냅샷 저장 디렉토리
+            top_n: 단계마다 출력할 핫스팟 수
+        """
+        self.mode = mode
+        self.output_dir = output_dir
+        self.top_n = top_n
+        if mode:
+            os.makedirs(output_dir, exist_ok=True)
+        if mode == "mem" and not tracemalloc.is_tracing():
+            tracemalloc.start(_TRACE_FRAMES)
+
+    @contextmanager
+    def phase(self, name: str):
+        """단계 프로파일링 (끝나면 파일 저장 후 상위 핫스팟 출력)"""
+        if not self.mode:
+            yield
+            return
+
+        if self.mode == "cpu":
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                path = os.path.join(self.output_dir, f"{name}.pstats")
+                profile.dump_stats(path)
+                self._print(name, path, [
+                    f"{row['tottime']:>10.1f}ms {row['cumtime']:>10.1f}ms  {row['function']}"
+                    for row in top_cpu(cpu_table(pstats.Stats(profile)), self.top_n)
+                ])
+        else:
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            try:
+                yield
+            finally:
+                after = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                path = os.path.join(self.output_dir, f"{name}.tracemalloc")
+                after.dump(path)
+                self._print(f"{name}, 최대 {peak / 1024 / 1024:.1f}MB", path, [
+                    f"{row['size_kb']:>10.1f}KB {row['count']:>8}개  {row['location']}"
+                    for row in top_memory(memory_table(after, before), self.top_n)
+                ])
+
+    def _print(self, title: str, path: str, lines: List[str]) -> None:
+        print(f"      [프로파일: {title}] {path}")
+        for line in lines:
+            print(f"        {line}")
+
+
+class QueryProfiler:
+    """
+    다음 N개 질의 프로파일러 (프로세스 공유, 관리자 패널에서 사용)
+
+    사용 예:
+        profiler = get_query_profiler()
+        profiler.arm(5, "cpu")
+        ...
+        with profiler.query():      # 질의 하나 (남은 횟수가 있으면 프로파일링 대상)
+            profiler.call(retrieve, query, ...)
+        rows = profiler.top(20)
+
+    asyncio 코드에서는 query_async(run)을 쓴다 (스냅샷을 이벤트 루프 밖에서 찍음).
+    """
+
+    def __init__(self):
+        self.mode: Optional[str] = None
+        self.remaining = 0
+        self.profiled = 0
+        self.skipped_calls = 0
+        self.baseline: Optional[Dict] = None
+        self._running = 0
+        self._cpu: Optional[pstats.Stats] = None
+        self._memory: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def arm(self, count: int, mode: str = "cpu") -> None:
+        """
+        다음 count개 질의 프로파일링 시작 (이전 결과는 지움)
+
+        Args:
+            count: 질의 수
+            mode: cpu | mem
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"지원하지 않는 프로파일 종류: {mode}")
+        with self._lock:
+            if self.mode == "mem" and mode != "mem" and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self.mode = mode
+            self.remaining = count
+            self.profiled = 0
+            self.skipped_calls = 0
+            self._cpu = None
+            self._memory = {}
+        if mode == "mem" and not tracemalloc.is_tracing():
+            tracemalloc.start(_TRACE_FRAMES)
+
+    def disarm(self) -> None:
+        """남은 프로파일링 취소"""
+        with self._lock:
+            self.remaining = 0
+        self._stop_memory_tracing()
+
+    def _stop_memory_tracing(self) -> None:
+        # 측정 중인 질의가 끝난 뒤에만 중지 (tracemalloc은 켜져 있는 동안 할당이 느려짐)
+        with self._lock:
+            idle = self.remaining == 0 and self._running == 0
+        if self.mode == "mem" and idle and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _select(self) -> bool:
+        with self._lock:
+            selected = self.remaining > 0
+            if selected:
+                self.remaining -= 1
+                self._running += 1
+        return selected
+
+    def _snapshot(self) -> Optional[tracemalloc.Snapshot]:
+        return tracemalloc.take_snapshot() if self.mode == "mem" and tracemalloc.is_tracing() else None
+
+    def _add_growth(self, before: Optional[tracemalloc.Snapshot]) -> None:
+        if before is None or not tracemalloc.is_tracing():
+            return
+        growth = memory_table(tracemalloc.take_snapshot(), before)
+        with self._lock:
+            for location, row in growth.items():
+                total = self._memory.setdefault(location, {"size": 0, "count": 0})
+                total["size"] += row["size"]
+                total["count"] += row["count"]
+
+    def _release(self) -> None:
+        with self._lock:
+            self.profiled += 1
+            self._running -= 1
+        self._stop_memory_tracing()
+
+    @contextmanager
+    def query(self):
+        """
+        질의 하나의 범위 (남은 횟수가 있으면 이 질의의 call()을 프로파일링)
+
+        mem 모드는 질의 전후 스냅샷 차이를 합산한다 (동시에 처리 중인 다른 요청의 할당도 섞임).
+        스냅샷은 호출한 스레드에서 찍으므로 이벤트 루프에서는 query_async()를 쓴다.
+        """
+        if not self._select():
+            yield
+            return
+
+        token = _active.set(True)
+        before = self._snapshot()
+        try:
+            yield
+        finally:
+            _active.reset(token)
+            self._add_growth(before)
+            self._release()
+
+    @asynccontextmanager
+    async def query_async(self, run: Callable[..., Awaitable]):
+        """
+        asyncio 코드용 query() (mem 모드 스냅샷/차이 계산은 run으로 이벤트 루프 밖에서 실행)
+
+        스냅샷은 수백 ms가 걸릴 수 있어 루프 스레드에서 찍으면 동시에 처리 중인 요청이 모두 멈춘다.
+
+        Args:
+            run: 동기 함수와 인자를 받아 실행 스레드에서 실행하는 코루틴 함수 (QueryService._run_in_executor)
+        """
+        if not self._select():
+            yield
+            return
+
+        token = _active.set(True)
+        before = await run(self._snapshot)
+        try:
+            yield
+        finally:
+            _active.reset(token)
+            await run(self._add_growth, before)
+            self._release()
+
+    def call(self, func, *args, **kwargs):
+        """
+        함수 실행 (프로파일링 중인 질의면 이 스레드에서 cProfile로 측정해 합산)
+
+        Args:
+            func: 실행할 함수
+            *args, **kwargs: 인자
+
+        Returns:
+            func 결과
+        """
+        if not _active.get() or self.mode != "cpu":
+            return func(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 다른 스레드가 이미 프로파일러를 쓰는 중 (Python 3.12+)
+            with self._lock:
+                self.skipped_calls += 1
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                if self._cpu is None:
+                    self._cpu = pstats.Stats(profile)
+                else:
+                    self._cpu.add(profile)
+
+    def table(self) -> Dict[str, Dict]:
+        """현재까지 합산한 표 (cpu_table 또는 memory_table 형식)"""
+        with self._lock:
+            if self.mode == "cpu":
+                return cpu_table(self._cpu) if self._cpu is not None else {}
+            return {location: dict(row) for location, row in self._memory.items()}
+
+    def top(self, limit: int = 20) -> List[Dict]:
+        """상위 핫스팟"""
+        table = self.table()
+        return top_cpu(table, limit) if self.mode == "cpu" else top_memory(table, limit)
+
+    def save_baseline(self) -> None:
+        """현재 결과를 비교 기준으로 저장"""
+        self.baseline = {"mode": self.mode, "table": self.table(), "saved_at": time.time()}
+
+    def diff(self, limit: int = 20) -> Optional[List[Dict]]:
+        """기준 대비 차이 (기준이 없거나 종류가 다르면 None)"""
+        if self.baseline is None or self.baseline["mode"] != self.mode:
+            return None
+        if self.mode == "cpu":
+            return diff_cpu(self.baseline["table"], self.table(), limit)
+        return diff_memory(self.baseline["table"], self.table(), limit)
+
+    def status(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "remaining": self.remaining,
+            "profiled": self.profiled,
+            "skipped_calls": self.skipped_calls,
+            "has_baseline": self.baseline is not None
+        }
+
+
+_query_profiler = QueryProfiler()
+
+
+def get_query_profiler() -> QueryProfiler:
+    """프로세스 공유 질의 프로파일러"""
+    return _query_profiler
@@ -0,0 +1,590 @@
+"""
+비동기 질의 서비스 모듈
+- asyncio 기반 process_query API
+- 요청 큐 (backpressure, 대기 시간 제한)
+- LLM 동시 호출 수 제한 (semaphore)
+- 요청 병합 (같은 질문이 처리 중이면 하나의 LLM 호출 결과를 공유)
+- 대화 맥락 (후속 질문을 단독 질의로 변환, 같은 주제면 이전 검색 결과 재사용)
+- 입장 제어 (LLM 호출 직전 세션별/전체 호출량 한도 확인, 대기 순번, 한도를 넘으면 최근 답변/검색 본문으로 응답)
+- 프로파일링 (관리자가 켜면 다음 N개 질의의 검색/생성 작업을 실행 스레드에서 측정)
+
+Streamlit처럼 동기 코드에서는 submit()으로 작업을 넘기고 Future로 결과를 받는다.
+"""
+
+import time
+import queue
+import asyncio
+import threading
+import functools
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Iterator, Optional, Tuple
+
+from src.rag_chain import (
+    retrieve, generate_answer, repair_answer, stream_answer, lookup_faq, lookup_reference, build_context,
+    format_lexical_answer, NO_RESULTS_MESSAGE
+)
+from src.vectorstore import normalize_query
+from src.response_formatter import validate_response_structure, get_missing_sections, extract_sections
+from src.retrieval_cache import get_retrieval_cache
+from src.faq_store import get_faq_store
+from src.conversation import Conversation, get_condense_cache
+from src.admission import AdmissionController, AdmissionRejected, track_usage
+from src.token_counter import count_tokens
+from src.tracing import span, start_trace
+from src.profiling import get_query_profiler
+
+
+# 스트림 종료 표시
+_STREAM_END = object()
+
+
+class RepairedAnswer:
+    """
+    스트리밍이 끝난 뒤 누락 섹션을 보완한 답변 (stream()의 마지막 항목)
+
+    Attributes:
+        sections: {섹션 이름: 보완한 내용}
+        answer: 보완 섹션을 끼워 넣은 전체 답변
+    """
+
+    def __init__(self, sections: Dict[str, str], answer: str):
+        self.sections = sections
+        self.answer = answer
+
+
+class ServiceOverloadedError(Exception):
+    """요청 큐가 가득 차서 받을 수 없음"""
+
+
+class ServiceTimeoutError(Exception):
+    """요청이 제한 시간 안에 처리되지 않음"""
+
+
+class QueryService:
+    """
+    공유 인덱스로 질의를 처리하는 비동기 서비스
+
+    사용 예 (동기 코드):
+        service = QueryService(vectorstore, bm25, bm25_chunks, config).start()
+        answer = service.submit("공문서 접수 절차는?").result()
+
+    사용 예 (asyncio 코드, 서비스 루프 안에서):
+        answer = await service.process_query("공문서 접수 절차는?")
+    """
+
+    def __init__(self, vectorstore, bm25, bm25_chunks, config: Dict, registry=None):
+        """
+        Args:
+            vectorstore: ChromaDB 벡터스토어
+            bm25: BM25 인덱스
+            bm25_chunks: BM25 문서 리스트
+            config: config.yaml 설정 (service 섹션 사용)
+            registry: CorpusRegistry (지정하면 여러 컬렉션으로 라우팅해 검색)
+        """
+        self.vectorstore = vectorstore
+        self.bm25 = bm25
+        self.bm25_chunks = bm25_chunks
+        self.config = config
+        self.registry = registry
+
+        service_config = config.get('service', {}) or {}
+        self.max_concurrent_llm = service_config.get('max_concurrent_llm', 4)
+        self.workers = service_config.get('workers', 8)
+        self.queue_size = service_config.get('queue_size', 32)
+        self.enqueue_timeout = service_config.get('enqueue_timeout', 2.0)
+        self.request_timeout = service_config.get('request_timeout', 120.0)
+
+        self.stats = {"submitted": 0, "coalesced": 0, "rejected": 0, "timed_out": 0, "completed": 0, "degraded": 0}
+
+        # 외부 LLM 호출량 제한 (넘으면 최근 답변 또는 검색 본문으로 대체)
+        self.admission = AdmissionController(config)
+        self.recent_answers_size = (config.get('admission') or {}).get('recent_answers', 200)
+        self._recent_answers: "OrderedDict[str, str]" = OrderedDict()
+
+        # 관리자가 켜면 다음 N개 질의를 프로파일링 (프로세스 공유)
+        self.profiler = get_query_profiler()
+
+        self._loop = None
+        self._thread = None
+        self._queue = None
+        self._llm_semaphore = None
+        self._worker_tasks = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers + self.max_concurrent_llm,
+            thread_name_prefix="query-service"
+        )
+
+    # ------------------------------------------------------------------
+    # 수명 주기
+    # ------------------------------------------------------------------
+
+    def start(self) -> "QueryService":
+        """전용 스레드에서 이벤트 루프 시작"""
+        if self._loop is not None:
+            return self
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="query-service-loop", daemon=True)
+        self._thread.start()
+
+        asyncio.run_coroutine_threadsafe(self._startup(), self._loop).result()
+        return self
+
+    async def _startup(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._llm_semaphore = asyncio.Semaphore(self.max_concurrent_llm)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def stop(self) -> None:
+        """워커 종료 및 이벤트 루프 정지"""
+        if self._loop is None:
+            return
+
+        async def _shutdown():
+            for task in self._worker_tasks:
+                task.cancel()
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(_shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._executor.shutdown(wait=False)
+        self._loop = None
+
+    # ------------------------------------------------------------------
+    # 공개 API
+    # ------------------------------------------------------------------
+
+    async def process_query(self, query: str, conversation: Optional[Conversation] = None,
+                            session_id: Optional[str] = None) -> str:
+        """
+        질의 처리 (비동기)
+
+        Args:
+            query: 사용자 질문
+            conversation: 세션 대화 맥락 (지정하면 후속 질문을 이전 질문과 합쳐 처리)
+            session_id: 세션 ID (세션별 호출량 한도, 대기 순번 조회용)
+
+        Returns:
+            답변 문자열 (LLM 호출량 한도를 넘으면 최근 답변 또는 검색 본문 발췌)
+
+        Raises:
+            ServiceOverloadedError: 큐가 가득 참
+            ServiceTimeoutError: 제한 시간 초과
+        """
+        self.stats["submitted"] += 1
+
+        reused_docs = None
+        if conversation is not None:
+            query, reused_docs = await self._run_in_executor(conversation.prepare, query)
+        key = normalize_query(query)
+
+        # 같은 질문이 처리 중이면 결과 공유 (이 경우 다음 턴에서 재사용할 검색 결과는 없음)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            if conversation is not None:
+                conversation.record(query, None)
+        else:
+            future = self._loop.create_future()
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+            try:
+                await asyncio.wait_for(
+                    self._queue.put((query, future, time.monotonic(), conversation, reused_docs, session_id)),
+                    timeout=self.enqueue_timeout
+                )
+            except asyncio.TimeoutError:
+                self.stats["rejected"] += 1
+                error = ServiceOverloadedError("요청이 많아 지금은 처리할 수 없습니다. 잠시 후 다시 시도해 주세요.")
+                future.set_exception(error)
+                # 병합된 다른 대기자가 없으면 예외 조회 경고가 나지 않도록 소비
+                future.exception()
+                raise error
+
+        try:
+            # shield: 한 대기자의 타임아웃이 공유 작업을 취소하지 않도록
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.request_timeout)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise ServiceTimeoutError(f"{self.request_timeout:.0f}초 안에 답변을 생성하지 못했습니다.")
+
+    def submit(self, query: str, conversation: Optional[Conversation] = None, session_id: Optional[str] = None) -> Future:
+        """
+        동기 코드에서 질의 제출
+
+        Args:
+            query: 사용자 질문
+            conversation: 세션 대화 맥락
+            session_id: 세션 ID
+
+        Returns:
+            concurrent.futures.Future (result()로 답변 수신)
+        """
+        if self._loop is None:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(self.process_query(query, conversation, session_id), self._loop)
+
+    def queue_position(self, session_id: Optional[str]) -> Optional[int]:
+        """
+        동기 코드에서 세션의 LLM 호출 대기 순번 조회
+
+        Args:
+            session_id: 세션 ID
+
+        Returns:
+            대기 순번 (1부터, 대기 중이 아니면 None)
+        """
+        if self._loop is None:
+            return None
+
+        async def _position():
+            return self.admission.position(session_id)
+
+        return asyncio.run_coroutine_threadsafe(_position(), self._loop).result()
+
+    def stream(self, query: str, conversation: Optional[Conversation] = None,
+               session_id: Optional[str] = None) -> Iterator[str]:
+        """
+        동기 코드에서 스트리밍 답변 수신 (요청 병합 없이 개별 처리, LLM 동시 호출 제한은 적용)
+
+        Args:
+            query: 사용자 질문
+            conversation: 세션 대화 맥락
+            session_id: 세션 ID
+
+        Yields:
+            답변 조각 문자열 (누락 섹션을 보완했으면 마지막에 RepairedAnswer)
+
+        Raises:
+            ServiceOverloadedError: LLM 호출 대기 시간 초과
+            ServiceTimeoutError: 답변 조각 사이 대기 시간 초과
+        """
+        if self._loop is None:
+            self.start()
+
+        pieces = queue.Queue()
+        self.stats["submitted"] += 1
+        asyncio.run_coroutine_threadsafe(self._stream_pipeline(query, pieces, conversation, session_id), self._loop)
+
+        while True:
+            try:
+                item = pieces.get(timeout=self.request_timeout)
+            except queue.Empty:
+                self.stats["timed_out"] += 1
+                raise ServiceTimeoutError(f"{self.request_timeout:.0f}초 안에 답변을 생성하지 못했습니다.")
+            if item is _STREAM_END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def route(self, query: str) -> Tuple[Optional[List[str]], Dict]:
+        """
+        질의를 보낼 컬렉션 결정
+
+        Returns:
+            (라우팅된 컬렉션 이름 목록 또는 None, 참조/FAQ 조회에 쓸 첫 번째 컬렉션)
+        """
+        default = {
+            "vectorstore": self.vectorstore,
+            "bm25": self.bm25,
+            "chunks": self.bm25_chunks,
+            "config": self.config
+        }
+        if self.registry is None:
+            return None, default
+
+        with span("routing") as s:
+            names = self.registry.route(query)
+            s["collections"] = names
+        if not names:
+            return names, default
+        return names, self.registry.get(names[0])
+
+    def retrieve(self, query: str, query_embedding: Optional[List[float]] = None,
+                 names: Optional[List[str]] = None) -> List:
+        """
+        검색 단계 (레지스트리가 있으면 컬렉션 라우팅)
+
+        Args:
+            query: 사용자 질문
+            query_embedding: 이미 계산한 질의 임베딩 (단일 컬렉션일 때만 재사용)
+            names: route()로 정한 컬렉션 (없으면 여기서 라우팅)
+
+        Returns:
+            검색된 문서 리스트
+        """
+        if self.registry is not None:
+            with span("retrieval") as s:
+                retrieved_docs = self.registry.search(query, names, query_embedding)
+                s["documents"] = len(retrieved_docs)
+            return retrieved_docs
+
+        return retrieve(query, self.vectorstore, self.bm25, self.bm25_chunks, self.config, query_embedding)
+
+    def status(self) -> Dict:
+        """대기열/처리 현황"""
+        status = {
+            **self.stats,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "inflight": len(self._inflight),
+            "max_concurrent_llm": self.max_concurrent_llm,
+            "admission": self.admission.status()
+        }
+        if self.registry is not None:
+            status["corpora"] = self.registry.status()
+        cache = get_retrieval_cache(self.config)
+        if cache is not None:
+            status["retrieval_cache"] = cache.stats()
+        faq_store = get_faq_store(self.config, build_id=getattr(self.bm25, 'build_id', None))
+        if faq_store is not None:
+            status["faq"] = faq_store.stats()
+        if (self.config.get('conversation') or {}).get('enabled', False):
+            status["condense_cache"] = get_condense_cache(self.config).stats()
+        return status
+
+    # ------------------------------------------------------------------
+    # 내부 처리
+    # ------------------------------------------------------------------
+
+    async def _worker(self) -> None:
+        while True:
+            query, future, enqueued_at, conversation, reused_docs, session_id = await self._queue.get()
+            try:
+                if future.done():
+                    continue
+
+                # 큐에서 제한 시간을 넘긴 요청은 처리하지 않음
+                if time.monotonic() - enqueued_at > self.request_timeout:
+                    future.set_exception(ServiceTimeoutError("대기 시간이 초과되었습니다."))
+                    continue
+
+                try:
+                    answer = await self._run_pipeline(query, enqueued_at, conversation, reused_docs, session_id)
+                    if not future.done():
+                        future.set_result(answer)
+                    self.stats["completed"] += 1
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _run_in_executor(self, func, *args):
+        # contextvars(trace id, 프로파일링 여부)를 실행 스레드로 전달
+        context = contextvars.copy_context()
+        return await self._loop.run_in_executor(
+            self._executor, functools.partial(context.run, self.profiler.call, func, *args)
+        )
+
+    async def _admit(self, query: str, session_id: Optional[str], retrieved_docs: List) -> Tuple[Optional[str], int]:
+        """
+        LLM 호출 직전 호출량 한도 확인 (참조 색인/FAQ로 끝난 요청은 한도를 쓰지 않음)
+
+        한도 대기 중에는 워커를 붙잡는다 (LLM 동시 호출 제한 대기와 같음).
+
+        Returns:
+            (거절되면 대체 답변, 허가되면 None; 차감한 예상 토큰 수)
+            대체 답변은 같은 질문의 최근 답변, 없으면 이미 검색한 문서의 본문 발췌
+        """
+        if not self.admission.enabled:
+            return None, 0
+
+        tokens = await self._run_in_executor(self.admission.estimate_tokens, query, build_context(retrieved_docs))
+        with span("admission", tokens=tokens) as s:
+            try:
+                waited = await self.admission.admit(session_id, tokens)
+                s["wait_ms"] = round(waited * 1000, 3)
+                return None, tokens
+            except AdmissionRejected as e:
+                s["rejected"] = e.reason
+
+        self.stats["degraded"] += 1
+        answer = self._recent_answers.get(normalize_query(query))
+        if answer is None:
+            answer = format_lexical_answer(query, retrieved_docs)
+        return answer, 0
+
+    def _settle(self, session_id: Optional[str], tokens: int, usage: Dict, query: str, retrieved_docs: List,
+                answer: str) -> None:
+        """예상 토큰 수와 실제 사용량 차이를 호출량 한도에 반영 (사용량이 보고되지 않으면 입출력 길이로 계산)"""
+        if not tokens:
+            return
+        actual = usage["tokens"]
+        if not usage["calls"]:
+            actual = count_tokens(query) + count_tokens(build_context(retrieved_docs)) + count_tokens(answer)
+        self.admission.settle(session_id, tokens, actual)
+
+    def _remember_answer(self, query: str, answer: str) -> None:
+        """과부하 시 재사용할 최근 LLM 답변 (LRU, 섹션이 빠진 답변은 저장하지 않음)"""
+        if get_missing_sections(validate_response_structure(answer)):
+            return
+        key = normalize_query(query)
+        self._recent_answers[key] = answer
+        self._recent_answers.move_to_end(key)
+        while len(self._recent_answers) > self.recent_answers_size:
+            self._recent_answers.popitem(last=False)
+
+    async def _stream_pipeline(self, query: str, pieces: queue.Queue, conversation: Optional[Conversation] = None,
+                               session_id: Optional[str] = None) -> None:
+        try:
+            async with self.profiler.query_async(self._run_in_executor):
+                with start_trace(), span("total", streaming=True):
+                    reused_docs = None
+                    if conversation is not None:
+                        query, reused_docs = await self._run_in_executor(conversation.prepare, query)
+
+                    retrieved_docs = await self._lookup_or_retrieve(query, conversation, reused_docs)
+                    if isinstance(retrieved_docs, str):
+                        pieces.put(retrieved_docs)
+                        self.stats["completed"] += 1
+                        return
+                    if not retrieved_docs:
+                        pieces.put(NO_RESULTS_MESSAGE)
+                        return
+
+                    degraded, tokens = await self._admit(query, session_id, retrieved_docs)
+                    if degraded is not None:
+                        pieces.put(degraded)
+                        self.stats["completed"] += 1
+                        return
+
+                    try:
+                        with span("llm_wait"):
+                            await asyncio.wait_for(self._llm_semaphore.acquire(), timeout=self.request_timeout)
+                    except asyncio.TimeoutError:
+                        self.stats["rejected"] += 1
+                        raise ServiceOverloadedError("요청이 많아 지금은 처리할 수 없습니다. 잠시 후 다시 시도해 주세요.")
+
+                    try:
+                        def produce():
+                            answer = []
+                            for piece in stream_answer(query, retrieved_docs, self.config):
+                                answer.append(piece)
+                                pieces.put(piece)
+                            return "".join(answer)
+
+                        with track_usage() as usage:
+                            answer = await self._run_in_executor(produce)
+                            # 스트림은 다시 보낼 수 없으므로 누락 섹션만 보완해 마지막 항목으로 전달
+                            missing = get_missing_sections(validate_response_structure(answer))
+                            if missing:
+                                repaired = await self._run_in_executor(
+                                    repair_answer, query, answer, retrieved_docs, self.config
+                                )
+                                sections = {name: content for name, content in extract_sections(repaired).items()
+                                            if name in missing and content}
+                                if sections:
+                                    pieces.put(RepairedAnswer(sections, repaired))
+                                    answer = repaired
+                        self._settle(session_id, tokens, usage, query, retrieved_docs, answer)
+                        self._remember_answer(query, answer)
+                        self.stats["completed"] += 1
+                    finally:
+                        self._llm_semaphore.release()
+        except Exception as e:
+            pieces.put(e)
+        finally:
+            pieces.put(_STREAM_END)
+
+    async def _lookup_or_retrieve(self, query: str, conversation: Optional[Conversation], reused_docs: Optional[List]):
+        """
+        참조 색인 → FAQ 조회 → 검색 (같은 주제의 후속 질문이면 이전 검색 결과 사용)
+
+        Returns:
+            참조/FAQ 답변 문자열 또는 검색된 문서 리스트
+        """
+        if reused_docs is not None:
+            with span("retrieval", reused=True) as s:
+                s["documents"] = len(reused_docs)
+            conversation.record(query, reused_docs)
+            return reused_docs
+
+        # 참조 색인/FAQ도 라우팅된 컬렉션 기준으로 조회
+        names, collection = await self._run_in_executor(self.route, query)
+
+        # 법령/서식 위치만 묻는 질의는 참조 색인으로 바로 답변
+        reference_answer = await self._run_in_executor(
+            lookup_reference, query, collection["bm25"], collection["chunks"], collection["config"]
+        )
+        if reference_answer is not None:
+            if conversation is not None:
+                conversation.record(query, None)
+            return reference_answer
+
+        # 목차 기반 FAQ 답변이 있으면 검색/LLM 생략
+        faq_answer, query_embedding = await self._run_in_executor(
+            lookup_faq, query, collection["vectorstore"], collection["bm25"], collection["config"]
+        )
+        if faq_answer is not None:
+            if conversation is not None:
+                conversation.record(query, None)
+            return faq_answer
+
+        retrieved_docs: List = await self._run_in_executor(self.retrieve, query, query_embedding, names)
+        if conversation is not None:
+            conversation.record(query, retrieved_docs or None)
+        return retrieved_docs
+
+    async def _run_pipeline(self, query: str, enqueued_at: float, conversation: Optional[Conversation] = None,
+                            reused_docs: Optional[List] = None, session_id: Optional[str] = None) -> str:
+        async with self.profiler.query_async(self._run_in_executor):
+            with start_trace(), span("total") as total:
+                total["queue_ms"] = round((time.monotonic() - enqueued_at) * 1000, 3)
+
+                retrieved_docs = await self._lookup_or_retrieve(query, conversation, reused_docs)
+                if isinstance(retrieved_docs, str):
+                    return retrieved_docs
+                if not retrieved_docs:
+                    return NO_RESULTS_MESSAGE
+
+                # 외부 LLM 호출량 한도 (넘으면 LLM 없이 응답)
+                degraded, tokens = await self._admit(query, session_id, retrieved_docs)
+                if degraded is not None:
+                    return degraded
+
+                # 외부 LLM 호출 동시 수 제한
+                with span("llm_wait"):
+                    await self._llm_semaphore.acquire()
+                try:
+                    with track_usage() as usage:
+                        answer = await self._run_in_executor(generate_answer, query, retrieved_docs, self.config)
+                        # 구조가 불완전하면 같은 검색 결과로 누락 섹션만 보완
+                        answer = await self._run_in_executor(repair_answer, query, answer, retrieved_docs, self.config)
+                    self._settle(session_id, tokens, usage, query, retrieved_docs, answer)
+                    self._remember_answer(query, answer)
+                    return answer
+                finally:
+                    self._llm_semaphore.release()
+
+
+def create_query_service(config: Dict) -> QueryService:
+    """
+    인덱스를 로드하고 질의 서비스 시작
+
+    corpora 섹션에 인덱스가 만들어진 컬렉션이 여러 개면 레지스트리로 라우팅하고,
+    기본 컬렉션은 미리 로드해 둔다.
+
+    Args:
+        config: config.yaml 설정
+
+    Returns:
+        시작된 QueryService
+    """
+    from src.corpus_registry import CorpusRegistry
+
+    registry = CorpusRegistry(config)
+    default = registry.get(registry.default)
+
+    return QueryService(
+        default["vectorstore"],
+        default["bm25"],
+        default["chunks"],
+        config,
+        registry=registry if len(registry.available()) > 1 else None
+    ).start()
@@ -3,14 +3,33 @@ RAG 체인 및 프롬프트 모듈
 - 쿼리 처리
 - 검색 단계
 - GPT-4o mini 호출
+- 모델/출력 토큰 라우팅 (컨텍스트 크기, 법령/서식 유무, 질문 유형) + 구조 검증 실패 시 상위 설정으로 재시도
 """
 
-from typing import List, Dict
-from langchain.schema import Document
-from langchain_community.chat_models import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+import time
+from typing import List, Dict, Iterator, Optional, Tuple, TYPE_CHECKING
 from src.vectorstore import hybrid_search
+from src.faq_store import get_faq_store
+from src.reference_index import lookup_references
+from src.tracing import span, start_trace
+from src.token_counter import count_tokens
+from src.admission import record_usage
+from src.response_formatter import (
+    SECTION_HEADERS, validate_response_structure, extract_sections, get_missing_sections, splice_sections
+)
 
+# langchain은 첫 질의 때 로드 (앱 첫 화면/서버 기동 시간 단축)
+if TYPE_CHECKING:
+    from langchain.schema import Document
+    from langchain_community.chat_models import ChatOpenAI
+    from langchain.prompts import ChatPromptTemplate
+
+
+# 검색 결과가 없을 때의 안내 문구
+NO_RESULTS_MESSAGE = "관련 정보를 찾을 수 없습니다. 질문을 다시 작성해 주세요."
+
+# 과부하로 LLM 답변 대신 검색 본문을 보여줄 때의 안내 문구
+LEXICAL_ANSWER_NOTICE = "⏳ 지금은 요청이 많아 AI 답변 대신 관련 매뉴얼 본문을 안내합니다. 잠시 후 다시 질문하시면 정리된 답변을 받을 수 있습니다."
 
 # 시스템 프롬프트
 SYSTEM_PROMPT = """당신은 **학교 행정업무 전문가**입니다. 제공된 문서를 바탕으로 **매우 상세하고 실무에 즉시 활용 가능한** 답변을 작성하세요.
@@ -100,15 +119,68 @@ SYSTEM_PROMPT = """당신은 **학교 행정업무 전문가**입니다. 제공
 """
 
 
-def create_prompt_template() -> ChatPromptTemplate:
+# 축약 시스템 프롬프트 (법령/서식이 없는 컨텍스트용, 섹션 구조는 동일)
+COMPACT_SYSTEM_PROMPT = """당신은 **학교 행정업무 전문가**입니다. 제공된 문서만 바탕으로 실무에 바로 쓸 수 있게 답변하세요.
+
+**답변 구조** (6개 섹션 제목을 반드시 그대로 사용):
+
+### ① 질문 요지 정리
+### ② 절차
+(단계별로 담당자, 처리 기한, 구체적 방법 포함)
+### ③ 관련 법령
+### ④ 서식
+### ⑤ 주의사항
+(실수 사례, 예외 상황, 실무 팁)
+### 📄 출처
+(대분류 > 중분류 > 소분류 (XX페이지) 형식, 페이지 번호 필수)
+
+**❗ 필수 준수 사항**:
+- 문서에 없는 내용은 "문서에서 관련 내용을 찾을 수 없습니다"라고 명시
+{empty_sections_rule}
+"""
+
+# 범위가 넓은 질문 표현 (상위 설정으로 라우팅)
+BROAD_QUERY_WORDS = ("비교", "차이", "전체", "모든", "종류", "각각", "전반", "총정리", "정리해")
+
+
+# 누락 섹션 보완 요청
+REPAIR_PROMPT = """다음 문서를 참고하여 아래 답변에서 빠진 섹션만 작성해 주세요.
+
+**참고 문서:**
+{context}
+
+**질문:**
+{question}
+
+**기존 답변:**
+{answer}
+
+**작성할 섹션 (이 섹션만, 제목 포함, 순서대로):**
+{headers}
+
+기존 답변의 다른 섹션은 다시 쓰지 마세요."""
+
+
+def create_prompt_template(empty_sections: Optional[List[str]] = None) -> "ChatPromptTemplate":
     """
     프롬프트 템플릿 생성
     
+    Args:
+        empty_sections: 컨텍스트에 내용이 없는 섹션 (지정하면 축약 템플릿 사용)
+    
     Returns:
         ChatPromptTemplate
     """
+    from langchain.prompts import ChatPromptTemplate
+    
+    system_prompt = SYSTEM_PROMPT
+    if empty_sections:
+        rule = f"- {', '.join(empty_sections)} 섹션은 참고 문서에 해당 내용이 없으므로 \"해당 없음\" 한 줄만 작성"
+        # from_messages가 중괄호를 변수로 해석하지 않도록 이스케이프
+        system_prompt = COMPACT_SYSTEM_PROMPT.format(empty_sections_rule=rule).replace("{", "{{").replace("}", "}}")
+    
     template = ChatPromptTemplate.from_messages([
-        ("system", SYSTEM_PROMPT),
+        ("system", system_prompt),
         ("human", """다음 문서를 참고하여 질문에 답변해 주세요.
 
 **참고 문서:**
@@ -123,15 +195,52 @@ def create_prompt_template() -> ChatPromptTemplate:
     return template
 
 
-def process_query(
+def build_context(docs: List["Document"]) -> str:
+    """
+    검색 결과를 LLM 컨텍스트 문자열로 변환
+    
+    Args:
+        docs: 검색된 문서 리스트
+        
+    Returns:
+        컨텍스트 문자열
+    """
+    return "\n\n---\n\n".join([
+        f"[문서 {i+1}] (페이지 {doc.metadata.get('pages') or doc.metadata.get('page', '?')})\n{doc.page_content}"
+        for i, doc in enumerate(docs)
+    ])
+
+
+def get_token_usage(response) -> Dict:
+    """
+    LLM 응답에서 토큰 사용량 추출
+    
+    Args:
+        response: LLM 응답 메시지
+        
+    Returns:
+        prompt_tokens, completion_tokens (없으면 빈 딕셔너리)
+    """
+    metadata = getattr(response, 'response_metadata', None) or {}
+    usage = metadata.get('token_usage') or {}
+    
+    return {
+        key: usage[key]
+        for key in ('prompt_tokens', 'completion_tokens')
+        if key in usage
+    }
+
+
+def retrieve(
     query: str,
     vectorstore,
     bm25,
-    bm25_chunks: List[Document],
-    config: Dict
-) -> str:
+    bm25_chunks: List["Document"],
+    config: Dict,
+    query_embedding: Optional[List[float]] = None
+) -> List["Document"]:
     """
-    전체 RAG 파이프라인
+    검색 단계 (하이브리드 검색)
     
     Args:
         query: 사용자 질문
@@ -139,55 +248,400 @@ def process_query(
         bm25: BM25 인덱스
         bm25_chunks: BM25 문서 리스트
         config: config.yaml 설정
+        query_embedding: 이미 계산한 질의 임베딩 (없으면 새로 계산)
         
     Returns:
-        답변 문자열
+        검색된 문서 리스트
     """
-    try:
-        # 1. 하이브리드 검색
+    with span("retrieval") as s:
         retrieved_docs = hybrid_search(
             query=query,
             vectorstore=vectorstore,
             bm25=bm25,
             bm25_chunks=bm25_chunks,
-            config=config
-        )
-        
-        if not retrieved_docs:
-            return "관련 정보를 찾을 수 없습니다. 질문을 다시 작성해 주세요."
-        
-        # 2. 컨텍스트 구성
-        context = "\n\n---\n\n".join([
-            f"[문서 {i+1}] (페이지 {doc.metadata.get('page', '?')})\n{doc.page_content}"
-            for i, doc in enumerate(retrieved_docs)
-        ])
-        
-        # 3. LLM 호출
-        llm = ChatOpenAI(
-            model=config['llm']['model'],
-            temperature=config['llm']['temperature'],
-            max_tokens=config['llm']['max_tokens']
+            config=config,
+            query_embedding=query_embedding
         )
+        s["documents"] = len(retrieved_docs)
+    
+    return retrieved_docs
+
+
+def build_messages(query: str, retrieved_docs: List["Document"], empty_sections: Optional[List[str]] = None) -> List:
+    """
+    컨텍스트 구성 및 프롬프트 메시지 생성
+    
+    Args:
+        query: 사용자 질문
+        retrieved_docs: 검색된 문서 리스트
+        empty_sections: 내용이 없는 섹션 (지정하면 축약 템플릿)
         
-        prompt_template = create_prompt_template()
+    Returns:
+        LLM 입력 메시지 리스트
+    """
+    with span("prompt", compact=bool(empty_sections)) as s:
+        context = build_context(retrieved_docs)
         
-        # 프롬프트 생성
+        prompt_template = create_prompt_template(empty_sections)
         messages = prompt_template.format_messages(
             context=context,
             question=query
         )
+        s["context_tokens"] = count_tokens(context)
+    
+    return messages
+
+
+def create_llm(config: Dict, streaming: bool = False, max_tokens: int = None, model: str = None) -> "ChatOpenAI":
+    """
+    config의 llm 설정으로 ChatOpenAI 생성
+    
+    Args:
+        config: config.yaml 설정
+        streaming: 스트리밍 여부
+        max_tokens: 최대 출력 토큰 (기본값: config 값)
+        model: 모델 (기본값: config 값)
         
-        # LLM 호출
+    Returns:
+        ChatOpenAI
+    """
+    from langchain_community.chat_models import ChatOpenAI
+    
+    return ChatOpenAI(
+        model=model or config['llm']['model'],
+        temperature=config['llm']['temperature'],
+        max_tokens=max_tokens or config['llm']['max_tokens'],
+        streaming=streaming
+    )
+
+
+def full_route(config: Dict) -> Dict:
+    """라우팅하지 않을 때의 설정 (llm.model, llm.max_tokens, 전체 템플릿)"""
+    return {
+        "tier": "full",
+        "model": config['llm']['model'],
+        "max_tokens": config['llm']['max_tokens'],
+        "empty_sections": []
+    }
+
+
+def route_query(query: str, retrieved_docs: List["Document"], config: Dict) -> Dict:
+    """
+    질의별 모델/출력 토큰/템플릿 결정 (llm.router 규칙)
+    
+    - 컨텍스트가 크거나 범위가 넓은 질문 → 상위 설정 (llm.model, llm.max_tokens)
+    - 그 밖에는 하위 설정, 출력 토큰은 내용이 있는 섹션 수에 비례
+    - 검색 문서에 법령/서식 메타데이터가 없으면 해당 섹션을 비우는 축약 템플릿
+    
+    Args:
+        query: 사용자 질문
+        retrieved_docs: 검색된 문서 리스트
+        config: config.yaml 설정
+        
+    Returns:
+        {"tier", "model", "max_tokens", "empty_sections"}
+    """
+    router = config['llm'].get('router') or {}
+    if not router.get('enabled', False):
+        return full_route(config)
+    
+    with span("route") as s:
+        has_laws = any(doc.metadata.get('laws') for doc in retrieved_docs)
+        has_forms = any(doc.metadata.get('forms') for doc in retrieved_docs)
+        empty_sections = [name for name, present in (("관련 법령", has_laws), ("서식", has_forms)) if not present]
+        context_tokens = sum(count_tokens(doc.page_content) for doc in retrieved_docs)
+        broad = any(word in query for word in BROAD_QUERY_WORDS) or len(query) > router.get('broad_query_chars', 80)
+        
+        if context_tokens > router.get('max_context_tokens', 6000) or broad:
+            route = full_route(config)
+        else:
+            small = router.get('small') or {}
+            # 기본 섹션(요지, 절차, 주의사항, 출처) + 내용이 있는 법령/서식 섹션
+            sections = 6 - len(empty_sections)
+            max_tokens = router.get('base_tokens', 300) + router.get('section_tokens', 300) * sections
+            route = {
+                "tier": "small",
+                "model": small.get('model', config['llm']['model']),
+                "max_tokens": min(max_tokens, small.get('max_tokens', config['llm']['max_tokens'])),
+                "empty_sections": []
+            }
+        
+        if router.get('compact_template', True):
+            route["empty_sections"] = empty_sections
+        
+        s.update({
+            "tier": route["tier"],
+            "model": route["model"],
+            "max_tokens": route["max_tokens"],
+            "compact": bool(route["empty_sections"]),
+            "context_tokens": context_tokens,
+            "broad": broad
+        })
+    
+    return route
+
+
+def invoke_llm(query: str, retrieved_docs: List["Document"], config: Dict, route: Dict) -> str:
+    """라우팅 설정으로 한 번 호출"""
+    messages = build_messages(query, retrieved_docs, route["empty_sections"])
+    llm = create_llm(config, max_tokens=route["max_tokens"], model=route["model"])
+    
+    with span("llm", model=route["model"], tier=route["tier"]) as s:
         response = llm.invoke(messages)
+        s.update(get_token_usage(response))
+        record_usage(get_token_usage(response))
+    
+    return response.content
+
+
+def generate_answer(query: str, retrieved_docs: List["Document"], config: Dict) -> str:
+    """
+    생성 단계 (프롬프트 구성 + LLM 호출)
+    
+    라우터가 하위 설정을 고른 답변이 구조 검증에 실패하면 상위 설정으로 한 번 다시 생성
+    
+    Args:
+        query: 사용자 질문
+        retrieved_docs: 검색된 문서 리스트
+        config: config.yaml 설정
         
-        return response.content
+    Returns:
+        답변 문자열
+    """
+    route = route_query(query, retrieved_docs, config)
+    answer = invoke_llm(query, retrieved_docs, config, route)
     
-    except Exception as e:
-        error_msg = f"답변 생성 중 오류가 발생했습니다: {str(e)}"
-        print(f"[ERROR] {error_msg}")
-        import traceback
-        traceback.print_exc()
-        return error_msg
+    if route["tier"] == "full" and not route["empty_sections"]:
+        return answer
+    
+    missing = get_missing_sections(validate_response_structure(answer))
+    if not missing:
+        return answer
+    
+    with span("escalate", tier=route["tier"], missing=len(missing)):
+        return invoke_llm(query, retrieved_docs, config, full_route(config))
+
+
+def repair_answer(query: str, answer: str, retrieved_docs: List["Document"], config: Dict) -> str:
+    """
+    구조가 불완전한 답변에서 누락된 섹션만 다시 생성해 끼워 넣기
+    
+    전체 질문을 다시 묻는 대신, 이미 검색한 문서로 누락 섹션만 작은 max_tokens로 요청
+    
+    Args:
+        query: 사용자 질문
+        answer: 원래 답변
+        retrieved_docs: 원래 답변에 쓴 검색 문서
+        config: config.yaml 설정
+        
+    Returns:
+        보완된 답변 (누락이 없거나 보완에 실패하면 원래 답변)
+    """
+    llm_config = config['llm']
+    if not llm_config.get('repair_enabled', True):
+        return answer
+    
+    missing = get_missing_sections(validate_response_structure(answer))
+    if not missing:
+        return answer
+    
+    with span("repair", missing=len(missing)) as s:
+        try:
+            prompt = REPAIR_PROMPT.format(
+                context=build_context(retrieved_docs),
+                question=query,
+                answer=answer,
+                headers="\n".join(SECTION_HEADERS[name] for name in missing)
+            )
+            messages = [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+            llm = create_llm(config, max_tokens=llm_config.get('repair_max_tokens', 800))
+            response = llm.invoke(messages)
+            s.update(get_token_usage(response))
+            record_usage(get_token_usage(response))
+        except Exception as e:
+            # 보완 실패 시 원래 답변 유지
+            print(f"[WARN] 누락 섹션 보완 실패: {str(e)}")
+            s["failed"] = True
+            return answer
+        
+        repaired = {name: content for name, content in extract_sections(response.content).items() if name in missing}
+        s["repaired"] = sum(1 for content in repaired.values() if content)
+    
+    return splice_sections(answer, repaired)
+
+
+def stream_answer(query: str, retrieved_docs: List["Document"], config: Dict) -> Iterator[str]:
+    """
+    생성 단계 (스트리밍)
+    
+    Args:
+        query: 사용자 질문
+        retrieved_docs: 검색된 문서 리스트
+        config: config.yaml 설정
+        
+    Yields:
+        답변 조각 문자열
+    """
+    # 스트리밍은 중간에 다시 생성할 수 없으므로 라우팅만 적용
+    # (누락 섹션은 스트림이 끝난 뒤 QueryService가 repair_answer로 보완해 따로 전달)
+    route = route_query(query, retrieved_docs, config)
+    messages = build_messages(query, retrieved_docs, route["empty_sections"])
+    llm = create_llm(config, streaming=True, max_tokens=route["max_tokens"], model=route["model"])
+    
+    with span("llm", model=route["model"], tier=route["tier"], streaming=True) as s:
+        started = time.perf_counter()
+        chunks = 0
+        for chunk in llm.stream(messages):
+            if not chunk.content:
+                continue
+            if chunks == 0:
+                s["first_token_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            chunks += 1
+            yield chunk.content
+        s["chunks"] = chunks
+
+
+def lookup_faq(query: str, vectorstore, bm25, config: Dict) -> Tuple[Optional[str], Optional[List[float]]]:
+    """
+    FAQ 저장소 조회 (검색/LLM 호출 전)
+    
+    정규화 질문 일치 → 임베딩 최근접 이웃 순으로 확인한다.
+    반복된 질의는 저장소가 보관한 질의 임베딩으로 다시 조회하므로 임베딩 API를 부르지 않는다.
+    
+    Args:
+        query: 사용자 질문
+        vectorstore: ChromaDB 벡터스토어 (질의 임베딩용)
+        bm25: BM25 인덱스 (빌드 ID 확인용)
+        config: config.yaml 설정
+        
+    Returns:
+        (저장된 답변 또는 None, 계산한 질의 임베딩 또는 None)
+    """
+    store = get_faq_store(config, build_id=getattr(bm25, 'build_id', None))
+    if store is None:
+        return None, None
+    
+    with span("faq") as s:
+        entry, query_embedding = store.lookup(query, embed=vectorstore.embeddings.embed_query)
+        s["hit"] = entry is not None
+        if entry is not None:
+            s["similarity"] = entry["similarity"]
+    
+    return (entry["answer"] if entry else None), query_embedding
+
+
+def lookup_reference(query: str, bm25, bm25_chunks: List["Document"], config: Dict) -> Optional[str]:
+    """
+    법령/서식 참조 위치 질의 빠른 경로 (검색 병합/LLM 호출 전)
+    
+    Args:
+        query: 사용자 질문
+        bm25: BM25 인덱스 (빌드 ID 확인용)
+        bm25_chunks: BM25 문서 리스트
+        config: config.yaml 설정
+        
+    Returns:
+        참조 위치 답변 (참조 질의가 아니면 None)
+    """
+    with span("reference") as s:
+        answer = lookup_references(query, bm25_chunks, config, getattr(bm25, 'build_id', None))
+        s["hit"] = answer is not None
+    
+    return answer
+
+
+def format_lexical_answer(query: str, docs: List["Document"], snippet_chars: int = 300, max_passages: int = 3) -> str:
+    """
+    검색 본문 발췌로 답변 구조(6개 섹션)를 채움 (LLM 호출 없음)
+    
+    Args:
+        query: 사용자 질문
+        docs: 검색된 문서 리스트
+        snippet_chars: 문서별 발췌 길이
+        max_passages: 보여줄 최대 문서 수
+        
+    Returns:
+        답변 문자열
+    """
+    passages = []
+    sources = []
+    for doc in docs[:max_passages]:
+        page = doc.metadata.get('pages') or doc.metadata.get('page', '?')
+        text = doc.page_content.strip()
+        snippet = text[:snippet_chars] + ("…" if len(text) > snippet_chars else "")
+        passages.append(f"📌 **{page}페이지**\n> " + snippet.replace("\n", "\n> "))
+        path = " > ".join(doc.metadata[level] for level in ("level1", "level2", "level3") if doc.metadata.get(level))
+        source = f"- {path} ({page}페이지)" if path else f"- {page}페이지"
+        if source not in sources:
+            sources.append(source)
+    
+    return "\n\n".join([
+        SECTION_HEADERS['질문 요지 정리'],
+        f"{LEXICAL_ANSWER_NOTICE}\n\n질문: {query}",
+        SECTION_HEADERS['절차'],
+        "\n\n".join(passages),
+        SECTION_HEADERS['관련 법령'],
+        "해당 없음 (위 본문 참고)",
+        SECTION_HEADERS['서식'],
+        "해당 없음 (위 본문 참고)",
+        SECTION_HEADERS['주의사항'],
+        "⚠️ 검색된 본문 일부입니다. 적용 전 해당 페이지의 전체 내용을 확인하세요.",
+        SECTION_HEADERS['출처'],
+        "\n".join(sources)
+    ])
+
+
+def process_query(
+    query: str,
+    vectorstore,
+    bm25,
+    bm25_chunks: List["Document"],
+    config: Dict
+) -> str:
+    """
+    전체 RAG 파이프라인
+    
+    Args:
+        query: 사용자 질문
+        vectorstore: ChromaDB 벡터스토어
+        bm25: BM25 인덱스
+        bm25_chunks: BM25 문서 리스트
+        config: config.yaml 설정
+        
+    Returns:
+        답변 문자열
+    """
+    with start_trace(), span("total"):
+        try:
+            # 법령/서식 위치만 묻는 질의면 참조 색인으로 바로 답변
+            reference_answer = lookup_reference(query, bm25, bm25_chunks, config)
+            if reference_answer is not None:
+                return reference_answer
+            
+            # 0. FAQ 저장소 (목차 기반 대표 질문과 충분히 비슷하면 저장된 답변 반환)
+            faq_answer, query_embedding = lookup_faq(query, vectorstore, bm25, config)
+            if faq_answer is not None:
+                return faq_answer
+            
+            # 1. 하이브리드 검색
+            retrieved_docs = retrieve(query, vectorstore, bm25, bm25_chunks, config, query_embedding)
+            
+            if not retrieved_docs:
+                return NO_RESULTS_MESSAGE
+            
+            # 2. 답변 생성 (구조가 불완전하면 누락 섹션만 보완)
+            answer = generate_answer(query, retrieved_docs, config)
+            return repair_answer(query, answer, retrieved_docs, config)
+        
+        except Exception as e:
+            error_msg = f"답변 생성 중 오류가 발생했습니다: {str(e)}"
+            print(f"[ERROR] {error_msg}")
+            import traceback
+            traceback.print_exc()
+            return error_msg
 
 
 def call_llm(prompt: str, context: str, config: Dict) -> str:
@@ -202,11 +656,7 @@ def call_llm(prompt: str, context: str, config: Dict) -> str:
     Returns:
         답변 문자열
     """
-    llm = ChatOpenAI(
-        model=config['llm']['model'],
-        temperature=config['llm']['temperature'],
-        max_tokens=config['llm']['max_tokens']
-    )
+    llm = create_llm(config)
     
     messages = [
         {"role": "system", "content": SYSTEM_PROMPT},
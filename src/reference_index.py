@@ -0,0 +1,323 @@
+"""
+법령/서식 참조 색인 모듈
+- 인덱스 생성 시 청크에서 법령 조문("지방공무원법 제64조")과 서식 번호("서식 1-1")를 추출해
+  정규화 키 → 청크 ID 목록으로 저장 (BM25 인덱스 옆 reference_index.json)
+- "서식 1-1 어디 있어?"처럼 참조 위치만 묻는 질의는 검색 병합/LLM 없이 해당 본문과 페이지로 바로 답변
+
+키 형식:
+    law:<법령명>:<조>[-<의>]   예) law:지방공무원법:64, law:지방공무원법시행령:5-2
+    law::<조>                   법령명 없이 조문만 (같은 조문 번호를 쓰는 모든 법령)
+    form:<번호>                 예) form:1-1
+"""
+
+import os
+import re
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.conversation import stem_token
+from src.response_formatter import SECTION_HEADERS
+
+
+# 본문의 법령 조문 (법령명은 선택)
+LAW_RE = re.compile(
+    r'(?:([가-힣]+(?:법|령|규칙|규정)(?:\s*시행(?:령|규칙))?)\s*)?제\s*(\d+)\s*조(?:\s*의\s*(\d+))?'
+)
+# 질의에서는 "64조"처럼 "제"를 생략해도 인식
+QUERY_LAW_RE = re.compile(
+    r'(?:([가-힣]+(?:법|령|규칙|규정)(?:\s*시행(?:령|규칙))?)\s*)?제?\s*(\d+)\s*조(?:\s*의\s*(\d+))?'
+)
+# 서식 번호 ("서식 1-1", "<서식 3>", "【서식 2-1】", "form 1-1")
+FORM_RE = re.compile(r'(?:서식|form)\s*#?\s*(\d+(?:\s*[-–]\s*\d+)*)', re.IGNORECASE)
+
+# 참조 위치만 묻는 질의에 쓰이는 표현 (이 밖의 단어가 있으면 일반 질의로 처리)
+LOOKUP_WORDS = {
+    "어디", "어디에", "어딨어", "어디있어", "위치", "있어", "있나요", "있어요", "있는", "찾아줘", "찾아", "찾기",
+    "알려줘", "알려주세요", "보여줘", "보여주세요", "내용", "전문", "조문", "몇", "페이지", "쪽", "뭐야",
+    "무엇", "무엇인가요", "뭔가요", "나와", "나오나요", "나와있어", "where", "is", "the", "find", "show",
+    "me", "form", "article", "page", "what"
+}
+
+REFERENCE_FILE = "reference_index.json"
+
+
+def _law_key(name: Optional[str], article: str, sub: Optional[str]) -> Tuple[str, str]:
+    """(법령명 포함 키, 조문만 키)"""
+    number = f"{int(article)}-{int(sub)}" if sub else str(int(article))
+    name = re.sub(r'\s+', '', name) if name else ""
+    # "같은 법 시행령 제5조"처럼 법령명이 앞에 생략된 경우는 조문만
+    if name in ("시행령", "시행규칙"):
+        name = ""
+    return f"law:{name}:{number}", f"law::{number}"
+
+
+def _form_key(number: str) -> str:
+    return "form:" + "-".join(str(int(part)) for part in re.split(r'\s*[-–]\s*', number.strip()))
+
+
+def extract_reference_keys(text: str) -> List[str]:
+    """
+    본문의 참조 키 (중복 제거, 등장 순서)
+
+    Args:
+        text: 청크 본문
+
+    Returns:
+        키 리스트
+    """
+    keys = []
+    for match in LAW_RE.finditer(text):
+        full_key, article_key = _law_key(*match.groups())
+        if full_key != article_key:
+            keys.append(full_key)
+        keys.append(article_key)
+    for match in FORM_RE.finditer(text):
+        keys.append(_form_key(match.group(1)))
+    return list(dict.fromkeys(keys))
+
+
+def parse_reference_query(query: str) -> Optional[List[str]]:
+    """
+    참조 위치만 묻는 질의면 조회할 키 반환
+
+    Args:
+        query: 사용자 질문
+
+    Returns:
+        키 리스트 (일반 질의면 None)
+    """
+    keys = []
+    rest = query
+    for match in FORM_RE.finditer(query):
+        keys.append(_form_key(match.group(1)))
+    rest = FORM_RE.sub(" ", rest)
+    for match in QUERY_LAW_RE.finditer(rest):
+        full_key, _ = _law_key(*match.groups())
+        keys.append(full_key)
+    rest = QUERY_LAW_RE.sub(" ", rest)
+
+    if not keys:
+        return None
+
+    # 참조 표현을 뺀 나머지가 위치를 묻는 말뿐이어야 함 ("서식 1-1 작성 요령은?"은 일반 질의)
+    for token in rest.split():
+        word = token.rstrip("?？.!~,").lower()
+        if word and word not in LOOKUP_WORDS and stem_token(word) not in LOOKUP_WORDS:
+            return None
+    return list(dict.fromkeys(keys))
+
+
+class ReferenceIndex:
+    """
+    참조 키 → 청크 ID 색인
+
+    사용 예:
+        index = ReferenceIndex.build(chunks.texts(), build_id=bm25.build_id)
+        chunk_ids = index.lookup("form:1-1")
+    """
+
+    def __init__(self, entries: Dict[str, List[int]], build_id: Optional[str] = None):
+        self.entries = entries
+        self.build_id = build_id
+
+    @classmethod
+    def build(cls, texts, build_id: Optional[str] = None) -> "ReferenceIndex":
+        """
+        청크 본문으로 색인 생성
+
+        Args:
+            texts: 청크 본문 (청크 ID 순서)
+            build_id: BM25 인덱스 빌드 ID
+
+        Returns:
+            ReferenceIndex
+        """
+        entries: Dict[str, List[int]] = {}
+        for chunk_id, text in enumerate(texts):
+            for key in extract_reference_keys(text):
+                entries.setdefault(key, []).append(chunk_id)
+        return cls(entries, build_id)
+
+    def lookup(self, key: str) -> List[int]:
+        """키의 청크 ID 목록 (없으면 빈 리스트)"""
+        return self.entries.get(key, [])
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"build_id": self.build_id, "entries": self.entries}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "ReferenceIndex":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["entries"], data.get("build_id"))
+
+
+def default_reference_path(bm25_path: str) -> str:
+    """BM25 인덱스 옆 색인 경로"""
+    return os.path.join(os.path.dirname(bm25_path) or ".", REFERENCE_FILE)
+
+
+_indexes: Dict[str, ReferenceIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_reference_index(config: Dict, bm25_chunks, build_id: Optional[str]) -> Optional[ReferenceIndex]:
+    """
+    현재 빌드의 참조 색인 (파일이 없거나 다른 빌드면 청크에서 다시 만들어 저장)
+
+    Args:
+        config: config.yaml 설정
+        bm25_chunks: BM25 문서 리스트 (ChunkStore 또는 List[Document])
+        build_id: BM25 인덱스 빌드 ID
+
+    Returns:
+        ReferenceIndex (비활성화면 None)
+    """
+    if not (config.get('reference_index') or {}).get('enabled', False):
+        return None
+
+    path = default_reference_path(config['database']['bm25_path'])
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is not None and index.build_id == build_id:
+            return index
+
+        if os.path.exists(path):
+            index = ReferenceIndex.load(path)
+        if index is None or index.build_id != build_id:
+            texts = bm25_chunks.texts() if hasattr(bm25_chunks, 'texts') else (doc.page_content for doc in bm25_chunks)
+            index = ReferenceIndex.build(texts, build_id)
+            try:
+                index.save(path)
+            except OSError as e:
+                print(f"[WARN] 참조 색인 저장 실패: {str(e)}")
+
+        _indexes[path] = index
+        return index
+
+
+def _reference_label(key: str) -> str:
+    """키 → 표시용 이름"""
+    kind, _, rest = key.partition(":")
+    if kind == "form":
+        return f"서식 {rest}"
+    name, _, number = rest.partition(":")
+    article, _, sub = number.partition("-")
+    label = f"제{article}조" + (f"의{sub}" if sub else "")
+    return f"{name} {label}" if name else label
+
+
+def _snippet(text: str, key: str, width: int) -> str:
+    """본문에서 참조가 처음 나오는 위치 주변"""
+    if key.startswith("form:"):
+        matches = (m for m in FORM_RE.finditer(text) if _form_key(m.group(1)) == key)
+    else:
+        matches = (m for m in LAW_RE.finditer(text) if key in _law_key(*m.groups()))
+    match = next(matches, None)
+    position = match.start() if match else 0
+    start = max(0, position - width // 3)
+    snippet = text[start:start + width].strip()
+    return ("…" if start > 0 else "") + snippet + ("…" if start + width < len(text) else "")
+
+
+def format_reference_answer(keys: List[str], hits: Dict[str, List[int]], bm25_chunks, snippet_chars: int = 300) -> str:
+    """
+    참조 조회 결과를 답변 구조(6개 섹션)로 정리
+
+    Args:
+        keys: 조회한 키
+        hits: 키 → 보여줄 청크 ID
+        bm25_chunks: BM25 문서 리스트
+        snippet_chars: 본문 발췌 길이
+
+    Returns:
+        답변 문자열
+    """
+    labels = [_reference_label(key) for key in keys]
+    forms = [key for key in keys if key.startswith("form:")]
+    laws = [key for key in keys if key.startswith("law:")]
+
+    def passages(section_keys: List[str]) -> str:
+        if not section_keys:
+            return "해당 없음"
+        lines = []
+        for key in section_keys:
+            for chunk_id in hits.get(key, []):
+                doc = bm25_chunks[chunk_id]
+                lines.append(f"📌 **{_reference_label(key)}** ({doc.metadata.get('page', '?')}페이지)")
+                lines.append("> " + _snippet(doc.page_content, key, snippet_chars).replace("\n", "\n> "))
+                lines.append("")
+        return "\n".join(lines).strip()
+
+    sources = []
+    for key in keys:
+        for chunk_id in hits.get(key, []):
+            doc = bm25_chunks[chunk_id]
+            path = " > ".join(doc.metadata[level] for level in ("level1", "level2", "level3") if doc.metadata.get(level))
+            source = f"- {path} ({doc.metadata.get('page', '?')}페이지)" if path else f"- {doc.metadata.get('page', '?')}페이지"
+            if source not in sources:
+                sources.append(source)
+
+    return "\n\n".join([
+        SECTION_HEADERS['질문 요지 정리'],
+        f"{', '.join(labels)}이(가) 나오는 매뉴얼 위치를 안내합니다. 자세한 절차가 필요하면 업무 내용을 함께 질문해 주세요.",
+        SECTION_HEADERS['절차'],
+        "해당 없음 (참조 위치 안내)",
+        SECTION_HEADERS['관련 법령'],
+        passages(laws),
+        SECTION_HEADERS['서식'],
+        passages(forms),
+        SECTION_HEADERS['주의사항'],
+        "⚠️ 발췌한 본문은 일부입니다. 적용 전 해당 페이지의 전체 내용을 확인하세요.",
+        SECTION_HEADERS['출처'],
+        "\n".join(sources)
+    ])
+
+
+def lookup_references(query: str, bm25_chunks, config: Dict, build_id: Optional[str]) -> Optional[str]:
+    """
+    참조 위치 질의면 색인으로 바로 답변
+
+    Args:
+        query: 사용자 질문
+        bm25_chunks: BM25 문서 리스트
+        config: config.yaml 설정
+        build_id: BM25 인덱스 빌드 ID
+
+    Returns:
+        답변 (참조 질의가 아니거나 색인에 없으면 None → 일반 파이프라인)
+    """
+    keys = parse_reference_query(query)
+    if not keys:
+        return None
+
+    index = get_reference_index(config, bm25_chunks, build_id)
+    if index is None:
+        return None
+
+    reference_config = config.get('reference_index') or {}
+    max_passages = reference_config.get('max_passages', 5)
+
+    # 키마다 페이지당 한 청크만 (오버랩으로 같은 페이지가 반복되지 않도록)
+    hits = {}
+    for key in keys:
+        chunk_ids, pages = [], set()
+        for chunk_id in index.lookup(key):
+            page = bm25_chunks.get(chunk_id, 'page') if hasattr(bm25_chunks, 'get') else bm25_chunks[chunk_id].metadata.get('page')
+            if page in pages:
+                continue
+            pages.add(page)
+            chunk_ids.append(chunk_id)
+            if len(chunk_ids) >= max_passages:
+                break
+        if chunk_ids:
+            hits[key] = chunk_ids
+
+    # 하나라도 못 찾으면 일반 검색이 더 나은 답을 줄 수 있음
+    if len(hits) < len(keys):
+        return None
+
+    return format_reference_answer(keys, hits, bm25_chunks, reference_config.get('snippet_chars', 300))
@@ -5,7 +5,140 @@
 """
 
 import re
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+
+
+# 섹션 이름 (답변 순서)
+SECTION_NAMES = ['질문 요지 정리', '절차', '관련 법령', '서식', '주의사항', '출처']
+
+# 섹션 제목 (프롬프트의 답변 구조와 동일)
+SECTION_HEADERS = {
+    '질문 요지 정리': '### ① 질문 요지 정리',
+    '절차': '### ② 절차',
+    '관련 법령': '### ③ 관련 법령',
+    '서식': '### ④ 서식',
+    '주의사항': '### ⑤ 주의사항',
+    '출처': '### 📄 출처'
+}
+
+# 섹션 제목 패턴 (하나의 정규식으로 한 번에 판별)
+_SECTION_PATTERNS = [
+    r'①\s*질문\s*요지\s*정리',
+    r'②\s*절차',
+    r'③\s*관련\s*법령',
+    r'④\s*서식',
+    r'⑤\s*주의사항',
+    r'📄\s*출처'
+]
+_HEADER_RE = re.compile(
+    r'###\s*(?:' + '|'.join(f'(?P<s{i}>{pattern})' for i, pattern in enumerate(_SECTION_PATTERNS)) + r')'
+)
+
+
+class SectionStreamParser:
+    """
+    토큰 스트림을 받으면서 섹션을 점진적으로 분리하는 파서
+    
+    - 줄 단위 단일 패스 (이미 처리한 텍스트는 다시 검사하지 않음)
+    - 다음 `###` 제목이 나오면 이전 섹션을 닫고 바로 반환
+    
+    사용 예:
+        parser = SectionStreamParser()
+        for piece in stream:
+            for name, content in parser.feed(piece):
+                render(name, content)
+        parser.close()
+        missing = parser.missing()
+    """
+    
+    def __init__(self):
+        self.seen = {name: False for name in SECTION_NAMES}
+        self.sections: Dict[str, str] = {}
+        self._current: Optional[str] = None
+        self._lines: List[str] = []
+        self._partial = ""
+    
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """
+        텍스트 조각 입력
+        
+        Args:
+            text: 스트림 조각
+            
+        Returns:
+            이번 입력으로 닫힌 섹션 [(섹션 이름, 내용)]
+        """
+        closed = []
+        data = self._partial + text
+        lines = data.split('\n')
+        self._partial = lines.pop()
+        
+        for line in lines:
+            self._consume_line(line, closed)
+        
+        return closed
+    
+    def close(self) -> List[Tuple[str, str]]:
+        """
+        스트림 종료 (남은 텍스트 처리 후 열린 섹션 닫기)
+        
+        Returns:
+            닫힌 섹션 [(섹션 이름, 내용)]
+        """
+        closed = []
+        if self._partial:
+            self._consume_line(self._partial, closed, last=True)
+            self._partial = ""
+        self._close_current(closed)
+        return closed
+    
+    def missing(self) -> List[str]:
+        """제목이 아직 나오지 않은 섹션 목록"""
+        return [name for name, exists in self.seen.items() if not exists]
+    
+    @property
+    def current(self) -> Optional[str]:
+        """현재 작성 중인 섹션"""
+        return self._current
+    
+    def _consume_line(self, line: str, closed: List, last: bool = False) -> None:
+        if '###' not in line:
+            if self._current is not None:
+                self._lines.append(line)
+            return
+        
+        # 제목 줄: 이전 섹션 닫기
+        self._close_current(closed)
+        
+        match = _HEADER_RE.search(line)
+        if match is None:
+            return
+        
+        name = SECTION_NAMES[int(match.lastgroup[1:])]
+        self.seen[name] = True
+        
+        # 제목 뒤에 다른 내용이 없어야 섹션 본문으로 인정 (제목만 있는 줄)
+        if not line[match.end():].strip() and not last:
+            self._current = name
+            self._lines = []
+    
+    def _close_current(self, closed: List) -> None:
+        if self._current is None:
+            return
+        content = '\n'.join(self._lines).strip()
+        # 같은 섹션이 여러 번 나오면 첫 번째 내용 유지
+        self.sections.setdefault(self._current, content)
+        closed.append((self._current, content))
+        self._current = None
+        self._lines = []
+
+
+def _parse(response: str) -> SectionStreamParser:
+    """완성된 답변을 한 번에 파싱"""
+    parser = SectionStreamParser()
+    parser.feed(response)
+    parser.close()
+    return parser
 
 
 def validate_response_structure(response: str) -> Dict[str, bool]:
@@ -18,22 +151,7 @@ def validate_response_structure(response: str) -> Dict[str, bool]:
     Returns:
         검증 결과 딕셔너리
     """
-    required_sections = [
-        r'###\s*①\s*질문\s*요지\s*정리',
-        r'###\s*②\s*절차',
-        r'###\s*③\s*관련\s*법령',
-        r'###\s*④\s*서식',
-        r'###\s*⑤\s*주의사항',
-        r'###\s*📄\s*출처'
-    ]
-    
-    validation = {}
-    
-    for i, pattern in enumerate(required_sections, start=1):
-        section_name = ['질문 요지 정리', '절차', '관련 법령', '서식', '주의사항', '출처'][i-1]
-        validation[section_name] = bool(re.search(pattern, response))
-    
-    return validation
+    return dict(_parse(response).seen)
 
 
 def format_response(response: str) -> str:
@@ -60,31 +178,8 @@ def extract_sections(response: str) -> Dict[str, str]:
     Returns:
         섹션별 내용 딕셔너리
     """
-    sections = {
-        '질문 요지 정리': '',
-        '절차': '',
-        '관련 법령': '',
-        '서식': '',
-        '주의사항': '',
-        '출처': ''
-    }
-    
-    # 각 섹션을 정규식으로 추출
-    patterns = {
-        '질문 요지 정리': r'###\s*①\s*질문\s*요지\s*정리\s*\n(.*?)(?=###|$)',
-        '절차': r'###\s*②\s*절차\s*\n(.*?)(?=###|$)',
-        '관련 법령': r'###\s*③\s*관련\s*법령\s*\n(.*?)(?=###|$)',
-        '서식': r'###\s*④\s*서식\s*\n(.*?)(?=###|$)',
-        '주의사항': r'###\s*⑤\s*주의사항\s*\n(.*?)(?=###|$)',
-        '출처': r'###\s*📄\s*출처\s*\n(.*?)(?=###|$)'
-    }
-    
-    for section_name, pattern in patterns.items():
-        match = re.search(pattern, response, re.DOTALL)
-        if match:
-            sections[section_name] = match.group(1).strip()
-    
-    return sections
+    parsed = _parse(response).sections
+    return {name: parsed.get(name, '') for name in SECTION_NAMES}
 
 
 def get_missing_sections(validation: Dict[str, bool]) -> List[str]:
@@ -98,3 +193,43 @@ def get_missing_sections(validation: Dict[str, bool]) -> List[str]:
         누락된 섹션 목록
     """
     return [section for section, exists in validation.items() if not exists]
+
+
+def splice_sections(response: str, new_sections: Dict[str, str]) -> str:
+    """
+    누락된 섹션을 원래 답변의 제자리에 끼워 넣기
+    
+    이미 있는 섹션과 그 밖의 텍스트는 그대로 두고,
+    누락 섹션은 뒤따르는 섹션 제목 앞(없으면 끝)에 삽입
+    
+    Args:
+        response: 원래 답변
+        new_sections: {섹션 이름: 내용} (보완 요청으로 생성된 섹션)
+        
+    Returns:
+        보완된 답변
+    """
+    present = {}
+    for match in _HEADER_RE.finditer(response):
+        name = SECTION_NAMES[int(match.lastgroup[1:])]
+        present.setdefault(name, match.start())
+    
+    inserts = {}
+    for index, name in enumerate(SECTION_NAMES):
+        content = new_sections.get(name, '').strip()
+        if name in present or not content:
+            continue
+        
+        # 뒤따르는 섹션 중 가장 먼저 나오는 제목 앞에 삽입
+        following = [present[later] for later in SECTION_NAMES[index + 1:] if later in present]
+        position = min(following) if following else len(response)
+        inserts.setdefault(position, []).append(f"{SECTION_HEADERS[name]}\n{content}\n\n")
+    
+    result = response
+    for position in sorted(inserts, reverse=True):
+        block = ''.join(inserts[position])
+        if position == len(result) and not result.endswith('\n\n'):
+            block = ('\n' if result.endswith('\n') else '\n\n') + block.rstrip('\n')
+        result = result[:position] + block + result[position:]
+    
+    return result
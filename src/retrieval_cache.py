@@ -0,0 +1,192 @@
+"""
+검색 결과 캐시 모듈
+- (정규화 질의, 토크나이저 버전, 검색 설정 해시, 인덱스 빌드 ID) → 최종 청크 ID 목록
+- LRU 해제, 선택적 파일 저장
+- 인덱스를 다시 만들면 빌드 ID가 바뀌어 이전 항목은 자동으로 무효화
+"""
+
+import os
+import json
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+# 검색 결과에 영향을 주는 config 섹션
+_KEY_SECTIONS = ("retrieval", "vector_index", "synonyms")
+
+
+class RetrievalCache:
+    """
+    검색 결과(청크 ID 목록) LRU 캐시
+
+    사용 예:
+        cache = RetrievalCache(max_entries=5000, persist_path="./data/retrieval_cache.json")
+        key = cache.make_key(query, config, build_id, tokenizer_version)
+        ids = cache.get(key)
+    """
+
+    def __init__(self, max_entries: int = 5000, persist_path: Optional[str] = None, persist_every: int = 50):
+        """
+        Args:
+            max_entries: 최대 항목 수
+            persist_path: 저장 경로 (None이면 메모리에만 유지)
+            persist_every: 새 항목이 이만큼 쌓일 때마다 저장
+        """
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.persist_every = persist_every
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._dirty = 0
+        self._lock = threading.Lock()
+
+        if persist_path:
+            self._load()
+            atexit.register(self.save)
+
+    @staticmethod
+    def make_key(query: str, config: Dict, build_id: str, tokenizer_version: str) -> str:
+        """
+        캐시 키 생성
+
+        Args:
+            query: 정규화된 질의
+            config: config.yaml 설정 (retrieval/vector_index 섹션만 해시에 사용)
+            build_id: 인덱스 빌드 ID
+            tokenizer_version: BM25 토크나이저 버전
+
+        Returns:
+            캐시 키
+        """
+        config_hash = hashlib.sha1(
+            json.dumps(
+                {section: config.get(section) for section in _KEY_SECTIONS}, sort_keys=True, ensure_ascii=False
+            ).encode('utf-8')
+        ).hexdigest()[:12]
+        query_hash = hashlib.sha1(query.encode('utf-8')).hexdigest()
+        return f"{build_id}|{tokenizer_version}|{config_hash}|{query_hash}"
+
+    def get(self, key: str) -> Optional[List[int]]:
+        """캐시 조회 (히트 시 LRU 갱신)"""
+        with self._lock:
+            ids = self._entries.get(key)
+            if ids is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ids
+
+    def put(self, key: str, ids: List[int]) -> None:
+        """캐시 저장"""
+        with self._lock:
+            self._entries[key] = list(ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty += 1
+            should_save = self.persist_path and self._dirty >= self.persist_every
+
+        if should_save:
+            self.save()
+
+    def invalidate_build(self, build_id: str) -> int:
+        """
+        특정 빌드 ID의 항목 삭제 (인덱스 재생성 시)
+
+        Args:
+            build_id: 삭제할 빌드 ID
+
+        Returns:
+            삭제한 항목 수
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key.startswith(f"{build_id}|")]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self._dirty += 1
+            return len(stale)
+
+    def clear(self) -> None:
+        """전체 삭제"""
+        with self._lock:
+            self._entries.clear()
+            self._dirty += 1
+
+    def stats(self) -> Dict:
+        """캐시 현황"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+    def save(self) -> None:
+        """파일로 저장 (임시 파일에 쓴 뒤 교체)"""
+        if not self.persist_path:
+            return
+
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"entries": list(self._entries.items())}
+            self._dirty = 0
+
+        try:
+            os.makedirs(os.path.dirname(self.persist_path) or ".", exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            print(f"[WARN] 검색 캐시 저장 실패: {str(e)}")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for key, ids in data.get("entries", [])[-self.max_entries:]:
+                self._entries[key] = ids
+        except (OSError, ValueError) as e:
+            print(f"[WARN] 검색 캐시 로드 실패: {str(e)}")
+
+
+_caches: Dict[str, RetrievalCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_retrieval_cache(config: Dict) -> Optional[RetrievalCache]:
+    """
+    config의 retrieval_cache 설정에 맞는 공유 캐시
+
+    Args:
+        config: config.yaml 설정
+
+    Returns:
+        RetrievalCache (비활성화면 None)
+    """
+    cache_config = config.get('retrieval_cache') or {}
+    if not cache_config.get('enabled', False):
+        return None
+
+    persist_path = cache_config.get('persist_path')
+    with _caches_lock:
+        cache = _caches.get(persist_path or "")
+        if cache is None:
+            cache = RetrievalCache(
+                max_entries=cache_config.get('max_entries', 5000),
+                persist_path=persist_path
+            )
+            _caches[persist_path or ""] = cache
+        return cache
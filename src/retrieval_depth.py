@@ -0,0 +1,124 @@
+"""
+적응형 검색 깊이 모듈
+- BM25/벡터 점수 분포(상위 1위 격차, 엔트로피, 가장 큰 점수 간격)로 질의 난이도 추정
+- 난이도에 따라 LLM에 넘길 청크 수를 min_k ~ max_k 사이에서 결정
+
+점수 하나가 뚜렷하게 높으면(격차 큼, 엔트로피 낮음) 쉬운 질의로 보고 적게,
+점수가 고르게 퍼져 있으면 어려운 질의로 보고 많이 넘긴다.
+가장 큰 점수 간격은 깊이를 줄이는 데만 쓴다 (뚜렷한 상위 묶음 뒤의 청크는 잘라냄).
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def normalized_entropy(scores: Sequence[float], temperature: float) -> float:
+    """
+    softmax(점수 / temperature)의 엔트로피를 log(n)으로 나눈 값 (0: 한 개에 집중, 1: 균등)
+
+    Args:
+        scores: 내림차순 점수
+        temperature: softmax 온도 (점수 척도에 맞춤)
+
+    Returns:
+        0~1
+    """
+    if len(scores) < 2:
+        return 0.0
+    top = scores[0]
+    weights = [math.exp((score - top) / temperature) for score in scores]
+    total = sum(weights)
+    entropy = -sum((w / total) * math.log(w / total) for w in weights if w > 0)
+    return entropy / math.log(len(scores))
+
+
+def largest_gap(scores: Sequence[float]) -> Tuple[int, float]:
+    """가장 큰 점수 간격 앞까지의 개수 (상위 묶음의 크기)와 그 간격"""
+    if len(scores) < 2:
+        return len(scores), 0.0
+    gaps = [scores[i] - scores[i + 1] for i in range(len(scores) - 1)]
+    largest = max(gaps)
+    return gaps.index(largest) + 1, largest
+
+
+def distribution_signals(scores: Sequence[float], temperature: float) -> Dict:
+    """
+    점수 분포 신호
+
+    Args:
+        scores: 내림차순 점수 (같은 척도)
+        temperature: 격차/엔트로피 계산 척도
+
+    Returns:
+        {"margin", "entropy", "gap_at", "gap_clear", "difficulty"}
+        (gap_clear: 가장 큰 간격이 온도 이상 → 상위 묶음이 뚜렷함)
+    """
+    margin = scores[0] - scores[1] if len(scores) > 1 else scores[0]
+    entropy = normalized_entropy(scores, temperature)
+    # 1위 격차가 온도보다 충분히 크면 확신도 → 1
+    confidence = 1.0 - math.exp(-max(margin, 0.0) / temperature)
+    gap_at, gap = largest_gap(scores)
+    return {
+        "margin": round(margin, 4),
+        "entropy": round(entropy, 4),
+        "gap_at": gap_at,
+        "gap_clear": gap >= temperature,
+        "difficulty": entropy * (1.0 - confidence)
+    }
+
+
+def choose_depth(
+    bm25_scores: Sequence[float],
+    vector_scores: Optional[Sequence[float]],
+    config: Dict
+) -> Tuple[int, Dict]:
+    """
+    넘길 청크 수 결정
+
+    Args:
+        bm25_scores: BM25 상위 점수 (내림차순, 0점 제외)
+        vector_scores: 벡터 상위 코사인 유사도 (내림차순, 없으면 None)
+        config: retrieval.adaptive 설정
+
+    Returns:
+        (청크 수, trace에 기록할 신호)
+    """
+    min_k = config.get('min_k', 3)
+    max_k = config.get('max_k', 10)
+
+    signals: Dict = {}
+    difficulties: List[float] = []
+    # 점수 목록별 뚜렷한 상위 묶음 크기
+    cuts: List[int] = []
+
+    bm25_scores = [float(score) for score in bm25_scores[:max_k] if score > 0]
+    if len(bm25_scores) >= 2:
+        # BM25는 질의마다 척도가 달라 1위 점수로 나눠서 비교
+        top = bm25_scores[0]
+        bm25 = distribution_signals([score / top for score in bm25_scores], config.get('bm25_temperature', 0.1))
+        signals.update({f"bm25_{key}": value for key, value in bm25.items() if key != "difficulty"})
+        difficulties.append(bm25["difficulty"])
+        if bm25["gap_clear"]:
+            cuts.append(bm25["gap_at"])
+
+    if vector_scores is not None and len(vector_scores) >= 2:
+        vector = distribution_signals([float(score) for score in vector_scores[:max_k]],
+                                      config.get('vector_temperature', 0.02))
+        signals.update({f"vector_{key}": value for key, value in vector.items() if key != "difficulty"})
+        difficulties.append(vector["difficulty"])
+        if vector["gap_clear"]:
+            cuts.append(vector["gap_at"])
+
+    # 점수 분포를 볼 수 없으면(어휘 일치 없음 등) 넓게
+    difficulty = sum(difficulties) / len(difficulties) if difficulties else 1.0
+    depth = min_k + round(difficulty * (max_k - min_k))
+    # 간격은 깊이를 줄이기만 함: 두 목록 모두 상위 묶음이 뚜렷하면 둘 중 큰 묶음까지만
+    # (한쪽만 뚜렷하면 다른 쪽 결과를 잘라내지 않도록 줄이지 않음)
+    gap_at = max(cuts) if cuts and len(cuts) == len(difficulties) else None
+    if gap_at is not None:
+        depth = min(depth, gap_at)
+    depth = max(min_k, min(max_k, depth))
+
+    signals.update({"difficulty": round(difficulty, 4), "gap_at": gap_at, "depth": depth,
+                    "min_k": min_k, "max_k": max_k})
+    return depth, signals
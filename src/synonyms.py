@@ -0,0 +1,424 @@
+"""
+동의어/약어 확장 모듈
+- 인덱스 생성 시 청크 본문에서 별칭으로 보이는 괄호 정의만 모음
+  (영문 약어 ↔ 한글 명칭 "교육행정정보시스템(NEIS)", 한글 줄임말 "학교운영위원회(학운위)")
+- 두 용어가 같은 청크에 함께 나오는 비율이 min_cooccurrence 미만이거나
+  너무 흔한 용어(max_doc_ratio 초과)가 낀 쌍은 버리고, 남은 쌍은 그 비율로 가중치를 정함
+- 접두 표기("K-에듀파인" → "에듀파인")와 config의 seeds(음역 등 본문에서 찾을 수 없는 쌍)도 포함
+- 용어마다 실제 BM25 어휘(조사가 붙은 "나이스에서" 등)를 미리 찾아 두어
+  공백 토크나이저가 놓치는 표기도 가중 BM25 항으로 추가 (용어 뒤에 조사/문장부호만 붙은 토큰)
+- 질의는 Aho-Corasick 오토마톤으로 한 번만 훑어 모든 용어를 찾음
+
+BM25 인덱스 옆 synonyms.json에 빌드 ID, 설정 해시와 함께 저장한다.
+"""
+
+import os
+import re
+import json
+import bisect
+import hashlib
+import threading
+from collections import Counter, deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.vectorstore import tokenize
+
+
+SYNONYM_FILE = "synonyms.json"
+
+# 괄호 정의: 용어(별칭) — 용어는 괄호 바로 앞 한 단어
+DEFINITION_RE = re.compile(r'([0-9A-Za-z가-힣][0-9A-Za-z가-힣·\-]{1,29})\s?\(\s*([^()\n]{2,30}?)\s*\)')
+
+# 영문 약어 ("NEIS", "G2B", "K-FMS")
+_ACRONYM_RE = re.compile(r'^[A-Z][A-Z0-9&\-]{1,11}$')
+
+# 한글 명칭 (숫자/기호/공백 없는 한 단어, 조사·어미로 끝나는 설명구 "도입으로", "설치된" 제외)
+_HANGUL_NAME_RE = re.compile(r'^[가-힣]+$')
+_NOT_NAME_END_RE = re.compile(r'(?:으로|에서|에게|하여|하는|하고|된|한|을|를)$')
+
+# 약어가 가리키는 한글 명칭의 최소 글자 수 ("처리", "학교" 같은 일반어 제외)
+_MIN_NAME_CHARS = 3
+
+# 접두 표기 ("K-에듀파인" → "에듀파인")
+_PREFIX_RE = re.compile(r'^[A-Za-z]-([가-힣][0-9A-Za-z가-힣]+)$')
+
+# 어휘 표기: 용어 뒤에 붙어도 같은 표기로 보는 조사 + 문장부호
+_PARTICLES = (
+    "은", "는", "이", "가", "을", "를", "의", "에", "에서", "에게", "에는", "에서는", "에서의", "으로", "로",
+    "으로는", "로는", "와", "과", "도", "만", "까지", "부터", "이나", "나", "이란", "란", "에도", "으로도", "로도"
+)
+_VARIANT_SUFFIX_RE = re.compile(
+    r'^(?:' + "|".join(sorted(_PARTICLES, key=len, reverse=True)) + r')?[.,:;)\]」』"\'”’]*$'
+)
+
+
+def fold(text: str) -> str:
+    """비교용 표기 (소문자)"""
+    return text.lower()
+
+
+def _is_name(text: str) -> bool:
+    return bool(_HANGUL_NAME_RE.match(text)) and not _NOT_NAME_END_RE.search(text)
+
+
+def _is_abbreviation(short: str, long: str) -> bool:
+    """short가 long의 줄임말인지 (첫 글자가 같고 글자 순서를 유지한 부분열, 연속된 부분 문자열은 제외)"""
+    if not 2 <= len(short) < len(long) or short[0] != long[0] or short in long:
+        return False
+    position = 0
+    for ch in short:
+        position = long.find(ch, position) + 1
+        if position == 0:
+            return False
+    return True
+
+
+def _is_alias(outer: str, inner: str) -> bool:
+    """
+    괄호 안 내용이 앞 용어의 별칭인지
+
+    영문 약어 ↔ 한글 명칭, 또는 한글 명칭 ↔ 그 줄임말만 별칭으로 본다
+    ("접수(학교발전기금기탁서)", "10(NEIS)" 같은 설명/참조 괄호는 제외).
+    """
+    for a, b in ((outer, inner), (inner, outer)):
+        if _ACRONYM_RE.match(a) and _is_name(b) and len(b) >= _MIN_NAME_CHARS:
+            return True
+    if _is_name(outer) and _is_name(inner):
+        short, long = sorted((outer, inner), key=len)
+        return _is_abbreviation(short, long)
+    return False
+
+
+def mine_definitions(texts: Iterable[str]) -> Counter:
+    """
+    괄호 정의 쌍 수집
+
+    Args:
+        texts: 청크 본문
+
+    Returns:
+        (용어, 별칭) → 등장 횟수 (모두 fold된 표기)
+    """
+    pairs: Counter = Counter()
+    for text in texts:
+        for outer, inner in DEFINITION_RE.findall(text):
+            inner = inner.strip()
+            if _is_alias(outer, inner):
+                pairs[tuple(sorted((fold(outer), fold(inner))))] += 1
+    return pairs
+
+
+class Automaton:
+    """
+    Aho-Corasick 다중 문자열 검색 (한 번 훑어 모든 패턴 위치를 찾음)
+
+    사용 예:
+        automaton = Automaton({"나이스": "나이스", "neis": "neis"})
+        list(automaton.iter_matches("나이스 접수"))  # [(0, 3, "나이스")]
+    """
+
+    def __init__(self, patterns: Dict[str, str]):
+        """
+        Args:
+            patterns: 패턴 → 값
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]
+
+        for pattern, value in patterns.items():
+            state = 0
+            for ch in pattern:
+                if ch not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][ch] = len(self._goto) - 1
+                state = self._goto[state][ch]
+            self._out[state].append((len(pattern), value))
+
+        # 실패 링크 (너비 우선)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """
+        패턴 위치
+
+        Yields:
+            (시작, 끝, 값)
+        """
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, value in self._out[state]:
+                yield i - length + 1, i + 1, value
+
+
+class SynonymIndex:
+    """
+    동의어 사전 + 질의 확장
+
+    사용 예:
+        index = SynonymIndex.build(chunks.texts(), config, build_id=bm25.build_id)
+        weighted_terms = index.expand("나이스 접수 방법")
+    """
+
+    def __init__(
+        self,
+        synonyms: Dict[str, List[List]],
+        vocab: Dict[str, List[str]],
+        build_id: Optional[str] = None,
+        config_hash: Optional[str] = None
+    ):
+        """
+        Args:
+            synonyms: 용어 → [[동의어, 가중치], ...] (fold된 표기)
+            vocab: 용어 → 해당 용어로 시작하는 BM25 어휘 (많이 쓰인 순)
+            build_id: BM25 인덱스 빌드 ID
+            config_hash: 사전을 만든 synonyms 설정 해시
+        """
+        self.synonyms = synonyms
+        self.vocab = vocab
+        self.build_id = build_id
+        self.config_hash = config_hash
+
+        # 하이픈 없이 쓴 표기("k에듀파인")도 같은 용어로 인식
+        patterns = {}
+        for term in synonyms:
+            patterns[term] = term
+            patterns.setdefault(term.replace("-", ""), term)
+        self._automaton = Automaton(patterns)
+
+    @classmethod
+    def build(cls, texts: Iterable[str], config: Dict, build_id: Optional[str] = None) -> "SynonymIndex":
+        """
+        청크 본문으로 사전 생성
+
+        Args:
+            texts: 청크 본문 (청크 ID 순서)
+            config: config.yaml 설정 (synonyms 섹션 사용)
+            build_id: BM25 인덱스 빌드 ID
+
+        Returns:
+            SynonymIndex
+        """
+        synonym_config = config.get('synonyms') or {}
+        max_weight = synonym_config.get('weight', 0.9)
+        min_cooccurrence = synonym_config.get('min_cooccurrence', 0.5)
+        max_doc_ratio = synonym_config.get('max_doc_ratio', 0.05)
+        texts = list(texts)
+
+        # 1. 괄호 정의 + 접두 표기 + seeds
+        definitions = mine_definitions(texts)
+        pairs = {pair: count for pair, count in definitions.items()
+                 if count >= synonym_config.get('min_definitions', 1)}
+        fixed: Dict[Tuple[str, str], float] = {}
+        for group in synonym_config.get('seeds') or []:
+            group = [fold(term) for term in group]
+            for i, a in enumerate(group):
+                for b in group[i + 1:]:
+                    fixed[tuple(sorted((a, b)))] = 1.0
+        for term in {term for pair in list(pairs) + list(fixed) for term in pair}:
+            match = _PREFIX_RE.match(term)
+            if match:
+                fixed[tuple(sorted((term, fold(match.group(1)))))] = 1.0
+
+        # 2. 동시 출현: 드문 쪽 용어가 나오는 청크 중 다른 용어도 함께 나오는 비율
+        terms = sorted({term for pair in list(pairs) + list(fixed) for term in pair})
+        automaton = Automaton({term: term for term in terms})
+        doc_freq: Counter = Counter()
+        joint_freq: Counter = Counter()
+        token_freq: Counter = Counter()
+        for text in texts:
+            present = {value for _, _, value in automaton.iter_matches(fold(text))}
+            doc_freq.update(present)
+            joint_freq.update(pair for pair in pairs if pair[0] in present and pair[1] in present)
+            token_freq.update(set(tokenize(text)))
+
+        synonyms: Dict[str, List[List]] = {}
+
+        def add(a: str, b: str, weight: float) -> None:
+            synonyms.setdefault(a, []).append([b, weight])
+            synonyms.setdefault(b, []).append([a, weight])
+
+        for (a, b), weight in fixed.items():
+            add(a, b, weight)
+        max_doc_freq = max(1, len(texts) * max_doc_ratio)
+        for (a, b), count in pairs.items():
+            if (a, b) in fixed:
+                continue
+            # 흔한 용어는 어느 쪽이든 별칭 확장의 이득보다 잡음이 큼
+            if max(doc_freq[a], doc_freq[b]) > max_doc_freq:
+                continue
+            cooccurrence = joint_freq[(a, b)] / max(min(doc_freq[a], doc_freq[b]), 1)
+            if cooccurrence < min_cooccurrence:
+                continue
+            add(a, b, round(max_weight * cooccurrence, 2))
+
+        # 3. 용어별 BM25 어휘 (용어로 시작하고 뒤에 조사/문장부호만 붙은 토큰)
+        max_variants = synonym_config.get('max_variants', 8)
+        folded = sorted((fold(token), token) for token in token_freq)
+        keys = [key for key, _ in folded]
+        vocab: Dict[str, List[str]] = {}
+        for term in synonyms:
+            matches = []
+            for i in range(bisect.bisect_left(keys, term), len(keys)):
+                key, token = folded[i]
+                if not key.startswith(term):
+                    break
+                if _VARIANT_SUFFIX_RE.match(key[len(term):]):
+                    matches.append(token)
+            matches.sort(key=lambda token: -token_freq[token])
+            vocab[term] = matches[:max_variants]
+
+        return cls(synonyms, vocab, build_id, config_hash(config))
+
+    def find_terms(self, query: str) -> List[str]:
+        """
+        질의에 나온 사전 용어 (단어 시작 위치에서, 겹치면 왼쪽·긴 것 우선)
+
+        Args:
+            query: 사용자 질의
+
+        Returns:
+            fold된 용어 리스트
+        """
+        text = fold(query)
+        matches = [
+            (start, -(end - start), end, term) for start, end, term in self._automaton.iter_matches(text)
+            if start == 0 or not text[start - 1].isalnum()
+        ]
+        terms = []
+        covered = 0
+        for start, _, end, term in sorted(matches):
+            if start >= covered:
+                terms.append(term)
+                covered = end
+        return terms
+
+    def expand(self, query: str, variant_weight: float = 0.8, max_terms: int = 40) -> List[Tuple[str, float]]:
+        """
+        가중 BM25 질의 항
+
+        질의 토큰은 (반복된 토큰도 그대로) 가중치 1, 질의에 나온 용어의 본문 표기와 동의어 표기는
+        (동의어 가중치 × 조사가 붙은 표기면 variant_weight)로 추가한다.
+
+        Args:
+            query: 사용자 질의
+            variant_weight: 용어 뒤에 조사 등이 붙은 표기의 가중치
+            max_terms: 추가할 최대 항 수 (가중치 높은 순)
+
+        Returns:
+            [(토큰, 가중치), ...]
+        """
+        query_tokens = tokenize(query)
+        seen = set(query_tokens)
+        expansions: Dict[str, float] = {}
+        for term in self.find_terms(query):
+            for synonym, weight in [[term, 1.0]] + self.synonyms.get(term, []):
+                for token in self.vocab.get(synonym, []):
+                    token_weight = weight if fold(token) == synonym else weight * variant_weight
+                    if token not in seen and token_weight > expansions.get(token, 0.0):
+                        expansions[token] = token_weight
+
+        ranked = sorted(expansions.items(), key=lambda item: -item[1])[:max_terms]
+        return [(token, 1.0) for token in query_tokens] + [(token, round(weight, 3)) for token, weight in ranked]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "build_id": self.build_id,
+                "config_hash": self.config_hash,
+                "synonyms": self.synonyms,
+                "vocab": self.vocab
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "SynonymIndex":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["synonyms"], data["vocab"], data.get("build_id"), data.get("config_hash"))
+
+
+def config_hash(config: Dict) -> str:
+    """사전 생성에 쓰인 synonyms 설정 해시 (seeds 등을 바꾸면 다시 생성)"""
+    section = config.get('synonyms') or {}
+    return hashlib.sha1(json.dumps(section, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+
+
+def weighted_bm25_scores(bm25, weighted_terms: List[Tuple[str, float]]):
+    """
+    가중 BM25 점수 (BM25는 항별 점수의 합이므로 같은 가중치끼리 묶어 계산)
+
+    Args:
+        bm25: BM25 인덱스
+        weighted_terms: [(토큰, 가중치), ...]
+
+    Returns:
+        청크별 점수 (numpy 배열)
+    """
+    groups: Dict[float, List[str]] = {}
+    for token, weight in weighted_terms:
+        groups.setdefault(weight, []).append(token)
+
+    scores = bm25.get_scores(groups.pop(1.0, []))
+    for weight, tokens in groups.items():
+        scores = scores + weight * bm25.get_scores(tokens)
+    return scores
+
+
+def default_synonym_path(bm25_path: str) -> str:
+    """BM25 인덱스 옆 사전 경로"""
+    return os.path.join(os.path.dirname(bm25_path) or ".", SYNONYM_FILE)
+
+
+_indexes: Dict[str, SynonymIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_synonym_index(config: Dict, bm25_chunks, build_id: Optional[str]) -> Optional[SynonymIndex]:
+    """
+    현재 빌드의 동의어 사전 (파일이 없거나 다른 빌드/설정이면 청크에서 다시 만들어 저장)
+
+    Args:
+        config: config.yaml 설정
+        bm25_chunks: BM25 문서 리스트 (ChunkStore 또는 List[Document])
+        build_id: BM25 인덱스 빌드 ID
+
+    Returns:
+        SynonymIndex (비활성화면 None)
+    """
+    if not (config.get('synonyms') or {}).get('enabled', False):
+        return None
+
+    path = default_synonym_path(config['database']['bm25_path'])
+    expected_hash = config_hash(config)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is not None and index.build_id == build_id and index.config_hash == expected_hash:
+            return index
+
+        if os.path.exists(path):
+            index = SynonymIndex.load(path)
+        if index is None or index.build_id != build_id or index.config_hash != expected_hash:
+            texts = bm25_chunks.texts() if hasattr(bm25_chunks, 'texts') else (doc.page_content for doc in bm25_chunks)
+            index = SynonymIndex.build(texts, config, build_id)
+            try:
+                index.save(path)
+            except OSError as e:
+                print(f"[WARN] 동의어 사전 저장 실패: {str(e)}")
+
+        _indexes[path] = index
+        return index
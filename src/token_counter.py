@@ -0,0 +1,54 @@
+"""
+토큰 수 계산 모듈
+- tiktoken 사용 가능 시 정확한 토큰 수
+- 오프라인 등 tiktoken 사용 불가 시 근사치
+"""
+
+from typing import Optional
+
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding(model: Optional[str] = None):
+    """tiktoken 인코딩 로드 (최초 1회, 실패 시 None)"""
+    global _encoding, _encoding_failed
+
+    if _encoding is not None or _encoding_failed:
+        return _encoding
+
+    try:
+        import tiktoken
+        try:
+            _encoding = tiktoken.encoding_for_model(model or "gpt-4o-mini")
+        except KeyError:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # 인코딩 파일 다운로드 불가(오프라인) 등
+        _encoding_failed = True
+
+    return _encoding
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    텍스트 토큰 수 계산
+
+    Args:
+        text: 대상 텍스트
+        model: 모델명 (인코딩 선택용)
+
+    Returns:
+        토큰 수
+    """
+    if not text:
+        return 0
+
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+
+    # 근사치: 한글은 글자당 약 1토큰, 그 외는 4글자당 약 1토큰
+    hangul = sum(1 for ch in text if '가' <= ch <= '힣')
+    return hangul + (len(text) - hangul) // 4 + 1
@@ -0,0 +1,285 @@
+"""
+트레이싱 모듈
+- 단계별 span 측정 (컨텍스트 매니저 / 데코레이터)
+- 링 버퍼 + JSONL 싱크 기록 (파일 쓰기는 백그라운드 스레드 하나가 열린 파일로 처리)
+- 단계별 p50/p95/p99 통계
+"""
+
+import os
+import json
+import math
+import time
+import uuid
+import queue
+import atexit
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+
+# 기본 설정 (config.yaml의 tracing 섹션으로 덮어씀)
+_settings = {
+    "enabled": True,
+    "buffer_size": 2000,
+    "jsonl_path": None
+}
+
+_lock = threading.Lock()
+_buffer = deque(maxlen=_settings["buffer_size"])
+
+# JSONL 싱크 대기열 ((경로, 레코드) 또는 flush_traces의 Event)
+_sink: "queue.SimpleQueue" = queue.SimpleQueue()
+_writer: Optional[threading.Thread] = None
+
+# 현재 요청의 trace id (스레드/asyncio 모두 안전)
+_current_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+
+
+def configure_tracing(config: Dict) -> None:
+    """
+    트레이싱 설정 적용
+
+    Args:
+        config: config.yaml 설정 (tracing 섹션이 없으면 기본값 사용)
+    """
+    global _buffer
+
+    tracing_config = config.get('tracing', {}) or {}
+
+    with _lock:
+        _settings.update(tracing_config)
+
+        if _buffer.maxlen != _settings["buffer_size"]:
+            _buffer = deque(_buffer, maxlen=_settings["buffer_size"])
+
+
+@contextmanager
+def start_trace(trace_id: str = None):
+    """
+    요청 단위 trace 시작 (하위 span이 같은 trace id를 공유)
+
+    Args:
+        trace_id: 지정하지 않으면 새로 생성
+
+    Yields:
+        trace id
+    """
+    trace_id = trace_id or uuid.uuid4().hex[:12]
+    token = _current_trace_id.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _current_trace_id.reset(token)
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """
+    단계 소요 시간 측정
+
+    사용 예:
+        with span("bm25", query_tokens=3) as s:
+            ...
+            s["candidates"] = len(results)
+
+    Args:
+        stage: 단계 이름 (embedding, chroma, bm25, fusion, prompt, llm 등)
+        **attrs: 기록할 속성 (토큰 수, 후보 수, 캐시 히트 등)
+
+    Yields:
+        속성 딕셔너리 (블록 안에서 값 추가 가능)
+    """
+    if not _settings["enabled"]:
+        yield attrs
+        return
+
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        record = {
+            "ts": time.time(),
+            "trace_id": _current_trace_id.get(),
+            "stage": stage,
+            "duration_ms": round(duration_ms, 3),
+            "attrs": attrs
+        }
+        if error:
+            record["error"] = error
+        _emit(record)
+
+
+def traced(stage: str):
+    """
+    함수 전체를 span으로 감싸는 데코레이터
+
+    Args:
+        stage: 단계 이름
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _emit(record: Dict) -> None:
+    """링 버퍼에 기록하고 JSONL 싱크 대기열에 넘김 (요청 스레드는 파일 I/O를 기다리지 않음)"""
+    global _writer
+
+    with _lock:
+        _buffer.append(record)
+
+        jsonl_path = _settings.get("jsonl_path")
+        if not jsonl_path:
+            return
+        if _writer is None:
+            _writer = threading.Thread(target=_write_loop, name="trace-writer", daemon=True)
+            _writer.start()
+            atexit.register(flush_traces)
+    _sink.put((jsonl_path, record))
+
+
+def _write_loop() -> None:
+    """JSONL 싱크 기록 (파일은 열어 둔 채 줄 단위 버퍼링, 경로가 바뀌면 다시 엶)"""
+    path, f = None, None
+    while True:
+        item = _sink.get()
+        if isinstance(item, threading.Event):
+            item.set()
+            continue
+
+        jsonl_path, record = item
+        try:
+            if jsonl_path != path:
+                if f is not None:
+                    f.close()
+                path, f = jsonl_path, None
+                os.makedirs(os.path.dirname(jsonl_path) or ".", exist_ok=True)
+                f = open(jsonl_path, 'a', encoding='utf-8', buffering=1)
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        except (OSError, TypeError, ValueError) as e:
+            # 싱크 실패가 질의 처리를 막지 않도록 출력만 (다음 레코드에서 다시 엶)
+            print(f"[WARN] 트레이스 기록 실패: {str(e)}")
+            path = None
+
+
+def flush_traces(timeout: float = 5.0) -> None:
+    """
+    대기 중인 JSONL 레코드가 파일에 기록될 때까지 대기 (프로세스 종료 시 자동 호출)
+
+    Args:
+        timeout: 최대 대기 시간 (초)
+    """
+    if _writer is None:
+        return
+    done = threading.Event()
+    _sink.put(done)
+    done.wait(timeout)
+
+
+def get_recent_spans(limit: int = None) -> List[Dict]:
+    """
+    링 버퍼의 최근 span 목록
+
+    Args:
+        limit: 최대 개수 (기본값: 전체)
+
+    Returns:
+        span 레코드 리스트 (오래된 순)
+    """
+    with _lock:
+        records = list(_buffer)
+
+    if limit is not None:
+        records = records[-limit:]
+
+    return records
+
+
+def clear_spans() -> None:
+    """링 버퍼 초기화"""
+    with _lock:
+        _buffer.clear()
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """정렬된 값에서 백분위수 계산 (nearest-rank)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize_durations(values: List[float]) -> Dict:
+    """
+    소요 시간 분포 요약
+
+    Args:
+        values: 소요 시간 리스트 (ms)
+
+    Returns:
+        count, mean, p50, p95, p99, max
+    """
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+        "p50": round(_percentile(ordered, 50), 3),
+        "p95": round(_percentile(ordered, 95), 3),
+        "p99": round(_percentile(ordered, 99), 3),
+        "max": round(ordered[-1], 3) if ordered else 0.0
+    }
+
+
+def stage_percentiles(records: List[Dict] = None) -> Dict[str, Dict]:
+    """
+    단계별 p50/p95/p99 계산
+
+    Args:
+        records: span 레코드 (기본값: 링 버퍼 전체)
+
+    Returns:
+        {stage: {"count", "mean", "p50", "p95", "p99", "max"}}
+    """
+    if records is None:
+        records = get_recent_spans()
+
+    durations = {}
+    for record in records:
+        durations.setdefault(record["stage"], []).append(record["duration_ms"])
+
+    return {stage: summarize_durations(values) for stage, values in durations.items()}
+
+
+def load_jsonl(jsonl_path: str) -> List[Dict]:
+    """
+    JSONL 싱크 파일 로드
+
+    Args:
+        jsonl_path: JSONL 파일 경로
+
+    Returns:
+        span 레코드 리스트
+    """
+    records = []
+    if not os.path.exists(jsonl_path):
+        return records
+
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+
+    return records
@@ -0,0 +1,424 @@
+"""
+로컬 벡터 인덱스 모듈
+- ChromaDB에 저장된 임베딩을 내보내 numpy 배열로 검색
+- 차원 축소 (Matryoshka 절단 + 재정규화, text-embedding-3 계열만 유효)
+- 양자화 저장 (float16, int8 + 벡터별 scale)
+- 상위 후보는 원본 float32 벡터(mmap)로 다시 점수 계산 (rescoring)
+
+파일 구성 ({chroma_path 옆}/vector_index/):
+    meta.json     모델, 차원, 양자화 형식, BM25 빌드 ID
+    ids.npy       행 → 청크 ID (bm25_chunks 위치)
+    codes.npy     양자화 벡터 (메모리에 로드)
+    scales.npy    int8 벡터별 scale
+    full.npy      원본 float32 벡터 (rescoring용, mmap)
+"""
+
+import os
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema.embeddings import Embeddings
+
+
+META_FILE = "meta.json"
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+# 한 번에 float32로 변환해 계산할 행 수 (양자화 벡터 전체를 변환하지 않도록)
+_BLOCK_ROWS = 8192
+
+
+def supports_truncation(model: Optional[str]) -> bool:
+    """Matryoshka 절단이 가능한 모델인지 (text-embedding-3 계열)"""
+    return bool(model) and model.startswith("text-embedding-3")
+
+
+def truncate_normalize(vectors: np.ndarray, dimensions: Optional[int] = None) -> np.ndarray:
+    """
+    앞쪽 dimensions개 성분만 남기고 L2 정규화
+
+    Args:
+        vectors: (N, D) 또는 (D,) 배열
+        dimensions: 남길 차원 수 (None이면 절단하지 않음)
+
+    Returns:
+        float32 배열
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dimensions:
+        vectors = vectors[..., :dimensions]
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class MatryoshkaEmbeddings(Embeddings):
+    """
+    임베딩 차원 축소 래퍼 (API 결과를 절단 후 재정규화)
+
+    API의 dimensions 파라미터와 같은 결과이며, 클라이언트 버전에 상관없이 동작한다.
+    """
+
+    def __init__(self, base: Embeddings, dimensions: int):
+        """
+        Args:
+            base: 실제 임베딩 객체
+            dimensions: 남길 차원 수
+        """
+        self.base = base
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return truncate_normalize(self.base.embed_documents(texts), self.dimensions).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return truncate_normalize(self.base.embed_query(text), self.dimensions).tolist()
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    벡터 양자화
+
+    Args:
+        vectors: 정규화된 float32 (N, D) 배열
+        dtype: float32 | float16 | int8
+
+    Returns:
+        (codes, scales) — int8이 아니면 scales는 None
+    """
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"지원하지 않는 양자화 형식입니다: {dtype}")
+
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+
+    return vectors.astype(dtype), None
+
+
+def approximate_scores(query: np.ndarray, codes: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    """
+    양자화 벡터와 질의의 내적 (블록 단위로 float32 변환)
+
+    Args:
+        query: 정규화된 질의 벡터 (d,)
+        codes: 양자화 벡터 (N, d)
+        scales: int8 벡터별 scale (N,) 또는 None
+
+    Returns:
+        (N,) 점수
+    """
+    if codes.dtype == np.float32:
+        scores = codes @ query
+    else:
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _BLOCK_ROWS):
+            block = codes[start:start + _BLOCK_ROWS].astype(np.float32)
+            scores[start:start + _BLOCK_ROWS] = block @ query
+
+    if scales is not None:
+        scores *= scales
+    return scores
+
+
+class VectorIndex:
+    """
+    양자화 벡터 인덱스 (코사인 유사도)
+
+    사용 예:
+        index = VectorIndex.load("./data/vector_index")
+        chunk_ids, scores = index.search(query_vector, k=12)
+    """
+
+    def __init__(self, codes: np.ndarray, scales: Optional[np.ndarray], ids: np.ndarray,
+                 full: Optional[np.ndarray], meta: Dict):
+        """
+        Args:
+            codes: 양자화 벡터 (N, d)
+            scales: int8 벡터별 scale
+            ids: 행 → 청크 ID
+            full: 원본 float32 벡터 (N, D, rescoring용, None이면 rescoring 안 함)
+            meta: 인덱스 정보
+        """
+        self.codes = codes
+        self.scales = scales
+        self.ids = ids
+        self.full = full
+        self.meta = meta
+        self.dimensions = codes.shape[1] if codes.ndim == 2 else 0
+        self.build_id = meta.get('build_id')
+        self._rows_by_chunk: Optional[np.ndarray] = None
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, ids: np.ndarray, dtype: str = "int8",
+              dimensions: Optional[int] = None, meta: Optional[Dict] = None) -> "VectorIndex":
+        """
+        메모리에서 인덱스 생성
+
+        Args:
+            vectors: 원본 임베딩 (N, D)
+            ids: 행 → 청크 ID
+            dtype: 양자화 형식
+            dimensions: 절단 차원 (None이면 원본 차원)
+            meta: 추가 정보 (model, build_id 등)
+
+        Returns:
+            VectorIndex
+        """
+        full = truncate_normalize(vectors)
+        codes, scales = quantize(truncate_normalize(full, dimensions), dtype)
+        meta = dict(meta or {})
+        meta.update({"dtype": dtype, "dimensions": codes.shape[1], "full_dimensions": full.shape[1], "count": len(full)})
+        return cls(codes, scales, np.asarray(ids, dtype=np.int64), full, meta)
+
+    def save(self, path: str) -> None:
+        """디렉토리에 저장"""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "codes.npy"), self.codes)
+        np.save(os.path.join(path, "ids.npy"), self.ids)
+        if self.scales is not None:
+            np.save(os.path.join(path, "scales.npy"), self.scales)
+        if self.full is not None:
+            np.save(os.path.join(path, "full.npy"), np.asarray(self.full, dtype=np.float32))
+        with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "VectorIndex":
+        """
+        디렉토리에서 로드 (원본 벡터는 mmap)
+
+        Args:
+            path: 인덱스 디렉토리
+
+        Returns:
+            VectorIndex
+        """
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        scales_path = os.path.join(path, "scales.npy")
+        full_path = os.path.join(path, "full.npy")
+        return cls(
+            codes=np.load(os.path.join(path, "codes.npy")),
+            scales=np.load(scales_path) if os.path.exists(scales_path) else None,
+            ids=np.load(os.path.join(path, "ids.npy")),
+            full=np.load(full_path, mmap_mode='r') if os.path.exists(full_path) else None,
+            meta=meta
+        )
+
+    def nbytes(self) -> int:
+        """메모리에 올라가는 크기 (원본 mmap 제외)"""
+        total = self.codes.nbytes + self.ids.nbytes
+        if self.scales is not None:
+            total += self.scales.nbytes
+        return total
+
+    def search(self, query_vector, k: int, rescore_k: int = 0) -> Tuple[List[int], List[float]]:
+        """
+        코사인 유사도 상위 k개 검색
+
+        Args:
+            query_vector: 질의 임베딩 (원본 차원)
+            k: 반환 개수
+            rescore_k: 양자화 점수로 고른 후보 수 (k보다 크면 원본 벡터로 다시 점수 계산)
+
+        Returns:
+            (청크 ID 리스트, 점수 리스트)
+        """
+        if len(self.ids) == 0:
+            return [], []
+
+        query_full = truncate_normalize(query_vector)
+        query = truncate_normalize(query_full, self.dimensions)
+        scores = approximate_scores(query, self.codes, self.scales)
+
+        candidates = max(k, rescore_k) if self.full is not None else k
+        candidates = min(candidates, len(scores))
+        rows = np.argpartition(-scores, candidates - 1)[:candidates]
+
+        if self.full is not None and rescore_k > k:
+            # 후보만 원본 float32 벡터로 다시 계산
+            rows = np.sort(rows)
+            exact = np.asarray(self.full[rows], dtype=np.float32) @ query_full
+            order = np.argsort(-exact)[:k]
+            return self.ids[rows[order]].tolist(), exact[order].tolist()
+
+        order = rows[np.argsort(-scores[rows])][:k]
+        return self.ids[order].tolist(), scores[order].tolist()
+
+    def score_chunks(self, query_vector, chunk_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        지정한 청크들만 질의와 코사인 유사도 계산 (한 번의 행렬 곱)
+
+        원본 float32 벡터가 있으면 정확한 값, 없으면 양자화 근사값을 사용한다.
+
+        Args:
+            query_vector: 질의 임베딩 (원본 차원)
+            chunk_ids: 후보 청크 ID 배열
+
+        Returns:
+            (인덱스에 있는 후보 청크 ID, 유사도) 배열
+        """
+        if self._rows_by_chunk is None:
+            rows_by_chunk = np.full(int(self.ids.max()) + 1 if len(self.ids) else 0, -1, dtype=np.int64)
+            rows_by_chunk[self.ids] = np.arange(len(self.ids))
+            self._rows_by_chunk = rows_by_chunk
+
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        chunk_ids = chunk_ids[chunk_ids < len(self._rows_by_chunk)]
+        rows = self._rows_by_chunk[chunk_ids]
+        found = rows >= 0
+        chunk_ids, rows = chunk_ids[found], rows[found]
+
+        # mmap에서 연속으로 읽도록 행 번호 순으로 정렬
+        order = np.argsort(rows)
+        chunk_ids, rows = chunk_ids[order], rows[order]
+
+        query_full = truncate_normalize(query_vector)
+        if self.full is not None:
+            scores = np.asarray(self.full[rows], dtype=np.float32) @ query_full
+        else:
+            scales = self.scales[rows] if self.scales is not None else None
+            scores = approximate_scores(truncate_normalize(query_full, self.dimensions), self.codes[rows], scales)
+        return chunk_ids, scores
+
+
+def default_index_path(config: Dict) -> str:
+    """컬렉션의 로컬 벡터 인덱스 경로 (chroma_path와 같은 디렉토리)"""
+    chroma_path = os.path.normpath(config['database']['chroma_path'])
+    return os.path.join(os.path.dirname(chroma_path), "vector_index")
+
+
+def export_from_chroma(vectorstore, chunk_store) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    ChromaDB에 저장된 임베딩을 청크 ID 순서로 내보내기
+
+    Args:
+        vectorstore: ChromaDB 벡터스토어
+        chunk_store: BM25 청크 (ChunkStore, 청크 ID 매핑용)
+
+    Returns:
+        (vectors (N, D), chunk_ids (N,))
+    """
+    data = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+
+    vectors, chunk_ids = [], []
+    skipped = 0
+    for embedding, document, metadata in zip(data["embeddings"], data["documents"], data["metadatas"]):
+        chunk_id = (metadata or {}).get('chunk_id')
+        if chunk_id is None:
+            chunk_id = chunk_store.index_of(document)
+        if chunk_id is None:
+            skipped += 1
+            continue
+        vectors.append(embedding)
+        chunk_ids.append(chunk_id)
+
+    if skipped:
+        print(f"[WARN] BM25 청크와 매칭되지 않은 벡터 {skipped}개는 제외했습니다.")
+
+    return np.asarray(vectors, dtype=np.float32), np.asarray(chunk_ids, dtype=np.int64)
+
+
+def build_vector_index(vectorstore, chunk_store, config: Dict, build_id: Optional[str] = None,
+                       path: Optional[str] = None) -> VectorIndex:
+    """
+    ChromaDB에서 로컬 벡터 인덱스 생성 및 저장
+
+    Args:
+        vectorstore: ChromaDB 벡터스토어
+        chunk_store: BM25 청크
+        config: config.yaml 설정 (vector_index 섹션 사용)
+        build_id: BM25 인덱스 빌드 ID (불일치 시 검색에 사용하지 않음)
+        path: 저장 경로 (기본값: chroma_path 옆 vector_index)
+
+    Returns:
+        VectorIndex
+    """
+    index_config = config.get('vector_index') or {}
+    spec = read_embedding_spec(config['database']['chroma_path'])
+
+    # 절단은 Matryoshka 학습 모델에서만 의미가 있음
+    dimensions = index_config.get('dimensions')
+    if dimensions and not supports_truncation(spec.get('model')):
+        print(f"[WARN] {spec.get('model') or '기본 모델'}은 차원 절단을 지원하지 않아 원본 차원을 유지합니다.")
+        dimensions = None
+
+    vectors, chunk_ids = export_from_chroma(vectorstore, chunk_store)
+    index = VectorIndex.build(
+        vectors, chunk_ids,
+        dtype=index_config.get('dtype', 'int8'),
+        dimensions=dimensions,
+        meta={"model": spec.get('model'), "build_id": build_id}
+    )
+    index.save(path or default_index_path(config))
+    return index
+
+
+# ----------------------------------------------------------------------
+# 임베딩 사양 (인덱스를 만든 모델/차원 기록)
+# ----------------------------------------------------------------------
+
+SPEC_FILE = "embedding_spec.json"
+
+
+def read_embedding_spec(chroma_path: str) -> Dict:
+    """
+    인덱스 생성 시 사용한 임베딩 사양 (기록이 없으면 빈 dict = 기본 모델)
+
+    Args:
+        chroma_path: ChromaDB 경로
+    """
+    spec_path = os.path.join(chroma_path, SPEC_FILE)
+    if not os.path.exists(spec_path):
+        return {}
+    with open(spec_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_embedding_spec(chroma_path: str, spec: Dict) -> None:
+    """임베딩 사양 기록"""
+    os.makedirs(chroma_path, exist_ok=True)
+    with open(os.path.join(chroma_path, SPEC_FILE), 'w', encoding='utf-8') as f:
+        json.dump(spec, f, ensure_ascii=False, indent=2)
+
+
+# ----------------------------------------------------------------------
+# 프로세스 공유 인덱스
+# ----------------------------------------------------------------------
+
+_indexes: Dict[str, Tuple[float, VectorIndex]] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vector_index(config: Dict, require_enabled: bool = True) -> Optional[VectorIndex]:
+    """
+    config의 vector_index 설정에 맞는 로컬 인덱스 (없거나 비활성화면 None)
+
+    Args:
+        config: config.yaml 설정
+        require_enabled: False면 vector_index.enabled와 상관없이 파일이 있으면 로드
+            (BM25 후보 재정렬 모드처럼 Chroma 대신 쓰지 않고 점수 계산에만 쓰는 경우)
+
+    Returns:
+        VectorIndex
+    """
+    index_config = config.get('vector_index') or {}
+    if require_enabled and not index_config.get('enabled', False):
+        return None
+
+    path = default_index_path(config)
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+
+    mtime = os.path.getmtime(meta_path)
+    with _indexes_lock:
+        cached = _indexes.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, VectorIndex.load(path))
+            _indexes[path] = cached
+        return cached[1]
@@ -6,15 +6,113 @@
 """
 
 import os
+import json
+import uuid
 import pickle
-from typing import List, Dict
-from langchain.schema import Document
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OpenAIEmbeddings
-from rank_bm25 import BM25Okapi
+import hashlib
+from datetime import datetime
+from typing import List, Dict, Optional, TYPE_CHECKING
+from src.tracing import span
+from src.token_counter import count_tokens
+from src.retrieval_cache import get_retrieval_cache
+from src.chunk_store import ChunkStore
+from src.retrieval_depth import choose_depth
 
+# langchain/chromadb/rank_bm25/numpy는 import 비용이 커서 실제로 쓰는 함수 안에서 로드
+# (Streamlit 첫 화면, API 서버 기동 시간 단축)
+if TYPE_CHECKING:
+    from langchain.schema import Document
+    from langchain_community.vectorstores import Chroma
+    from rank_bm25 import BM25Okapi
 
-def create_vectorstore(chunks: List[Document], config: Dict, persist_directory: str = None) -> Chroma:
+
+# BM25 토크나이저 버전 (토큰화 방식이 바뀌면 올려서 검색 캐시 무효화)
+TOKENIZER_VERSION = "ws-1"
+
+# BM25 인덱스 옆에 빌드 ID만 따로 기록 (인덱스 전체를 unpickle하지 않고 확인)
+BUILD_ID_SUFFIX = ".build_id.json"
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    BM25 토큰화 (공백 기준)
+    
+    Args:
+        text: 대상 텍스트
+        
+    Returns:
+        토큰 리스트
+    """
+    return text.split()
+
+
+def new_build_id() -> str:
+    """인덱스 빌드 ID 생성 (생성 시각 + 임의값)"""
+    return f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+# 모델별 기본 임베딩 차원
+_NATIVE_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536
+}
+
+
+def embedding_spec(config: Dict) -> Dict:
+    """
+    새 인덱스를 만들 때 사용할 임베딩 사양 (config의 embedding 섹션)
+    
+    Args:
+        config: config.yaml 설정
+        
+    Returns:
+        {"model", "dimensions"}
+    """
+    embedding_config = config.get('embedding', {})
+    return {
+        "model": embedding_config.get('model'),
+        "dimensions": embedding_config.get('dimensions')
+    }
+
+
+def create_embeddings(config: Dict, spec: Optional[Dict] = None):
+    """
+    임베딩 사양으로 OpenAI 임베딩 생성
+    
+    Args:
+        config: config.yaml 설정
+        spec: 인덱스의 임베딩 사양 (None 또는 빈 dict면 기본 모델 — 사양 기록 이전 인덱스)
+        
+    Returns:
+        OpenAIEmbeddings (차원을 줄이면 MatryoshkaEmbeddings 래퍼)
+    """
+    from langchain_community.embeddings import OpenAIEmbeddings
+    from src.vector_index import MatryoshkaEmbeddings, supports_truncation
+    
+    embedding_config = config.get('embedding', {})
+    spec = spec or {}
+    
+    kwargs = {
+        # 오프라인(벤치마크) 실행 시 tiktoken 다운로드를 피하기 위해 끌 수 있음
+        "check_embedding_ctx_length": embedding_config.get('check_ctx_length', True)
+    }
+    model = spec.get('model')
+    if model:
+        kwargs["model"] = model
+    embeddings = OpenAIEmbeddings(**kwargs)
+    
+    # 차원 축소는 Matryoshka 학습 모델(text-embedding-3)에서만 적용
+    dimensions = spec.get('dimensions')
+    if dimensions and dimensions < _NATIVE_DIMENSIONS.get(model, 0):
+        if not supports_truncation(model):
+            raise ValueError(f"{model}은 차원 축소를 지원하지 않습니다.")
+        return MatryoshkaEmbeddings(embeddings, dimensions)
+    
+    return embeddings
+
+
+def create_vectorstore(chunks: List["Document"], config: Dict, persist_directory: str = None) -> "Chroma":
     """
     ChromaDB 생성 및 저장
     
@@ -26,11 +124,15 @@ def create_vectorstore(chunks: List[Document], config: Dict, persist_directory:
     Returns:
         Chroma 벡터스토어
     """
+    from langchain_community.vectorstores import Chroma
+    from src.vector_index import write_embedding_spec
+    
     if persist_directory is None:
         persist_directory = config['database']['chroma_path']
     
-    # OpenAI 임베딩 초기화
-    embeddings = OpenAIEmbeddings()
+    # OpenAI 임베딩 초기화 (config의 모델/차원으로 생성하고 사양을 함께 기록)
+    spec = embedding_spec(config)
+    embeddings = create_embeddings(config, spec)
     
     # 배치 처리 (한 번에 100개씩)
     batch_size = 100
@@ -51,23 +153,30 @@ def create_vectorstore(chunks: List[Document], config: Dict, persist_directory:
             # 이후 배치는 추가
             vectorstore.add_documents(batch)
     
+    write_embedding_spec(persist_directory, spec)
+    
     return vectorstore
 
 
-def load_vectorstore(config: Dict) -> Chroma:
+def load_vectorstore(config: Dict, embeddings=None) -> "Chroma":
     """
     기존 ChromaDB 로드
     
     Args:
         config: config.yaml 설정
+        embeddings: 사용할 임베딩 객체 (기본값: config로 생성, 캐시 래퍼 주입용)
         
     Returns:
         Chroma 벡터스토어
     """
+    from langchain_community.vectorstores import Chroma
+    from src.vector_index import read_embedding_spec
+    
     persist_directory = config['database']['chroma_path']
     
-    # OpenAI 임베딩 초기화
-    embeddings = OpenAIEmbeddings()
+    # 인덱스를 만든 모델/차원으로 질의 임베딩 생성 (config가 바뀌어도 재구축 전까지 유지)
+    if embeddings is None:
+        embeddings = create_embeddings(config, read_embedding_spec(persist_directory))
     
     # 기존 DB 로드
     vectorstore = Chroma(
@@ -78,29 +187,39 @@ def load_vectorstore(config: Dict) -> Chroma:
     return vectorstore
 
 
-def create_bm25_index(chunks: List[Document], bm25_path: str = None) -> BM25Okapi:
+def create_bm25_index(chunks: List["Document"], bm25_path: str = None, build_id: str = None) -> "BM25Okapi":
     """
     BM25 인덱스 생성 및 저장
     
     Args:
         chunks: 청크된 문서 리스트
         bm25_path: 저장 경로
+        build_id: 인덱스 빌드 ID (기본값: 새로 생성)
         
     Returns:
         BM25Okapi 인덱스
     """
+    from rank_bm25 import BM25Okapi
+    
     # 텍스트를 토큰화 (공백 기준)
-    tokenized_corpus = [doc.page_content.split() for doc in chunks]
+    tokenized_corpus = [tokenize(doc.page_content) for doc in chunks]
     
     # BM25 인덱스 생성
     bm25 = BM25Okapi(tokenized_corpus)
     
+    # 검색 캐시 무효화 기준이 되는 빌드 ID
+    bm25.build_id = build_id or new_build_id()
+    
     # pickle로 저장
     if bm25_path:
         os.makedirs(os.path.dirname(bm25_path), exist_ok=True)
         with open(bm25_path, 'wb') as f:
-            # chunks와 bm25를 함께 저장
-            pickle.dump({'bm25': bm25, 'chunks': chunks}, f)
+            # chunks는 압축 저장소로 변환해 bm25와 함께 저장
+            chunk_store = chunks if isinstance(chunks, ChunkStore) else ChunkStore.from_documents(chunks)
+            pickle.dump({'bm25': bm25, 'chunks': chunk_store, 'build_id': bm25.build_id}, f)
+        # 인덱스 파일 크기도 기록해 다른 인덱스로 바뀐 경우를 구분
+        with open(bm25_path + BUILD_ID_SUFFIX, 'w', encoding='utf-8') as f:
+            json.dump({'build_id': bm25.build_id, 'size': os.path.getsize(bm25_path)}, f)
     
     return bm25
 
@@ -113,21 +232,229 @@ def load_bm25_index(bm25_path: str) -> tuple:
         bm25_path: 저장 경로
         
     Returns:
-        (BM25Okapi, List[Document])
+        (BM25Okapi, ChunkStore)
     """
     with open(bm25_path, 'rb') as f:
-        data = pickle.load(f)
+        raw = f.read()
+    data = pickle.loads(raw)
+    
+    bm25 = data['bm25']
     
-    return data['bm25'], data['chunks']
+    # 이전 형식(List[Document])은 로드 시 압축 저장소로 변환
+    chunks = data['chunks']
+    if not isinstance(chunks, ChunkStore):
+        chunks = ChunkStore.from_documents(chunks)
+    
+    # 빌드 ID가 없는 이전 인덱스는 파일 내용 해시로 대신함 (복사/clone해도 유지)
+    if not getattr(bm25, 'build_id', None):
+        bm25.build_id = data.get('build_id') or f"legacy-{hashlib.sha1(raw).hexdigest()[:12]}"
+    
+    return bm25, chunks
+
+
+def get_build_id(bm25_path: str) -> Optional[str]:
+    """
+    저장된 BM25 인덱스의 빌드 ID (없으면 None)
+    
+    빌드 ID 파일을 읽고, 파일이 없거나 인덱스와 맞지 않는 이전 인덱스만 전체를 로드한다.
+    
+    Args:
+        bm25_path: 저장 경로
+        
+    Returns:
+        빌드 ID
+    """
+    if not os.path.exists(bm25_path):
+        return None
+    try:
+        with open(bm25_path + BUILD_ID_SUFFIX, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+        if record.get('build_id') and record.get('size') == os.path.getsize(bm25_path):
+            return record['build_id']
+    except (OSError, ValueError):
+        pass
+    bm25, _ = load_bm25_index(bm25_path)
+    return bm25.build_id
+
+
+_position_maps: Dict[int, tuple] = {}
+
+
+def chunk_ids(docs: List["Document"], bm25_chunks: List["Document"]) -> Optional[List[int]]:
+    """
+    검색 결과 문서를 bm25_chunks의 위치(청크 ID)로 변환
+    
+    Args:
+        docs: 검색 결과 문서
+        bm25_chunks: BM25 문서 리스트
+        
+    Returns:
+        청크 ID 리스트 (하나라도 찾지 못하면 None)
+    """
+    if isinstance(bm25_chunks, ChunkStore):
+        find = bm25_chunks.index_of
+    else:
+        # 내용 → 위치 맵은 청크 리스트마다 한 번만 생성
+        cached = _position_maps.get(id(bm25_chunks))
+        if cached is None or cached[0] is not bm25_chunks:
+            positions = {}
+            for i in range(len(bm25_chunks)):
+                positions.setdefault(bm25_chunks[i].page_content, i)
+            cached = (bm25_chunks, positions)
+            _position_maps[id(bm25_chunks)] = cached
+        find = cached[1].get
+    
+    ids = []
+    for doc in docs:
+        chunk_id = doc.metadata.get('chunk_id')
+        if chunk_id is None or chunk_id >= len(bm25_chunks):
+            chunk_id = find(doc.page_content)
+        if chunk_id is None:
+            return None
+        ids.append(chunk_id)
+    
+    return ids
+
+
+def normalize_query(query: str) -> str:
+    """
+    질의 정규화 (공백 정리, 소문자화, 끝 문장부호 제거)
+    
+    동일 질문 판별(요청 병합, 캐시 키)에 사용
+    
+    Args:
+        query: 원본 질의
+        
+    Returns:
+        정규화된 질의
+    """
+    return " ".join(query.split()).lower().rstrip("?？.!~ ")
+
+
+def retrieval_cache_key(cache, query: str, bm25: "BM25Okapi", config: Dict) -> Optional[str]:
+    """검색 캐시 키 (정규화 질의, 검색 설정, 빌드 ID, 토크나이저 버전)"""
+    if cache is None:
+        return None
+    return cache.make_key(normalize_query(query), config, getattr(bm25, 'build_id', ''), TOKENIZER_VERSION)
+
+
+def store_in_cache(cache, cache_key: Optional[str], results: List["Document"], bm25_chunks: List["Document"]) -> None:
+    """검색 결과를 청크 ID 목록으로 검색 캐시에 저장 (ID로 바꿀 수 없으면 저장 안 함)"""
+    if cache is None or cache_key is None:
+        return
+    ids = chunk_ids(results, bm25_chunks)
+    if ids is not None:
+        cache.put(cache_key, ids)
+
+
+def lexical_scores(query: str, bm25: "BM25Okapi", bm25_chunks: List["Document"], config: Dict) -> tuple:
+    """
+    질의의 BM25 점수 (동의어 사전이 있으면 동의어/본문 표기를 가중 항으로 추가)
+    
+    Args:
+        query: 검색 쿼리
+        bm25: BM25 인덱스
+        bm25_chunks: BM25 문서 리스트
+        config: config.yaml 설정
+        
+    Returns:
+        (청크별 점수, 질의 항 수, 추가된 항 수)
+    """
+    from src.synonyms import get_synonym_index, weighted_bm25_scores
+    
+    tokenized_query = tokenize(query)
+    synonym_index = get_synonym_index(config, bm25_chunks, getattr(bm25, 'build_id', None))
+    if synonym_index is None:
+        return bm25.get_scores(tokenized_query), len(tokenized_query), 0
+    
+    synonym_config = config['synonyms']
+    weighted_terms = synonym_index.expand(
+        query,
+        variant_weight=synonym_config.get('variant_weight', 0.8),
+        max_terms=synonym_config.get('max_terms', 40)
+    )
+    return (
+        weighted_bm25_scores(bm25, weighted_terms),
+        len(tokenized_query),
+        len(weighted_terms) - len(tokenized_query)
+    )
+
+
+def prefilter_search(
+    query: str,
+    query_embedding: List[float],
+    vector_index,
+    bm25: "BM25Okapi",
+    bm25_chunks: List["Document"],
+    config: Dict
+) -> List["Document"]:
+    """
+    BM25 후보 재정렬 검색 (retrieval.mode: prefilter)
+    
+    BM25 점수가 있는 청크 중 상위 prefilter_candidates개만 골라
+    로컬 임베딩과의 코사인 유사도를 한 번에 계산해 순위를 매긴다.
+    어휘가 겹치는 청크가 너무 적으면 로컬 인덱스 전체 벡터 검색으로 대체한다.
+    
+    Args:
+        query: 검색 쿼리
+        query_embedding: 질의 임베딩
+        vector_index: 로컬 벡터 인덱스 (VectorIndex)
+        bm25: BM25 인덱스
+        bm25_chunks: BM25 문서 리스트
+        config: config.yaml 설정
+        
+    Returns:
+        최종 검색 결과 문서 리스트
+    """
+    retrieval_config = config['retrieval']
+    final_top_k = retrieval_config['final_top_k']
+    adaptive = retrieval_config.get('adaptive') or {}
+    if adaptive.get('enabled', False):
+        final_top_k = adaptive.get('max_k', final_top_k)
+    pool_size = retrieval_config.get('prefilter_candidates', 300)
+    min_candidates = retrieval_config.get('prefilter_min_candidates', final_top_k)
+    
+    with span("prefilter", pool=pool_size) as s:
+        bm25_scores, _, s["expanded_terms"] = lexical_scores(query, bm25, bm25_chunks, config)
+        candidates = bm25_scores.nonzero()[0]
+        s["lexical_hits"] = len(candidates)
+        
+        if len(candidates) > pool_size:
+            top = (-bm25_scores[candidates]).argpartition(pool_size - 1)[:pool_size]
+            candidates = candidates[top]
+        
+        if len(candidates) >= min_candidates:
+            ids, similarities = vector_index.score_chunks(query_embedding, candidates)
+            order = (-similarities).argsort()[:final_top_k]
+            ids, scores = ids[order].tolist(), similarities[order].tolist()
+            s["fallback"] = False
+        else:
+            # 어휘가 겹치지 않는 질의 → 로컬 인덱스 전체 벡터 검색
+            rescore_k = (config.get('vector_index') or {}).get('rescore_k', 0)
+            ids, scores = vector_index.search(query_embedding, k=final_top_k, rescore_k=rescore_k)
+            s["fallback"] = True
+        
+        s["returned"] = len(ids)
+    
+    # 점수 분포로 넘길 청크 수 결정 (적응형)
+    if adaptive.get('enabled', False):
+        with span("adaptive_depth") as s:
+            top_bm25 = sorted(bm25_scores[candidates], reverse=True)[:final_top_k]
+            depth, signals = choose_depth(top_bm25, scores, adaptive)
+            s.update(signals)
+        ids = ids[:depth]
+    
+    return [bm25_chunks[i] for i in ids if i < len(bm25_chunks)]
 
 
 def hybrid_search(
     query: str, 
-    vectorstore: Chroma, 
-    bm25: BM25Okapi, 
-    bm25_chunks: List[Document],
-    config: Dict
-) -> List[Document]:
+    vectorstore: "Chroma", 
+    bm25: "BM25Okapi", 
+    bm25_chunks: List["Document"],
+    config: Dict,
+    query_embedding: Optional[List[float]] = None
+) -> List["Document"]:
     """
     벡터 + BM25 하이브리드 검색 (RRF로 결합)
     
@@ -135,8 +462,9 @@ def hybrid_search(
         query: 검색 쿼리
         vectorstore: ChromaDB 벡터스토어
         bm25: BM25 인덱스
-        bm25_chunks: BM25에 대응하는 문서 리스트
+        bm25_chunks: BM25에 대응하는 문서 리스트 (ChunkStore 또는 List[Document])
         config: config.yaml의 retrieval 설정
+        query_embedding: 이미 계산한 질의 임베딩 (FAQ 조회 등, 없으면 새로 계산)
         
     Returns:
         최종 검색 결과 문서 리스트
@@ -145,41 +473,101 @@ def hybrid_search(
         vector_top_k = config['retrieval']['vector_top_k']
         bm25_top_k = config['retrieval']['bm25_top_k']
         final_top_k = config['retrieval']['final_top_k']
+        adaptive = config['retrieval'].get('adaptive') or {}
+        
+        # 0. 검색 캐시 조회 (히트하면 임베딩 호출과 BM25 계산 생략)
+        cache = get_retrieval_cache(config)
+        cache_key = None
+        if cache is not None:
+            with span("retrieval_cache") as s:
+                cache_key = retrieval_cache_key(cache, query, bm25, config)
+                cached_ids = cache.get(cache_key)
+                s["cache_hit"] = cached_ids is not None
+            if cached_ids is not None:
+                return [bm25_chunks[i] for i in cached_ids]
+        
+        # 1. 벡터 검색 (쿼리 임베딩 → Chroma 검색)
+        if query_embedding is None:
+            with span("embedding", query_tokens=count_tokens(query)):
+                query_embedding = vectorstore.embeddings.embed_query(query)
+        
+        # 로컬 양자화 인덱스가 있고 BM25와 같은 빌드면 Chroma 대신 사용
+        mode = config['retrieval'].get('mode', 'hybrid')
+        vector_index = None
+        if mode == "prefilter" or (config.get('vector_index') or {}).get('enabled', False):
+            from src.vector_index import get_vector_index
+            vector_index = get_vector_index(config, require_enabled=(mode != "prefilter"))
+        if vector_index is not None and vector_index.build_id != getattr(bm25, 'build_id', None):
+            vector_index = None
         
-        # 1. 벡터 검색
-        vector_results = vectorstore.similarity_search(query, k=vector_top_k)
+        # BM25 후보만 정확한 코사인으로 재정렬 (로컬 인덱스가 없으면 기존 하이브리드 검색)
+        if mode == "prefilter" and vector_index is not None:
+            final_results = prefilter_search(query, query_embedding, vector_index, bm25, bm25_chunks, config)
+            store_in_cache(cache, cache_key, final_results, bm25_chunks)
+            return final_results
+        
+        if vector_index is not None:
+            with span("vector_index", k=vector_top_k, dtype=vector_index.meta.get('dtype')) as s:
+                rescore_k = config['vector_index'].get('rescore_k', 0)
+                ids, vector_scores = vector_index.search(query_embedding, k=vector_top_k, rescore_k=rescore_k)
+                vector_results = [bm25_chunks[i] for i in ids if i < len(bm25_chunks)]
+                s["candidates"] = len(vector_results)
+        elif adaptive.get('enabled', False):
+            # 적응형 깊이는 점수 분포가 필요 (Chroma 기본 거리 = 제곱 L2, 정규화 임베딩이면 코사인 = 1 - d/2)
+            with span("chroma", k=vector_top_k) as s:
+                pairs = vectorstore.similarity_search_by_vector_with_relevance_scores(query_embedding, k=vector_top_k)
+                vector_results = [doc for doc, _ in pairs]
+                vector_scores = [1.0 - distance / 2.0 for _, distance in pairs]
+                s["candidates"] = len(vector_results)
+        else:
+            with span("chroma", k=vector_top_k) as s:
+                vector_results = vectorstore.similarity_search_by_vector(query_embedding, k=vector_top_k)
+                vector_scores = None
+                s["candidates"] = len(vector_results)
         
         # 2. BM25 검색
-        import numpy as np
-        tokenized_query = query.split()
-        bm25_scores = bm25.get_scores(tokenized_query)
-        bm25_indices = np.argsort(bm25_scores)[::-1][:bm25_top_k]
+        with span("bm25", k=bm25_top_k) as s:
+            bm25_scores, s["query_terms"], s["expanded_terms"] = lexical_scores(query, bm25, bm25_chunks, config)
+            bm25_indices = bm25_scores.argsort()[::-1][:bm25_top_k]
+            
+            bm25_results = []
+            for idx in bm25_indices:
+                if idx < len(bm25_chunks) and bm25_scores[idx] > 0:
+                    bm25_results.append(bm25_chunks[idx])
+            s["candidates"] = len(bm25_results)
         
-        bm25_results = []
-        for idx in bm25_indices:
-            if idx < len(bm25_chunks) and bm25_scores[idx] > 0:
-                bm25_results.append(bm25_chunks[idx])
+        # 점수 분포로 넘길 청크 수 결정 (적응형)
+        if adaptive.get('enabled', False):
+            with span("adaptive_depth") as s:
+                final_top_k, signals = choose_depth(bm25_scores[bm25_indices], vector_scores, adaptive)
+                s.update(signals)
         
         # 3. 결과 병합 (중복 제거)
-        seen_contents = set()
-        combined_results = []
-        
-        # 벡터 검색 결과 우선
-        for doc in vector_results:
-            content_hash = hash(doc.page_content[:200])
-            if content_hash not in seen_contents:
-                seen_contents.add(content_hash)
-                combined_results.append(doc)
-        
-        # BM25 결과 추가
-        for doc in bm25_results:
-            content_hash = hash(doc.page_content[:200])
-            if content_hash not in seen_contents:
-                seen_contents.add(content_hash)
-                combined_results.append(doc)
-        
-        # 최종 top_k만 반환
-        final_results = combined_results[:final_top_k]
+        with span("fusion", k=final_top_k) as s:
+            seen_contents = set()
+            combined_results = []
+            
+            # 벡터 검색 결과 우선
+            for doc in vector_results:
+                content_hash = hash(doc.page_content[:200])
+                if content_hash not in seen_contents:
+                    seen_contents.add(content_hash)
+                    combined_results.append(doc)
+            
+            # BM25 결과 추가
+            for doc in bm25_results:
+                content_hash = hash(doc.page_content[:200])
+                if content_hash not in seen_contents:
+                    seen_contents.add(content_hash)
+                    combined_results.append(doc)
+            
+            # 최종 top_k만 반환
+            final_results = combined_results[:final_top_k]
+            s["candidates"] = len(combined_results)
+            s["returned"] = len(final_results)
+        
+        # 4. 검색 캐시 저장 (청크 ID 목록)
+        store_in_cache(cache, cache_key, final_results, bm25_chunks)
         
         return final_results
     